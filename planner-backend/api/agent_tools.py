@@ -7,16 +7,21 @@ import uuid
 import json
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 import httpx
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 
 from db.config.connection import get_db
+from db.dashboard_cache import get_dashboard_cache
+from db.request_progress import insert_request_progress, update_request_progress
+from db.validation_sessions import discard_validated_payload, load_validated_payload, save_validated_payload
 from db.models.dbmodels.requestProgress import RequestProgress, RequestStatus
 from db.models.dbmodels.priorAuthRequest import priorAuthRequest
 from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
+from validation.incremental import JsonPatchError
+from validation.service import content_length, get_validation_service
 
 router = APIRouter()
 
@@ -51,7 +56,7 @@ async def start_new_request(req: StartRequestTool):
         )
         db = get_db()
         
-        await db["requestProgress"].insert_one(request_progress.model_dump(by_alias=True))
+        await insert_request_progress(db, request_progress.model_dump(by_alias=True))
         return StartRequestResponse(
             request_id=request_id,
             status="CREATED",
@@ -80,47 +85,32 @@ async def check_payer_onboarding(payer_id: str, request_id: str = Query(...)):
         db = get_db()
         
         # Update request status
-        await db["requestProgress"].update_one(
-            {"requestId": request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.PROCESSING,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": f"Checking payer onboarding: {payer_id}"
-                }
-            }
-        )
+        await update_request_progress(db, request_id, {
+            "status": RequestStatus.PROCESSING,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": f"Checking payer onboarding: {payer_id}"
+        }, payer_id=payer_id)
         
         # Check payer in database
         payer = await db["payers"].find_one({"id": payer_id}, {"_id": 0})
         
         if payer:
-            await db["requestProgress"].update_one(
-                {"requestId": request_id},
-                {
-                    "$set": {
-                        "status": RequestStatus.PROCESSING,
-                        "lastUpdatedAt": datetime.now(),
-                        "remarks": "Payer validated successfully"
-                    }
-                }
-            )
+            await update_request_progress(db, request_id, {
+                "status": RequestStatus.PROCESSING,
+                "lastUpdatedAt": datetime.now(),
+                "remarks": "Payer validated successfully"
+            }, payer_id=payer_id)
             return PayerCheckResponse(
                 is_onboarded=True,
                 payer_details=payer,
                 message="Payer is onboarded and active"
             )
         else:
-            await db["requestProgress"].update_one(
-                {"requestId": request_id},
-                {
-                    "$set": {
-                        "status": RequestStatus.FAILED,
-                        "lastUpdatedAt": datetime.now(),
-                        "remarks": f"Payer {payer_id} not found"
-                    }
-                }
-            )
+            await update_request_progress(db, request_id, {
+                "status": RequestStatus.FAILED,
+                "lastUpdatedAt": datetime.now(),
+                "remarks": f"Payer {payer_id} not found"
+            }, payer_id=payer_id)
             return PayerCheckResponse(
                 is_onboarded=False,
                 payer_details=None,
@@ -128,16 +118,11 @@ async def check_payer_onboarding(payer_id: str, request_id: str = Query(...)):
             )
             
     except Exception as e:
-        await db["requestProgress"].update_one(
-            {"requestId": request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.FAILED,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": f"Error checking payer: {str(e)}"
-                }
-            }
-        )
+        await update_request_progress(db, request_id, {
+            "status": RequestStatus.FAILED,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": f"Error checking payer: {str(e)}"
+        }, payer_id=payer_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 # ============================================================================
@@ -163,16 +148,11 @@ async def get_patient_details(req: PatientDetailsRequest):
     
     try:
         # Update request status
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.PROCESSING,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": f"Fetching patient details for: {req.patient_id}"
-                }
-            }
-        )
+        await update_request_progress(db, req.request_id, {
+            "status": RequestStatus.PROCESSING,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": f"Fetching patient details for: {req.patient_id}"
+        })
         
         # Here you would typically call an external patient API
         # For now, we'll return mock data or fetch from local database
@@ -232,16 +212,11 @@ Date: {datetime.now().strftime('%Y-%m-%d')}
 """)
             print(f"Document created at: {document_path}")
         
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.PROCESSING,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": "Patient details fetched successfully"
-                }
-            }
-        )
+        await update_request_progress(db, req.request_id, {
+            "status": RequestStatus.PROCESSING,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": "Patient details fetched successfully"
+        })
         
         return PatientDetailsResponse(
             patient_data=mock_patient_data,
@@ -250,16 +225,11 @@ Date: {datetime.now().strftime('%Y-%m-%d')}
         )
         
     except Exception as e:
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.FAILED,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": f"Error fetching patient details: {str(e)}"
-                }
-            }
-        )
+        await update_request_progress(db, req.request_id, {
+            "status": RequestStatus.FAILED,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": f"Error fetching patient details: {str(e)}"
+        })
         return PatientDetailsResponse(
             patient_data={},
             success=False,
@@ -282,90 +252,67 @@ class JsonValidationResponse(BaseModel):
     message: str = Field(..., description="Validation result message")
 
 @router.post("/tools/validate-json", response_model=JsonValidationResponse)
-async def validate_patient_json(req: JsonValidationRequest):
+async def validate_patient_json(req: JsonValidationRequest, request: Request = None):
     """
     TOOL 4: Validate patient JSON against payer rules
-    Uses existing validation logic from validate_json.py
+    Uses the in-process ValidationService shared with /api/validate-json
     """   
     db = get_db()
     
     try:
         # Update request status
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.PROCESSING,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": f"Validating JSON for payer: {req.payer_id}"
-                }
-            }
+        await update_request_progress(db, req.request_id, {
+            "status": RequestStatus.PROCESSING,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": f"Validating JSON for payer: {req.payer_id}"
+        }, payer_id=req.payer_id)
+        
+        # Validate in-process with the same service behind /api/validate-json;
+        # the payload is remembered so TOOL 7/9 corrections are re-checked incrementally
+        result = await get_validation_service().validate(
+            req.patient_data, request_id=req.request_id, source="tool4", body_bytes=content_length(request)
         )
         
-        # Call existing validation endpoint
-        async with httpx.AsyncClient() as client:
-            validation_request = {
-                "request_id": req.request_id,
-                "json_data": req.patient_data
-            }
-            
-            response = await client.post(
-                f"{os.getenv('BASE_URL', 'http://host.docker.internal:8001')}/api/validate-json",
-                json=validation_request,
-                timeout=30.0
+        if result.http_status == HttpResponseEnum.INTERNAL_SERVER_ERROR:
+            raise Exception(result.error_message or "Validation service error")
+        # A failing payload is persisted as well, so corrections reaching another instance
+        # (or a restarted one) still apply; valid payloads are never patched
+        if result.is_valid:
+            await discard_validated_payload(db, req.request_id)
+        else:
+            await save_validated_payload(db, req.request_id, req.patient_data)
+        
+        if result.is_valid:
+            await update_request_progress(db, req.request_id, {
+                "status": RequestStatus.PROCESSING,
+                "lastUpdatedAt": datetime.now(),
+                "remarks": "JSON validation successful"
+            }, payer_id=req.payer_id)
+            return JsonValidationResponse(
+                is_valid=True,
+                validation_errors=[],
+                missing_fields=[],
+                message="JSON validation passed"
+            )
+        else:
+            await update_request_progress(db, req.request_id, {
+                "status": RequestStatus.USER_ACTION_REQUIRED,
+                "lastUpdatedAt": datetime.now(),
+                "remarks": "JSON validation failed - additional info required"
+            }, payer_id=req.payer_id)
+            return JsonValidationResponse(
+                is_valid=False,
+                validation_errors=[result.error_message] if result.error_message else [],
+                missing_fields=[],
+                message=result.error_message or "Validation failed"
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                
-                if result.get("is_valid", False):
-                    await db["requestProgress"].update_one(
-                        {"requestId": req.request_id},
-                        {
-                            "$set": {
-                                "status": RequestStatus.PROCESSING,
-                                "lastUpdatedAt": datetime.now(),
-                                "remarks": "JSON validation successful"
-                            }
-                        }
-                    )
-                    return JsonValidationResponse(
-                        is_valid=True,
-                        validation_errors=[],
-                        missing_fields=[],
-                        message="JSON validation passed"
-                    )
-                else:
-                    await db["requestProgress"].update_one(
-                        {"requestId": req.request_id},
-                        {
-                            "$set": {
-                                "status": RequestStatus.USER_ACTION_REQUIRED,
-                                "lastUpdatedAt": datetime.now(),
-                                "remarks": "JSON validation failed - additional info required"
-                            }
-                        }
-                    )
-                    return JsonValidationResponse(
-                        is_valid=False,
-                        validation_errors=result.get("validation_errors", []),
-                        missing_fields=result.get("missing_fields", []),
-                        message=result.get("message", "Validation failed")
-                    )
-            else:
-                raise Exception("Validation service error")
-                
     except Exception as e:
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.FAILED,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": f"JSON validation error: {str(e)}"
-                }
-            }
-        )
+        await update_request_progress(db, req.request_id, {
+            "status": RequestStatus.FAILED,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": f"JSON validation error: {str(e)}"
+        }, payer_id=req.payer_id)
         return JsonValidationResponse(
             is_valid=False,
             validation_errors=[str(e)],
@@ -401,16 +348,11 @@ async def trigger_n8n_workflow(req: N8NTriggerRequest):
     
     try:
         # Update request status
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.IN_PROGRESS,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": "Triggering N8N workflow"
-                }
-            }
-        )
+        await update_request_progress(db, req.request_id, {
+            "status": RequestStatus.IN_PROGRESS,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": "Triggering N8N workflow"
+        }, payer_id=req.payer_id)
         
         # Create prior auth request record
         prior_auth_request = priorAuthRequest(
@@ -423,6 +365,9 @@ async def trigger_n8n_workflow(req: N8NTriggerRequest):
             lastUpdatedAt=datetime.now()
         )
         await db["priorAuthRequest"].insert_one(prior_auth_request.dict())
+        # Written after the progress update that invalidated the dashboard cache; invalidate
+        # again so a /dashboard/requests page computed in between does not keep missing this row
+        get_dashboard_cache().invalidate()
         
         # Call N8N webhook
         async with httpx.AsyncClient() as client:
@@ -443,16 +388,11 @@ async def trigger_n8n_workflow(req: N8NTriggerRequest):
             )
             
             if response.status_code in [200, 201]:
-                await db["requestProgress"].update_one(
-                    {"requestId": req.request_id},
-                    {
-                        "$set": {
-                            "status": RequestStatus.IN_PROGRESS,
-                            "lastUpdatedAt": datetime.now(),
-                            "remarks": "N8N workflow triggered successfully"
-                        }
-                    }
-                )
+                await update_request_progress(db, req.request_id, {
+                    "status": RequestStatus.IN_PROGRESS,
+                    "lastUpdatedAt": datetime.now(),
+                    "remarks": "N8N workflow triggered successfully"
+                }, payer_id=req.payer_id)
                 
                 return N8NTriggerResponse(
                     workflow_triggered=True,
@@ -463,16 +403,11 @@ async def trigger_n8n_workflow(req: N8NTriggerRequest):
                 raise Exception(f"N8N webhook failed: {response.status_code}")
                 
     except Exception as e:
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.FAILED,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": f"N8N trigger failed: {str(e)}"
-                }
-            }
-        )
+        await update_request_progress(db, req.request_id, {
+            "status": RequestStatus.FAILED,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": f"N8N trigger failed: {str(e)}"
+        }, payer_id=req.payer_id)
         return N8NTriggerResponse(
             workflow_triggered=False,
             workflow_id=None,
@@ -522,6 +457,9 @@ class UserActionResponse(BaseModel):
     request_id: str = Field(..., description="Request ID")
     action_id: str = Field(..., description="User action ID")
     response_data: Dict[str, Any] = Field(..., description="User provided data")
+    json_patch: Optional[List[Dict[str, Any]]] = Field(
+        None, description="Optional RFC 6902 JSON-Patch correcting the payload validated by TOOL 4"
+    )
 
 @router.post("/tools/handle-user-action")
 async def handle_user_action_response(req: UserActionResponse):
@@ -532,38 +470,51 @@ async def handle_user_action_response(req: UserActionResponse):
     db = get_db()
     
     try:
-        # Update user action status
-        result = await db["priorAuthUserAction"].update_one(
-            {"id": req.action_id, "requestId": req.request_id},
-            {
-                "$set": {
-                    "actionStatus": "COMPLETED",
-                    "actionedAt": datetime.now(),
-                    "metadata": json.dumps(req.response_data)
-                }
-            }
+        action = await db["priorAuthUserAction"].find_one(
+            {"id": req.action_id, "requestId": req.request_id}, {"_id": 0, "id": 1}
         )
-        
-        if result.modified_count == 0:
+        if not action:
             raise HTTPException(status_code=404, detail="User action not found")
         
-        # Update request status to resume processing
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.PROCESSING,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": "User action completed - ready to resume"
-                }
-            }
+        # Re-check only the corrected parts of the payload when a patch was supplied;
+        # a missing session or a bad patch leaves the action pending
+        validation = None
+        if req.json_patch:
+            try:
+                revalidated = await _revalidate_patch(db, req.request_id, req.json_patch)
+            except KeyError:
+                raise HTTPException(status_code=404, detail="No validated payload for request")
+            except JsonPatchError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON patch: {str(e)}")
+            validation = _incremental_response(revalidated)
+        can_resume = validation is None or validation.is_valid
+        
+        # The action is completed only once the correction validates; otherwise it stays pending
+        action_update = {"metadata": json.dumps(req.response_data)}
+        if can_resume:
+            action_update.update({"actionStatus": "COMPLETED", "actionedAt": datetime.now()})
+        await db["priorAuthUserAction"].update_one(
+            {"id": req.action_id, "requestId": req.request_id},
+            {"$set": action_update}
         )
         
-        return {
+        # Update request status to resume processing
+        await update_request_progress(db, req.request_id, {
+            "status": RequestStatus.PROCESSING if can_resume else RequestStatus.USER_ACTION_REQUIRED,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": "User action completed - ready to resume" if can_resume
+            else "Correction applied - JSON validation still failing"
+        })
+        
+        response = {
             "success": True,
-            "message": "User action processed successfully",
-            "can_resume": True
+            "message": "User action processed successfully" if can_resume
+            else "User action recorded - JSON validation still failing",
+            "can_resume": can_resume
         }
+        if validation is not None:
+            response["validation"] = validation.model_dump(exclude={"patient_data"})
+        return response
         
     except HTTPException:
         raise
@@ -615,12 +566,7 @@ async def update_request_status(req: UpdateRequestStatusRequest):
         else:
             update_data["remarks"] = f"Status updated from {old_status} to {req.status}"
         
-        result = await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {"$set": update_data}
-        )
-        
-        if result.modified_count == 0:
+        if not await update_request_progress(db, req.request_id, update_data):
             raise HTTPException(status_code=400, detail="Failed to update request status")
         
         return UpdateRequestStatusResponse(
@@ -636,3 +582,74 @@ async def update_request_status(req: UpdateRequestStatusRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating request status: {str(e)}")
 
+# ============================================================================
+# TOOL 9: Re-validate Patched JSON
+# ============================================================================
+
+class JsonPatchValidationRequest(BaseModel):
+    request_id: str = Field(..., description="Request ID whose payload was validated by TOOL 4")
+    patch: List[Dict[str, Any]] = Field(..., description="RFC 6902 JSON-Patch operations (add/remove/replace)")
+
+class JsonPatchValidationResponse(JsonValidationResponse):
+    failed_paths: Dict[str, str] = Field(default={}, description="Failing JSON paths and their errors")
+    revalidated_items: int = Field(..., description="Number of response items re-checked")
+    full_revalidation: bool = Field(..., description="Whether the whole payload had to be re-checked")
+    patient_data: Dict[str, Any] = Field(..., description="Patched patient JSON")
+
+async def _revalidate_patch(db, request_id: str, patch: List[Dict[str, Any]]):
+    """
+    Apply a patch to the request's last validated payload. When this instance has no
+    session for the request the persisted (failed) payload is restored first (re-checked in full).
+    Raises KeyError if the request was never validated, JsonPatchError for a bad patch.
+    """
+    service = get_validation_service()
+    if not service.has_session(request_id):
+        payload = await load_validated_payload(db, request_id)
+        if payload is None:
+            raise KeyError(request_id)
+        service.restore_session(request_id, payload)
+    revalidated = await service.revalidate_patch(request_id, patch)
+    if revalidated.response.is_valid:
+        await discard_validated_payload(db, request_id)
+    else:
+        await save_validated_payload(db, request_id, revalidated.payload)
+    return revalidated
+
+def _incremental_response(revalidated) -> JsonPatchValidationResponse:
+    result = revalidated.response
+    return JsonPatchValidationResponse(
+        is_valid=result.is_valid,
+        validation_errors=[result.error_message] if result.error_message else [],
+        missing_fields=[],
+        message="JSON validation passed" if result.is_valid else result.error_message or "Validation failed",
+        failed_paths=revalidated.failed_paths,
+        revalidated_items=revalidated.revalidated_items,
+        full_revalidation=revalidated.full_revalidation,
+        patient_data=revalidated.payload
+    )
+
+@router.post("/tools/revalidate-json", response_model=JsonPatchValidationResponse)
+async def revalidate_patched_json(req: JsonPatchValidationRequest):
+    """
+    TOOL 9: Apply a JSON-Patch correction and re-validate incrementally
+    Only the patched response items (plus the payload root) are re-checked
+    """
+    db = get_db()
+    
+    try:
+        revalidated = await _revalidate_patch(db, req.request_id, req.patch)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="No validated payload for request")
+    except JsonPatchError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON patch: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    response = _incremental_response(revalidated)
+    await update_request_progress(db, req.request_id, {
+        "status": RequestStatus.PROCESSING if response.is_valid else RequestStatus.USER_ACTION_REQUIRED,
+        "lastUpdatedAt": datetime.now(),
+        "remarks": "JSON validation successful" if response.is_valid
+        else "JSON validation failed - additional info required"
+    })
+    return response
@@ -1,13 +1,31 @@
+import asyncio
+import json
+import os
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Query
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from db.config.connection import get_db
+from db.dashboard_cache import get_dashboard_cache
+from db.dashboard_rollups import get_dashboard_rollups
+from db.keyset import encode_cursor, keyset_filter
+from db.progress_events import get_progress_broadcaster
+from db.request_export import EXPORT_BATCH_SIZE, export_batches, stream_csv, stream_ndjson
+from db.request_search import search_requests
+from db.status_counters import read_payer_status_totals, read_status_totals, rebuild_status_counters
 from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
 
 router = APIRouter()
 
+# Seconds without events after which the live feed sends an SSE comment to keep proxies from closing it
+DASHBOARD_STREAM_KEEPALIVE = float(os.getenv("DASHBOARD_STREAM_KEEPALIVE", "15"))
+# "counters" reads the materialized status counters and "rollups" the dashboardDaily rollups plus
+# today's live data (both day granularity); "raw" aggregates requestProgress/priorAuthRequest directly
+DASHBOARD_STATS_SOURCE = os.getenv("DASHBOARD_STATS_SOURCE", "counters").lower()
+
 class DashboardStats(BaseModel):
     total_requests: int = Field(..., description="Total number of preauth requests")
     pending_requests: int = Field(..., description="Number of pending requests")
@@ -37,11 +55,18 @@ class UserActionSummary(BaseModel):
 
 @router.get("/dashboard/stats")
 async def get_dashboard_stats(
+    request: Request,
     days: int = Query(7, description="Number of days to look back for stats")
 ) -> DashboardStats:
     """
     Get dashboard statistics for the specified time period
+    Served from the shared dashboard cache; supports If-None-Match
     """
+    async def compute():
+        return await compute_dashboard_stats(days), {}
+    return await get_dashboard_cache().respond(request, compute)
+
+async def compute_dashboard_stats(days: int) -> DashboardStats:
     db = get_db()
     
     try:
@@ -49,19 +74,25 @@ async def get_dashboard_stats(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        # Get all requests in the time period
-        requests_cursor = db["requestProgress"].find({
-            "lastUpdatedAt": {"$gte": start_date, "$lte": end_date}
-        })
-        requests = await requests_cursor.to_list(None)
-        
-        total_requests = len(requests)
-        
-        # Count by status
-        status_counts = {}
-        for request in requests:
-            status = request.get("status", "UNKNOWN")
-            status_counts[status] = status_counts.get(status, 0) + 1
+        if DASHBOARD_STATS_SOURCE == "raw":
+            # Count per status in the database; only (lastUpdatedAt, status) is read,
+            # so the compound index answers the whole pipeline
+            pipeline = [
+                {"$match": {"lastUpdatedAt": {"$gte": start_date, "$lte": end_date}}},
+                # Statuses are stored lowercase by RequestStatus; the counts below use upper case
+                {"$group": {"_id": {"$toUpper": {"$ifNull": ["$status", "UNKNOWN"]}}, "count": {"$sum": 1}}}
+            ]
+            status_counts = {
+                group["_id"]: group["count"]
+                async for group in db["requestProgress"].aggregate(pipeline)
+            }
+        elif DASHBOARD_STATS_SOURCE == "rollups":
+            # Closed days from dashboardDaily, the rest live
+            status_counts = await get_dashboard_rollups().read_status_totals(db, start_date, end_date)
+        else:
+            # Sum of the per-day counters kept up to date by every requestProgress write
+            status_counts = await read_status_totals(db, start_date, end_date)
+        total_requests = sum(status_counts.values())
         
         pending_requests = status_counts.get("IN_PROGRESS", 0) + status_counts.get("PROCESSING", 0)
         completed_requests = status_counts.get("COMPLETED", 0)
@@ -87,103 +118,177 @@ async def get_dashboard_stats(
 
 @router.get("/dashboard/requests")
 async def get_recent_requests(
+    request: Request,
     limit: int = Query(20, description="Number of requests to return"),
     status: Optional[str] = Query(None, description="Filter by status"),
-    user_id: Optional[str] = Query(None, description="Filter by user ID")
+    user_id: Optional[str] = Query(None, description="Filter by user ID"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
 ) -> List[RequestSummary]:
     """
     Get recent preauth requests with summary information
-    """  
+    The cursor of the following page is returned in the X-Next-Cursor header.
+    Served from the shared dashboard cache; supports If-None-Match
+    """
+    async def compute():
+        results, next_cursor = await load_recent_requests(limit, status, user_id, cursor)
+        return results, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return await get_dashboard_cache().respond(request, compute)
+
+async def load_recent_requests(
+    limit: int,
+    status: Optional[str],
+    user_id: Optional[str],
+    cursor: Optional[str]
+) -> Tuple[List[RequestSummary], Optional[str]]:
     db = get_db()
     
     try:
         # Build query filter
-        query_filter = {}
+        query_filter = keyset_filter("lastUpdatedAt", "requestId", cursor)
         if status:
             query_filter["status"] = status
         
-        # Get request progress data
-        progress_cursor = db["requestProgress"].find(query_filter).sort([("lastUpdatedAt", -1)]).limit(limit)
-        progress_data = await progress_cursor.to_list(None)
+        # One round trip: the page of progress documents joined with the original
+        # request and the pending action count; every join is an indexed equality on requestId
+        pipeline = [
+            {"$match": query_filter},
+            {"$sort": {"lastUpdatedAt": -1, "requestId": -1}},
+            {"$limit": limit},
+            {"$lookup": {
+                "from": "priorAuthRequest",
+                "localField": "requestId",
+                "foreignField": "requestId",
+                "pipeline": [
+                    {"$limit": 1},
+                    {"$project": {"_id": 0, "patientName": 1, "payerId": 1, "userId": 1, "createdAt": 1}}
+                ],
+                "as": "original_request"
+            }},
+            # Count pending user actions
+            {"$lookup": {
+                "from": "priorAuthUserAction",
+                "localField": "requestId",
+                "foreignField": "requestId",
+                "pipeline": [
+                    {"$match": {"actionStatus": "PENDING"}},
+                    {"$count": "count"}
+                ],
+                "as": "pending_actions"
+            }},
+            {"$project": {
+                "_id": 0,
+                "requestId": 1,
+                "status": 1,
+                "lastUpdatedAt": 1,
+                "workflowStep": 1,
+                "original_request": 1,
+                "pending_actions": 1
+            }}
+        ]
         
         results = []
-        for progress in progress_data:
-            request_id = progress["requestId"]
-            
-            # Get original request details
-            original_request = await db["priorAuthRequest"].find_one({"requestId": request_id})
-            if not original_request:
+        rows = 0
+        last_row = None
+        async for row in db["requestProgress"].aggregate(pipeline):
+            rows += 1
+            last_row = row
+            # Requests without an original request are skipped, as before
+            if not row["original_request"]:
                 continue
+            original_request = row["original_request"][0]
             
-            # Filter by user_id if specified
+            # Filter by user_id if specified; the cursor still advances past skipped rows
             if user_id and original_request.get("userId") != user_id:
                 continue
             
-            # Count pending user actions
-            user_actions_count = await db["priorAuthUserAction"].count_documents({
-                "requestId": request_id,
-                "actionStatus": "PENDING"
-            })
+            pending_actions = row["pending_actions"]
             
             results.append(RequestSummary(
-                request_id=request_id,
+                request_id=row["requestId"],
                 patient_name=original_request.get("patientName", "Unknown"),
                 payer_id=original_request.get("payerId", "Unknown"),
-                status=progress.get("status", "UNKNOWN"),
+                status=row.get("status", "UNKNOWN"),
                 created_at=original_request.get("createdAt"),
-                last_updated=progress.get("lastUpdatedAt"),
-                current_step=progress.get("workflowStep"),
-                user_actions_pending=user_actions_count
+                last_updated=row.get("lastUpdatedAt"),
+                current_step=row.get("workflowStep"),
+                user_actions_pending=pending_actions[0]["count"] if pending_actions else 0
             ))
         
-        return results
+        next_cursor = None
+        if rows == limit:
+            next_cursor = encode_cursor(last_row["lastUpdatedAt"], last_row["requestId"])
+        return results, next_cursor
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/dashboard/user-actions")
 async def get_pending_user_actions(
+    response: Response,
     user_id: Optional[str] = Query(None, description="Filter by user ID"),
-    limit: int = Query(10, description="Number of actions to return")
+    limit: int = Query(10, description="Number of actions to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
 ) -> List[UserActionSummary]:
     """
     Get pending user actions that require attention
+    The cursor of the following page is returned in the X-Next-Cursor header
     """  
     db = get_db()
     
     try:
         # Build query filter
-        query_filter = {"actionStatus": "PENDING"}
+        query_filter = keyset_filter("requestedAt", "id", cursor)
+        query_filter["actionStatus"] = "PENDING"
         if user_id:
             query_filter["userId"] = user_id
         
         # Get pending user actions
-        actions_cursor = db["priorAuthUserAction"].find(query_filter).sort([("requestedAt", -1)]).limit(limit)
+        actions_cursor = db["priorAuthUserAction"].find(query_filter).sort([("requestedAt", -1), ("id", -1)]).limit(limit)
         actions = await actions_cursor.to_list(None)
         
+        # Get patient names from the original requests in one query; actions often share a request
+        patient_names = await load_patient_names(db, {action["requestId"] for action in actions})
+        
         results = []
         for action in actions:
             request_id = action["requestId"]
             
-            # Get patient name from original request
-            original_request = await db["priorAuthRequest"].find_one({"requestId": request_id})
-            patient_name = original_request.get("patientName", "Unknown") if original_request else "Unknown"
-            
             results.append(UserActionSummary(
                 action_id=action["id"],
                 request_id=request_id,
-                patient_name=patient_name,
+                patient_name=patient_names.get(request_id, "Unknown"),
                 action_type=action["actionType"],
                 action_status=action["actionStatus"],
                 requested_at=action["requestedAt"],
                 metadata=action.get("metadata")
             ))
         
+        if len(actions) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(actions[-1]["requestedAt"], actions[-1]["id"])
         return results
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def load_patient_names(db, request_ids) -> Dict[str, str]:
+    """
+    Map request ids to patient names with a single $in query on priorAuthRequest
+    """
+    if not request_ids:
+        return {}
+    cursor = db["priorAuthRequest"].find(
+        {"requestId": {"$in": list(request_ids)}},
+        {"_id": 0, "requestId": 1, "patientName": 1}
+    )
+    return {
+        original_request["requestId"]: original_request.get("patientName", "Unknown")
+        async for original_request in cursor
+    }
+
 @router.get("/dashboard/request-details/{request_id}")
 async def get_request_details(request_id: str):
     """
@@ -192,28 +297,14 @@ async def get_request_details(request_id: str):
     db = get_db()
     
     try:
-        # Get request progress
-        progress = await db["requestProgress"].find_one({"requestId": request_id})
-        if not progress:
+        bundle = await load_request_bundle(db, request_id)
+        if not bundle["progress"]:
             raise HTTPException(status_code=404, detail="Request not found")
         
-        # Get original request
-        original_request = await db["priorAuthRequest"].find_one({"requestId": request_id})
-        
-        # Get all user actions
-        user_actions_cursor = db["priorAuthUserAction"].find({"requestId": request_id}).sort([("requestedAt", 1)])
-        user_actions = await user_actions_cursor.to_list(None)
-        
-        # Get conversation history if it exists
-        conversation_history = await db.conversationHistory.find({"requestId": request_id}).to_list(None)
-        
         return {
             "request_id": request_id,
-            "progress": progress,
-            "original_request": original_request,
-            "user_actions": user_actions,
-            "conversation_history": conversation_history,
-            "timeline": await build_request_timeline(db, request_id),
+            **bundle,
+            "timeline": timeline_from_bundle(bundle),
             "http_status": HttpResponseEnum.OK
         }
         
@@ -222,14 +313,39 @@ async def get_request_details(request_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def load_request_bundle(db, request_id: str) -> Dict[str, Any]:
+    """
+    Load everything stored for a request with concurrent queries (one per collection)
+    """
+    # ObjectIds are not JSON serializable and are not part of the payload
+    projection = {"_id": 0}
+    progress, original_request, user_actions, conversation_history = await asyncio.gather(
+        db["requestProgress"].find_one({"requestId": request_id}, projection),
+        db["priorAuthRequest"].find_one({"requestId": request_id}, projection),
+        db["priorAuthUserAction"].find({"requestId": request_id}, projection).sort([("requestedAt", 1)]).to_list(None),
+        db.conversationHistory.find({"requestId": request_id}, projection).to_list(None)
+    )
+    return {
+        "progress": progress,
+        "original_request": original_request,
+        "user_actions": user_actions,
+        "conversation_history": conversation_history
+    }
+
 async def build_request_timeline(db, request_id: str) -> List[Dict[str, Any]]:
     """
     Build a timeline of events for a request
     """
+    return timeline_from_bundle(await load_request_bundle(db, request_id))
+
+def timeline_from_bundle(bundle: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Build the timeline of a request from its loaded bundle (no queries)
+    """
     timeline = []
     
     # Add original request creation
-    original_request = await db["priorAuthRequest"].find_one({"requestId": request_id})
+    original_request = bundle["original_request"]
     if original_request:
         timeline.append({
             "timestamp": original_request["createdAt"],
@@ -239,7 +355,7 @@ async def build_request_timeline(db, request_id: str) -> List[Dict[str, Any]]:
         })
     
     # Add progress updates (we could store these separately for better timeline)
-    progress = await db["requestProgress"].find_one({"requestId": request_id})
+    progress = bundle["progress"]
     if progress:
         timeline.append({
             "timestamp": progress["lastUpdatedAt"],
@@ -249,10 +365,7 @@ async def build_request_timeline(db, request_id: str) -> List[Dict[str, Any]]:
         })
     
     # Add user actions
-    user_actions_cursor = db["priorAuthUserAction"].find({"requestId": request_id}).sort([("requestedAt", 1)])
-    user_actions = await user_actions_cursor.to_list(None)
-    
-    for action in user_actions:
+    for action in bundle["user_actions"]:
         timeline.append({
             "timestamp": action["requestedAt"],
             "event": "USER_ACTION",
@@ -271,11 +384,18 @@ async def build_request_timeline(db, request_id: str) -> List[Dict[str, Any]]:
 
 @router.get("/dashboard/payer-stats")
 async def get_payer_statistics(
+    request: Request,
     days: int = Query(30, description="Number of days to look back")
 ):
     """
     Get statistics grouped by payer
+    Served from the shared dashboard cache; supports If-None-Match
     """ 
+    async def compute():
+        return await compute_payer_statistics(days), {}
+    return await get_dashboard_cache().respond(request, compute)
+
+async def compute_payer_statistics(days: int) -> Dict[str, Any]:
     db = get_db()
     
     try:
@@ -283,41 +403,44 @@ async def get_payer_statistics(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        # Aggregate requests by payer
-        pipeline = [
-            {
-                "$match": {
-                    "createdAt": {"$gte": start_date, "$lte": end_date}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$payerId",
-                    "total_requests": {"$sum": 1},
-                    "requests": {"$push": "$requestId"}
-                }
-            }
-        ]
+        if DASHBOARD_STATS_SOURCE == "raw":
+            # Requests created in the window, joined with their progress status and
+            # grouped by (payer, status) in a single round trip
+            pipeline = [
+                {"$match": {"createdAt": {"$gte": start_date, "$lte": end_date}}},
+                {"$project": {"_id": 0, "payerId": 1, "requestId": 1}},
+                {"$lookup": {
+                    "from": "requestProgress",
+                    "localField": "requestId",
+                    "foreignField": "requestId",
+                    "pipeline": [{"$limit": 1}, {"$project": {"_id": 0, "status": 1}}],
+                    "as": "progress"
+                }},
+                {"$group": {
+                    "_id": {
+                        "payerId": "$payerId",
+                        # Requests without progress count towards the total only
+                        "status": {"$toUpper": {"$ifNull": [{"$first": "$progress.status"}, "UNKNOWN"]}}
+                    },
+                    "count": {"$sum": 1}
+                }}
+            ]
+            payer_totals = {}
+            async for group in db["priorAuthRequest"].aggregate(pipeline):
+                status_counts = payer_totals.setdefault(group["_id"].get("payerId"), {})
+                status_counts[group["_id"]["status"]] = group["count"]
+        elif DASHBOARD_STATS_SOURCE == "rollups":
+            # Closed days from dashboardDaily, the rest live
+            payer_totals = await get_dashboard_rollups().read_status_totals(db, start_date, end_date, by_payer=True)
+        else:
+            # Status counts per payer from the materialized counters; no per-request lookups
+            payer_totals = await read_payer_status_totals(db, start_date, end_date)
         
-        payer_groups = await db["priorAuthRequest"].aggregate(pipeline).to_list(None)
-        
-        # Get status information for each payer's requests
         payer_stats = []
-        for group in payer_groups:
-            payer_id = group["_id"]
-            request_ids = group["requests"]
-            
-            # Get status counts for this payer's requests
-            status_counts = {}
-            for request_id in request_ids:
-                progress = await db["requestProgress"].find_one({"requestId": request_id})
-                if progress:
-                    status = progress.get("status", "UNKNOWN")
-                    status_counts[status] = status_counts.get(status, 0) + 1
-            
+        for payer_id, status_counts in payer_totals.items():
             # Calculate success rate
             completed = status_counts.get("COMPLETED", 0)
-            total = group["total_requests"]
+            total = sum(status_counts.values())
             success_rate = (completed / total * 100) if total > 0 else 0
             
             payer_stats.append({
@@ -333,12 +456,248 @@ async def get_payer_statistics(
         return {
             "payer_statistics": payer_stats,
             "period_days": days,
+            # raw selects requests created in the window; counters/rollups requests last updated in it
+            "windowed_by": "createdAt" if DASHBOARD_STATS_SOURCE == "raw" else "lastUpdatedAt",
+            "http_status": HttpResponseEnum.OK
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/dashboard/latency")
+async def get_turnaround_latency(
+    request: Request,
+    days: int = Query(7, description="Number of days to look back"),
+    granularity: str = Query("hour", pattern="^(hour|day)$", description="Throughput bucket size: hour or day")
+):
+    """
+    Get CREATED -> COMPLETED turnaround percentiles per payer and bucketed throughput
+    Served from the shared dashboard cache; supports If-None-Match
+    """
+    async def compute():
+        return await compute_turnaround_latency(days, granularity), {}
+    return await get_dashboard_cache().respond(request, compute)
+
+async def compute_turnaround_latency(days: int, granularity: str) -> Dict[str, Any]:
+    db = get_db()
+    
+    try:
+        # Calculate date range
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        
+        turnaround_stats = {
+            "completed_requests": {"$sum": 1},
+            "p": {"$percentile": {"input": "$turnaround_seconds", "p": [0.5, 0.9, 0.99], "method": "approximate"}},
+            "mean": {"$avg": "$turnaround_seconds"},
+            "max": {"$max": "$turnaround_seconds"}
+        }
+        # Requests completed in the window; completedAt is set by /n8n/complete and
+        # createdAt comes from the original request
+        latency_pipeline = [
+            {"$match": {"completedAt": {"$gte": start_date, "$lte": end_date}}},
+            {"$project": {"_id": 0, "requestId": 1, "completedAt": 1}},
+            {"$lookup": {
+                "from": "priorAuthRequest",
+                "localField": "requestId",
+                "foreignField": "requestId",
+                "pipeline": [{"$limit": 1}, {"$project": {"_id": 0, "payerId": 1, "createdAt": 1}}],
+                "as": "original_request"
+            }},
+            {"$unwind": "$original_request"},
+            {"$project": {
+                "payerId": "$original_request.payerId",
+                "turnaround_seconds": {
+                    "$dateDiff": {
+                        "startDate": "$original_request.createdAt",
+                        "endDate": "$completedAt",
+                        "unit": "millisecond"
+                    }
+                }
+            }},
+            {"$match": {"turnaround_seconds": {"$gte": 0}}},
+            {"$set": {"turnaround_seconds": {"$divide": ["$turnaround_seconds", 1000]}}},
+            {"$facet": {
+                "by_payer": [{"$group": {"_id": "$payerId", **turnaround_stats}}, {"$sort": {"_id": 1}}],
+                "overall": [{"$group": {"_id": None, **turnaround_stats}}]
+            }}
+        ]
+        created_pipeline = [
+            {"$match": {"createdAt": {"$gte": start_date, "$lte": end_date}}},
+            {"$group": {"_id": {"$dateTrunc": {"date": "$createdAt", "unit": granularity}}, "count": {"$sum": 1}}}
+        ]
+        completed_pipeline = [
+            {"$match": {"completedAt": {"$gte": start_date, "$lte": end_date}}},
+            {"$group": {"_id": {"$dateTrunc": {"date": "$completedAt", "unit": granularity}}, "count": {"$sum": 1}}}
+        ]
+        latency, created, completed = await asyncio.gather(
+            db["requestProgress"].aggregate(latency_pipeline).to_list(None),
+            db["priorAuthRequest"].aggregate(created_pipeline).to_list(None),
+            db["requestProgress"].aggregate(completed_pipeline).to_list(None)
+        )
+        facets = latency[0] if latency else {"by_payer": [], "overall": []}
+        
+        # Merge created and completed counts into one series of buckets
+        buckets: Dict[datetime, Dict[str, Any]] = {}
+        for name, groups in (("created", created), ("completed", completed)):
+            for group in groups:
+                bucket = buckets.setdefault(group["_id"], {"bucket": group["_id"], "created": 0, "completed": 0})
+                bucket[name] = group["count"]
+        
+        return {
+            "turnaround_seconds": {
+                "overall": turnaround_summary(facets["overall"][0]) if facets["overall"] else None,
+                "by_payer": [
+                    {"payer_id": group["_id"], **turnaround_summary(group)}
+                    for group in facets["by_payer"]
+                ]
+            },
+            "throughput": [buckets[key] for key in sorted(buckets)],
+            "granularity": granularity,
+            "period_days": days,
             "http_status": HttpResponseEnum.OK
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def turnaround_summary(group: Dict[str, Any]) -> Dict[str, Any]:
+    p50, p90, p99 = group["p"]
+    return {
+        "completed_requests": group["completed_requests"],
+        "p50": round(p50, 3),
+        "p90": round(p90, 3),
+        "p99": round(p99, 3),
+        "mean": round(group["mean"], 3),
+        "max": round(group["max"], 3)
+    }
+
+@router.get("/dashboard/export")
+async def export_requests(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    from_date: Optional[datetime] = Query(None, alias="from", description="Requests created at or after"),
+    to_date: Optional[datetime] = Query(None, alias="to", description="Requests created at or before"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=5000, description="Requests read and enriched per batch")
+):
+    """
+    Export requests with their progress and user actions
+    Streamed batch by batch from the database, so any range can be exported
+    """
+    db = get_db()
+    batches = export_batches(db, from_date, to_date, batch_size)
+    filename = f"requests-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{format}"
+    if format == "csv":
+        content, media_type = stream_csv(batches), "text/csv"
+    else:
+        content, media_type = stream_ndjson(batches), "application/x-ndjson"
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/dashboard/search")
+async def search_dashboard_requests(
+    q: Optional[str] = Query(None, min_length=1, description="Patient name or id prefix, or words from the remarks"),
+    payer_id: Optional[str] = Query(None, description="Only requests of this payer"),
+    offset: int = Query(0, ge=0, description="Results to skip"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return")
+):
+    """
+    Search requests by patient name/id prefix and remarks text, ordered by relevance
+    """
+    if not q and not payer_id:
+        raise HTTPException(status_code=400, detail="Provide a search term (q) or a payer_id")
+    db = get_db()
+    
+    try:
+        page = await search_requests(db, q, payer_id=payer_id, offset=offset, limit=limit)
+        return {
+            **page,
+            "http_status": HttpResponseEnum.OK
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/dashboard/counters/rebuild")
+async def rebuild_dashboard_counters():
+    """
+    Recompute the materialized status counters from requestProgress
+    """
+    db = get_db()
+    
+    try:
+        counters = await rebuild_status_counters(db)
+        get_dashboard_cache().invalidate()
+        return {
+            "success": True,
+            "counters": counters,
+            "http_status": HttpResponseEnum.OK
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/dashboard/stream")
+async def stream_dashboard_events(
+    request: Request,
+    request_id: Optional[str] = Query(None, description="Only changes of this request"),
+    payer_id: Optional[str] = Query(None, description="Only changes of this payer's requests"),
+    user_id: Optional[str] = Query(None, description="Only changes of this user's requests")
+):
+    """
+    Server-Sent Events feed of request status changes
+    Each requestProgress write is sent once as a `progress` event; a `dropped` event
+    tells a client that fell behind how many events it missed
+    """
+    broadcaster = get_progress_broadcaster()
+    subscriber = broadcaster.subscribe(request_id=request_id, payer_id=payer_id, user_id=user_id)
+    
+    async def events():
+        reported_drops = 0
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=DASHBOARD_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if subscriber.dropped != reported_drops:
+                    yield f"event: dropped\ndata: {json.dumps({'dropped': subscriber.dropped - reported_drops})}\n\n"
+                    reported_drops = subscriber.dropped
+                data = json.dumps(jsonable_encoder(event), separators=(",", ":"))
+                yield f"id: {event['id']}\nevent: progress\ndata: {data}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/dashboard/stream/stats")
+async def get_dashboard_stream_stats():
+    """
+    Subscribers and delivery counts of the live dashboard feed
+    """
+    return {
+        "stream": get_progress_broadcaster().stats(),
+        "http_status": HttpResponseEnum.OK
+    }
+
+@router.get("/dashboard/cache/stats")
+async def get_dashboard_cache_stats():
+    """
+    Hit rate and size of the shared dashboard response cache
+    """
+    return {
+        "cache": get_dashboard_cache().stats(),
+        "http_status": HttpResponseEnum.OK
+    }
+
 @router.post("/dashboard/mark-action-completed/{action_id}")
 async def mark_user_action_completed(action_id: str, response_data: Dict[str, Any]):
     """
@@ -362,6 +721,9 @@ async def mark_user_action_completed(action_id: str, response_data: Dict[str, An
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="User action not found")
         
+        # Pending action counts in /dashboard/requests changed
+        get_dashboard_cache().invalidate()
+        
         return {
             "success": True,
             "message": "User action marked as completed",
@@ -6,6 +6,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
 from db.config.connection import get_db
+from db.dashboard_cache import get_dashboard_cache
+from db.request_progress import update_request_progress
 from db.models.dbmodels.requestProgress import RequestStatus
 from db.models.dbmodels.priorAuthUserAction import priorAuthUserAction
 from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
@@ -51,18 +53,13 @@ async def n8n_callback(req: N8NCallbackRequest):
         internal_status = status_mapping.get(req.status.lower(), RequestStatus.IN_PROGRESS)
         
         # Update request progress
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": internal_status,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": f"N8N Update: {req.message}",
-                    "workflowStep": req.workflow_step,
-                    "metadata": req.metadata or {}
-                }
-            }
-        )
+        await update_request_progress(db, req.request_id, {
+            "status": internal_status,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": f"N8N Update: {req.message}",
+            "workflowStep": req.workflow_step,
+            "metadata": req.metadata or {}
+        })
         
         # If user action is required, create a user action record
         if req.user_action_required and req.action_type:
@@ -80,6 +77,8 @@ async def n8n_callback(req: N8NCallbackRequest):
                     metadata=req.screenshot_url or json.dumps(req.metadata or {})
                 )
                 await db["priorAuthUserAction"].insert_one(user_action.dict())
+                # A dashboard page cached since the progress write lacks this action
+                get_dashboard_cache().invalidate()
         
         return N8NCallbackResponse(
             success=True,
@@ -90,16 +89,11 @@ async def n8n_callback(req: N8NCallbackRequest):
     except Exception as e:
         # Update request with error status
         try:
-            await db["requestProgress"].update_one(
-                {"requestId": req.request_id},
-                {
-                    "$set": {
-                        "status": RequestStatus.FAILED,
-                        "lastUpdatedAt": datetime.now(),
-                        "remarks": f"Callback processing error: {str(e)}"
-                    }
-                }
-            )
+            await update_request_progress(db, req.request_id, {
+                "status": RequestStatus.FAILED,
+                "lastUpdatedAt": datetime.now(),
+                "remarks": f"Callback processing error: {str(e)}"
+            })
         except:
             pass  # Don't fail if we can't update the status
             
@@ -136,10 +130,7 @@ async def update_workflow_status(request_id: str, status_data: Dict[str, Any]):
         if "message" in status_data:
             update_data["remarks"] = f"Workflow: {status_data['message']}"
         
-        await db["requestProgress"].update_one(
-            {"requestId": request_id},
-            {"$set": update_data}
-        )
+        await update_request_progress(db, request_id, update_data)
         
         return {
             "success": True,
@@ -177,16 +168,11 @@ async def save_screenshot(request_id: str, screenshot_data: Dict[str, Any]):
         await db["priorAuthUserAction"].insert_one(user_action.dict())
         
         # Also update the request progress
-        await db["requestProgress"].update_one(
-            {"requestId": request_id},
-            {
-                "$set": {
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": "Screenshot captured",
-                    "latestScreenshot": screenshot_data.get("screenshot_url")
-                }
-            }
-        )
+        await update_request_progress(db, request_id, {
+            "lastUpdatedAt": datetime.now(),
+            "remarks": "Screenshot captured",
+            "latestScreenshot": screenshot_data.get("screenshot_url")
+        })
         
         return {
             "success": True,
@@ -240,18 +226,13 @@ async def complete_workflow(request_id: str, completion_data: Dict[str, Any]):
     
     try:
         # Update request progress to completed
-        await db["requestProgress"].update_one(
-            {"requestId": request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.COMPLETED,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": f"Workflow completed: {completion_data.get('message', 'Success')}",
-                    "completionData": completion_data,
-                    "completedAt": datetime.now()
-                }
-            }
-        )
+        await update_request_progress(db, request_id, {
+            "status": RequestStatus.COMPLETED,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": f"Workflow completed: {completion_data.get('message', 'Success')}",
+            "completionData": completion_data,
+            "completedAt": datetime.now()
+        })
         
         # Create a completion user action record
         original_request = await db["priorAuthRequest"].find_one({"requestId": request_id})
@@ -267,6 +248,7 @@ async def complete_workflow(request_id: str, completion_data: Dict[str, Any]):
                 metadata=json.dumps(completion_data)
             )
             await db["priorAuthUserAction"].insert_one(user_action.dict())
+            get_dashboard_cache().invalidate()
         
         return {
             "success": True,
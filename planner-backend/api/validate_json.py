@@ -2,94 +2,166 @@ import json
 import os
 from datetime import datetime
 
-from jsonschema import validate, ValidationError
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from jsonschema.exceptions import SchemaError
 
 from db.config.connection import get_db
+from db.request_progress import update_request_progress
 from db.models.dbmodels.requestProgress import RequestStatus
 from db.models.requestModels.validationRequest import ValidationRequest
 from db.models.requestModels.jsonValidatorRequest import JsonValidatorRequest
-from db.models.responseModels.jsonValidatorResponse import JsonValidatorResponse
+from db.models.requestModels.payerRulesetRequest import PayerRulesetRequest
 from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
+from validation.batch import RequestStreamingResponse, stream_batch_results
+from validation.payload import get_payer_id_from_json
+from validation.metrics import get_validation_metrics
+from validation.pool import pool_metrics
+from validation.registry import get_validator_registry
+from validation.ruleset_store import get_payer_ruleset_store
+from validation.service import content_length, get_validation_service
 
 router = APIRouter()
 
+# Records handed to one worker process at a time by /validate-json/batch
+BATCH_CHUNK_SIZE = int(os.getenv("VALIDATION_BATCH_CHUNK_SIZE", "500"))
+
 def load_validation_rules():
-    """Load validation rules from all_rules.json"""
+    """Load validation rules from all_rules.json (served from the compiled registry)"""
     try:
-        rules_path = os.path.join(os.path.dirname(__file__), '..', 'rulesets', 'all_rules.json')
-        with open(rules_path, 'r') as file:
-            return json.load(file)
+        snapshot = get_validator_registry().snapshot()
+        return {payer_id: compiled.schema for payer_id, compiled in snapshot.payers.items()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load validation rules: {str(e)}")
 
-def get_payer_id_from_json(json_data):
-    """Extract payer ID from JSON data"""
-    try:
-        if isinstance(json_data, dict) and 'response' in json_data:
-            if isinstance(json_data['response'], list) and len(json_data['response']) > 0:
-                return json_data['response'][0].get('payerid')
-    except Exception:
-        pass
-    return None
-
 @router.post("/validate-json")
-async def validate_json_payload(req: JsonValidatorRequest):
+async def validate_json_payload(req: JsonValidatorRequest, request: Request = None):
     """
     Endpoint to validate JSON payload against payer-specific rules.
     This API is called after the planner-agent API and after JSON is fetched using get_patientdetails.
     """
+    return await get_validation_service().validate(req.json_data, body_bytes=content_length(request))
+
+@router.post("/validate-json/multi-payer")
+async def validate_json_multi_payer(req: JsonValidatorRequest):
+    """
+    Validate a mixed-payer payload in one call.
+    Items of `response` are grouped by their own payerid and each group is validated
+    against that payer's rules; the result is broken down per payer.
+    """
+    return await get_validation_service().validate_multi_payer(req.json_data)
+
+@router.post("/validate-json/stream")
+async def validate_json_stream(
+    request: Request,
+    fail_fast: bool = Query(False, description="Stop at the first failing item")
+):
+    """
+    Validate a {"json_data": {...}} body while it streams in.
+    Items of json_data.response are parsed and validated one at a time, so memory stays
+    flat however many items the payload has; with fail_fast the rest of the body is not read.
+    """
+    return await get_validation_service().validate_stream(request.stream(), fail_fast=fail_fast)
+
+@router.post("/validate-json/batch")
+async def validate_json_batch(
+    request: Request,
+    chunk_size: int = Query(BATCH_CHUNK_SIZE, ge=1, description="Records per worker chunk")
+):
+    """
+    Validate an NDJSON stream of {"request_id": ..., "json_data": {...}} records.
+    Streams back one NDJSON line per record (request_id plus the JsonValidatorResponse
+    fields) as chunks finish, followed by a summary line with per-payer throughput.
+    """
+    return RequestStreamingResponse(
+        stream_batch_results(request.stream(), get_validator_registry(), chunk_size),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/validate-json/metrics", response_class=PlainTextResponse)
+async def get_validation_metrics_prometheus():
+    """
+    Per-payer validation latency histograms and failure counts by path:keyword
+    (/api/validate-json and TOOL 4) in Prometheus text format
+    """
+    return PlainTextResponse(get_validation_metrics().prometheus(), media_type="text/plain; version=0.0.4")
+
+@router.get("/validate-json/metrics/summary")
+async def get_validation_metrics_summary(
+    top: int = Query(10, ge=1, le=100, description="Most frequent failures to list per payer")
+):
+    """Per-payer validation counts, latency percentiles and most frequent failures"""
+    return {
+        **get_validation_metrics().summary(top_failures=top),
+        "http_status": HttpResponseEnum.OK
+    }
+
+@router.get("/validate-json/registry")
+async def get_validation_registry_stats():
+    """
+    Report the compiled validator registry (ruleset version, compile time, lookup hit rate)
+    plus the result cache, session, offload and pool queue-depth counters
+    """
+    service = get_validation_service()
+    cache, incremental = service.cache, service.incremental
+    return {
+        "registry": get_validator_registry().stats(),
+        "result_cache": cache.stats() if cache is not None else None,
+        "incremental_sessions": incremental.stats() if incremental is not None else None,
+        "multi_payer": service.multi_payer.stats(),
+        "offload": service.offload_stats(),
+        "pool": pool_metrics.stats(),
+        "ruleset_store": get_payer_ruleset_store().stats(),
+        "http_status": HttpResponseEnum.OK
+    }
+
+@router.get("/payers/{payer_id}/ruleset")
+async def get_payer_ruleset(payer_id: str):
+    """
+    Get the stored validation ruleset for a payer
+    """
+    db = get_db()
+    
     try:
-        # Load validation rules
-        all_rules = load_validation_rules()
-        
-        # Extract payer ID from the JSON data
-        payer_id = get_payer_id_from_json(req.json_data)
-        
-        if not payer_id:
-            return JsonValidatorResponse(
-                is_valid=False,
-                http_status=HttpResponseEnum.BAD_REQUEST,
-                error_message="Unable to extract payer ID from JSON data"
-            )
+        ruleset = await get_payer_ruleset_store().get(db, payer_id)
+        if not ruleset:
+            raise HTTPException(status_code=404, detail=f"No stored ruleset for payer ID: {payer_id}")
         
-        # Check if we have validation rules for this payer
-        if payer_id not in all_rules:
-            return JsonValidatorResponse(
-                is_valid=False,
-                http_status=HttpResponseEnum.BAD_REQUEST,
-                error_message=f"No validation rules found for payer ID: {payer_id}"
-            )
+        return {
+            "payer_id": payer_id,
+            "version": ruleset["version"],
+            "rules": json.loads(ruleset["schemaJson"]),
+            "updated_at": ruleset.get("updatedAt"),
+            "updated_by": ruleset.get("updatedBy"),
+            "http_status": HttpResponseEnum.OK
+        }
         
-        # Get the validation schema for this payer
-        payer_schema = all_rules[payer_id]
-        
-        # Validate the JSON data against the schema
-        try:
-            validate(instance=req.json_data, schema=payer_schema)
-            
-            # If validation passes
-            return JsonValidatorResponse(
-                is_valid=True,
-                http_status=HttpResponseEnum.OK,
-                error_message=None
-            )
-            
-        except ValidationError as ve:
-            # If validation fails
-            return JsonValidatorResponse(
-                is_valid=False,
-                http_status=HttpResponseEnum.BAD_REQUEST,
-                error_message=f"JSON validation failed: {ve.message}"
-            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/payers/{payer_id}/ruleset")
+async def save_payer_ruleset(payer_id: str, req: PayerRulesetRequest):
+    """
+    Create or replace a payer's validation ruleset.
+    Bumps the payer's version; every worker picks it up on its next poll.
+    """
+    db = get_db()
     
+    try:
+        ruleset = await get_payer_ruleset_store().save(db, payer_id, req.rules, req.updated_by)
+        return {
+            "payer_id": payer_id,
+            "version": ruleset["version"],
+            "message": "Payer ruleset saved successfully",
+            "http_status": HttpResponseEnum.OK
+        }
+        
+    except SchemaError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON Schema: {e.message}")
     except Exception as e:
-        # Handle any other exceptions
-        return JsonValidatorResponse(
-            is_valid=False,
-            http_status=HttpResponseEnum.INTERNAL_SERVER_ERROR,
-            error_message=f"Internal server error during validation: {str(e)}"
-        )
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/payers/{payer_id}/validate")
 async def validate_payer(req:ValidationRequest):
@@ -99,28 +171,18 @@ async def validate_payer(req:ValidationRequest):
 
         payer = await db.collections("priorAuthPayers").find_one({"id": req.payer_id})
         if payer:
-            await db["requestProgress"].update_one(
-                {"requestId": req.request_id},
-                {
-                    "$set": {
-                        "status": RequestStatus.VALIDATED,
-                        "lastUpdatedAt": datetime.now(),
-                        "remarks": "Payer info reterived successfully"
-                    }
-                }
-            )
+            await update_request_progress(db, req.request_id, {
+                "status": RequestStatus.VALIDATED,
+                "lastUpdatedAt": datetime.now(),
+                "remarks": "Payer info reterived successfully"
+            }, payer_id=req.payer_id)
             return {"status": HttpResponseEnum.OK, "message": "Payer validated successfully"}
         else:
             return {"status": HttpResponseEnum.NOT_FOUND, "message": "Payer not found"}
     except Exception as e:
-        await db["requestProgress"].update_one(
-            {"requestId": req.request_id},
-            {
-                "$set": {
-                    "status": RequestStatus.FAILED,
-                    "lastUpdatedAt": datetime.now(),
-                    "remarks": str(e)
-                }
-            }
-        )
+        await update_request_progress(db, req.request_id, {
+            "status": RequestStatus.FAILED,
+            "lastUpdatedAt": datetime.now(),
+            "remarks": str(e)
+        }, payer_id=req.payer_id)
         return {"status": HttpResponseEnum.INTERNAL_SERVER_ERROR, "message": str(e)}
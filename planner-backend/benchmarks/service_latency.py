@@ -0,0 +1,83 @@
+"""
+Before/after latency of TOOL 4 validation
+  before: POST /api/validate-json over HTTP with a fresh AsyncClient per call (old TOOL 4)
+  after:  ValidationService.validate() in-process (current TOOL 4)
+
+Usage (from planner-backend/):
+    python -m benchmarks.service_latency                      # HTTP leg through the app in-process (no TCP)
+    python -m benchmarks.service_latency --base-url http://host.docker.internal:8001   # HTTP leg against a running server
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from validation.service import get_validation_service
+
+SAMPLE_PAYLOAD = {
+    "response": [
+        {"payerid": "350007", "requestid": "bench-001", "cptcodes": "71271"}
+    ]
+}
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def _report(label, samples):
+    print(f"{label:28} p50={_percentile(samples, 50):8.3f} ms  "
+          f"p99={_percentile(samples, 99):8.3f} ms  mean={statistics.mean(samples):8.3f} ms")
+
+async def bench_http(payload, iterations, base_url=None):
+    if base_url is None:
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://benchmark"
+    else:
+        transport = None
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        # Mirrors the old TOOL 4: new client per validation
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.post(
+                f"{base_url}/api/validate-json",
+                json={"request_id": "bench", "json_data": payload},
+                timeout=30.0
+            )
+            response.json()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+async def bench_service(payload, iterations):
+    service = get_validation_service()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await service.validate(payload)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+async def main():
+    parser = argparse.ArgumentParser(description="TOOL 4 validation latency: HTTP loopback vs in-process")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--items", type=int, default=1, help="response items per payload")
+    parser.add_argument("--base-url", default=None, help="running server for the HTTP leg")
+    args = parser.parse_args()
+
+    payload = {"response": SAMPLE_PAYLOAD["response"] * args.items}
+    # Warm up the registry and both paths
+    await bench_service(payload, 10)
+    await bench_http(payload, 10, args.base_url)
+
+    print(f"Validating {args.items} item(s) x {args.iterations} iterations")
+    _report("before: HTTP /validate-json", await bench_http(payload, args.iterations, args.base_url))
+    _report("after: ValidationService", await bench_service(payload, args.iterations))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,400 @@
+"""
+Schema-driven benchmark of the payer validation paths
+Synthesizes valid and invalid payloads from every payer schema in the rules
+file (1, 100 and 10k `response` items by default) and times each validation
+variant, then writes a JSON report with p50/p99 latency and allocations.
+Runs fully offline: no Mongo, no server. TOOL 4 runs against a null
+database so only its validation and response building are measured.
+
+Usage (from planner-backend/):
+    python -m benchmarks.validation_suite                          # writes validation_report.json
+    python -m benchmarks.validation_suite --sizes 1,100 --output before.json
+    python -m benchmarks.validation_suite --rules new_rules.json --baseline before.json
+"""
+
+import argparse
+import asyncio
+import copy
+import dataclasses
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from importlib import metadata
+from typing import Any, Awaitable, Callable, Dict, List
+
+try:
+    import re._parser as sre_parse
+    from re._constants import (
+        ANY, AT, BRANCH, CATEGORY, CATEGORY_DIGIT, CATEGORY_NOT_DIGIT, CATEGORY_SPACE, CATEGORY_WORD,
+        IN, LITERAL, MAX_REPEAT, MIN_REPEAT, NEGATE, NOT_LITERAL, RANGE, SUBPATTERN
+    )
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import (
+        ANY, AT, BRANCH, CATEGORY, CATEGORY_DIGIT, CATEGORY_NOT_DIGIT, CATEGORY_SPACE, CATEGORY_WORD,
+        IN, LITERAL, MAX_REPEAT, MIN_REPEAT, NEGATE, NOT_LITERAL, RANGE, SUBPATTERN
+    )
+
+import jsonschema
+
+DEFAULT_SIZES = (1, 100, 10000)
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rulesets", "all_rules.json")
+
+# ============================================================================
+# Synthetic payloads
+# ============================================================================
+
+_CATEGORY_CHARS = {
+    CATEGORY_DIGIT: "0123456789",
+    CATEGORY_NOT_DIGIT: "abcXYZ",
+    CATEGORY_WORD: "abcxyzABC019_",
+    CATEGORY_SPACE: " ",
+}
+
+def _sample_regex(parsed, rng: random.Random) -> str:
+    """Produce one string matched by a parsed regular expression (common constructs only)"""
+    out = []
+    for op, arg in parsed:
+        if op == LITERAL:
+            out.append(chr(arg))
+        elif op == NOT_LITERAL:
+            out.append("a" if chr(arg) != "a" else "b")
+        elif op == ANY:
+            out.append("x")
+        elif op == IN:
+            out.append(_sample_class(arg, rng))
+        elif op == CATEGORY:
+            out.append(rng.choice(_CATEGORY_CHARS.get(arg, "a")))
+        elif op in (MAX_REPEAT, MIN_REPEAT):
+            low, high, sub = arg
+            high = low + 3 if high == sre_parse.MAXREPEAT else high
+            out.extend(_sample_regex(sub, rng) for _ in range(rng.randint(low, max(low, min(high, low + 3)))))
+        elif op == BRANCH:
+            out.append(_sample_regex(rng.choice(arg[1]), rng))
+        elif op == SUBPATTERN:
+            out.append(_sample_regex(arg[-1], rng))
+        elif op == AT:
+            continue
+        else:
+            raise ValueError(f"Unsupported regex construct for synthesis: {op}")
+    return "".join(out)
+
+def _sample_class(items, rng: random.Random) -> str:
+    if items and items[0][0] == NEGATE:
+        excluded = {chr(arg) for op, arg in items[1:] if op == LITERAL}
+        return next(ch for ch in "abcxyz0129" if ch not in excluded)
+    op, arg = rng.choice(items)
+    if op == LITERAL:
+        return chr(arg)
+    if op == RANGE:
+        return chr(rng.randint(arg[0], arg[1]))
+    if op == CATEGORY:
+        return rng.choice(_CATEGORY_CHARS.get(arg, "a"))
+    raise ValueError(f"Unsupported character class for synthesis: {op}")
+
+def synthesize(schema: Dict[str, Any], rng: random.Random, array_items: int = 1):
+    """Build an instance that satisfies `schema`; arrays get `array_items` elements"""
+    if "const" in schema:
+        return copy.deepcopy(schema["const"])
+    if "enum" in schema:
+        return copy.deepcopy(rng.choice(schema["enum"]))
+    schema_type = schema.get("type", "object" if "properties" in schema else "string")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+
+    if schema_type == "object":
+        return {
+            name: synthesize(prop_schema, rng, array_items)
+            for name, prop_schema in schema.get("properties", {}).items()
+        }
+    if schema_type == "array":
+        item_schema = schema.get("items", {})
+        count = max(array_items, schema.get("minItems", 0))
+        return [synthesize(item_schema, rng, 1) for _ in range(count)]
+    if schema_type == "string":
+        if "pattern" in schema:
+            value = _sample_regex(sre_parse.parse(schema["pattern"]), rng)
+        elif schema.get("format") == "date":
+            value = "2025-01-02"
+        else:
+            value = f"synthetic-{rng.randint(0, 10 ** 6)}"
+        if len(value) < schema.get("minLength", 0):
+            value = value.ljust(schema["minLength"], "x")
+        return value
+    if schema_type == "integer":
+        return int(schema.get("minimum", 1))
+    if schema_type == "number":
+        return float(schema.get("minimum", 1.5))
+    if schema_type == "boolean":
+        return True
+    return None
+
+def _response_item_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    return schema.get("properties", {}).get("response", {}).get("items", {})
+
+def make_invalid(payload: Dict[str, Any], schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Break the last response item so every validator has to walk the whole array:
+    drop a required field, or else give a constrained field the wrong type
+    """
+    invalid = copy.deepcopy(payload)
+    item_schema = _response_item_schema(schema)
+    last = invalid["response"][-1]
+    required = [name for name in item_schema.get("required", []) if name != "payerid"]
+    if required:
+        del last[required[-1]]
+    else:
+        name = next(name for name in item_schema.get("properties", {}) if name != "payerid")
+        last[name] = 12345
+    return invalid
+
+def build_payloads(payer_id: str, schema: Dict[str, Any], size: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(f"{seed}:{payer_id}:{size}")
+    valid = synthesize(schema, rng, array_items=size)
+    invalid = make_invalid(valid, schema)
+    # Guard against generator drift: the reference validator decides what counts as valid
+    reference = jsonschema.validators.validator_for(schema)(schema)
+    if not reference.is_valid(valid):
+        raise ValueError(f"Synthesized payload for payer {payer_id} is not valid: "
+                         f"{jsonschema.exceptions.best_match(reference.iter_errors(valid)).message}")
+    if reference.is_valid(invalid):
+        raise ValueError(f"Could not synthesize an invalid payload for payer {payer_id}")
+    return {"valid": valid, "invalid": invalid}
+
+# ============================================================================
+# Variants under test
+# ============================================================================
+
+class _NullCollection:
+    """Accepts TOOL 4's status writes without a database"""
+
+    async def update_one(self, *args, **kwargs):
+        return None
+
+    async def insert_one(self, *args, **kwargs):
+        return None
+
+    async def find_one_and_update(self, *args, **kwargs):
+        # No progress document: update_request_progress stops before touching the counters
+        return None
+
+class _NullDb:
+    def __getitem__(self, name):
+        return _NullCollection()
+
+def build_variants(rules: Dict[str, Any]) -> Dict[str, Callable[[Dict[str, Any], bytes], Awaitable[Any]]]:
+    """name -> async fn(payload, request body bytes)"""
+    import api.agent_tools as agent_tools
+    from api.agent_tools import JsonValidationRequest, validate_patient_json
+    from api.validate_json import validate_json_payload
+    from db.models.requestModels.jsonValidatorRequest import JsonValidatorRequest
+    from validation.incremental import IncrementalValidator
+    from validation.multi_payer import MultiPayerValidator
+    from validation.payload import evaluate_payload
+    from validation.registry import get_validator_registry
+    from validation.result_cache import ValidationResultCache
+    from validation.service import ValidationService, get_validation_service
+    from validation.streaming import validate_stream
+
+    registry = get_validator_registry()
+    registry.load()
+    # Same precompiled jsonschema validators without the generated fast path
+    interpreted = {
+        payer_id: dataclasses.replace(compiled, fast_validator=None)
+        for payer_id, compiled in registry.snapshot().payers.items()
+    }
+    uncached = ValidationService(registry, offload_min_bytes=0)
+    cached = ValidationService(registry, ValidationResultCache(), IncrementalValidator(registry), offload_min_bytes=0)
+    multi_payer = MultiPayerValidator(registry, parallel_threshold=0)
+    agent_tools.get_db = lambda: _NullDb()
+
+    async def chunks(body: bytes, size: int = 65536):
+        for start in range(0, len(body), size):
+            yield body[start:start + size]
+
+    async def jsonschema_validate(payload, body):
+        # The original route: jsonschema.validate against the raw schema on every call
+        payer_id = payload["response"][0]["payerid"]
+        try:
+            jsonschema.validate(instance=payload, schema=rules[payer_id])
+        except jsonschema.ValidationError:
+            pass
+
+    async def precompiled_jsonschema(payload, body):
+        return evaluate_payload(payload, interpreted.get)
+
+    async def codegen(payload, body):
+        return evaluate_payload(payload, registry.get)
+
+    async def service_uncached(payload, body):
+        return await uncached.validate(payload)
+
+    async def service_cached(payload, body):
+        return await cached.validate(payload)
+
+    async def route_validate_json(payload, body):
+        return await validate_json_payload(JsonValidatorRequest(json_data=payload))
+
+    async def tool4(payload, body):
+        return await validate_patient_json(JsonValidationRequest(
+            patient_data=payload, payer_id=payload["response"][0]["payerid"], request_id="benchmark"
+        ))
+
+    async def multi(payload, body):
+        return await multi_payer.validate(payload)
+
+    async def stream(payload, body):
+        return await validate_stream(chunks(body), registry)
+
+    # The route and TOOL 4 go through the shared service, cache included
+    get_validation_service().offload_min_bytes = 0
+    return {
+        "jsonschema.validate": jsonschema_validate,
+        "precompiled_jsonschema": precompiled_jsonschema,
+        "codegen": codegen,
+        "service_uncached": service_uncached,
+        "service_cached": service_cached,
+        "validate_json_payload": route_validate_json,
+        "tool4_validate_patient_json": tool4,
+        "multi_payer": multi,
+        "stream": stream,
+    }
+
+# ============================================================================
+# Measurement
+# ============================================================================
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def _iterations_for(size: int, scale: float) -> int:
+    base = 200 if size <= 1 else 100 if size <= 100 else 10 if size <= 10000 else 3
+    return max(3, int(base * scale))
+
+async def measure(fn, payload, body: bytes, iterations: int) -> Dict[str, Any]:
+    await fn(payload, body)  # warm-up (also primes caches for the cached variants)
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await fn(payload, body)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    # Allocations are measured separately; tracemalloc distorts timings
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    await fn(payload, body)
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated_blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(samples, 50), 4),
+        "p99_ms": round(_percentile(samples, 99), 4),
+        "mean_ms": round(statistics.mean(samples), 4),
+        "min_ms": round(min(samples), 4),
+        "peak_alloc_kib": round((peak - baseline) / 1024, 2),
+        "retained_alloc_kib": round((current - baseline) / 1024, 2),
+        "retained_blocks": allocated_blocks,
+    }
+
+async def run_suite(rules: Dict[str, Any], sizes, variants_filter, scale: float, seed: int) -> List[Dict[str, Any]]:
+    variants = build_variants(rules)
+    if variants_filter:
+        unknown = set(variants_filter) - set(variants)
+        if unknown:
+            raise SystemExit(f"Unknown variants: {', '.join(sorted(unknown))} (known: {', '.join(variants)})")
+        variants = {name: fn for name, fn in variants.items() if name in variants_filter}
+
+    results = []
+    for payer_id, schema in rules.items():
+        for size in sizes:
+            payloads = build_payloads(payer_id, schema, size, seed)
+            for validity, payload in payloads.items():
+                body = json.dumps({"json_data": payload}).encode()
+                for name, fn in variants.items():
+                    stats = await measure(fn, payload, body, _iterations_for(size, scale))
+                    results.append({
+                        "payer_id": payer_id,
+                        "items": size,
+                        "payload": validity,
+                        "payload_bytes": len(body),
+                        "variant": name,
+                        **stats
+                    })
+                    print(f"{payer_id:>8} {size:>6} {validity:>7}  {name:28} "
+                          f"p50={stats['p50_ms']:10.4f} ms  p99={stats['p99_ms']:10.4f} ms  "
+                          f"peak={stats['peak_alloc_kib']:10.2f} KiB")
+    return results
+
+def _key(result) -> tuple:
+    return result["payer_id"], result["items"], result["payload"], result["variant"]
+
+def compare(results: List[Dict[str, Any]], baseline_path: str):
+    """Print p50 ratios against an earlier report (ratio > 1 means slower now)"""
+    with open(baseline_path, "r") as file:
+        baseline = {_key(result): result for result in json.load(file)["results"]}
+    print(f"\nCompared with {baseline_path} (p50 now / p50 before):")
+    for result in results:
+        before = baseline.get(_key(result))
+        if before is None or not before["p50_ms"]:
+            continue
+        ratio = result["p50_ms"] / before["p50_ms"]
+        flag = "  <-- slower" if ratio > 1.10 else ""
+        print(f"{result['payer_id']:>8} {result['items']:>6} {result['payload']:>7}  "
+              f"{result['variant']:28} {ratio:6.2f}x{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark payer validation variants on synthetic payloads")
+    parser.add_argument("--rules", default=os.getenv("VALIDATION_RULES_PATH", RULES_PATH), help="rules file to load")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated response item counts")
+    parser.add_argument("--variants", default="", help="comma-separated subset of variants to run")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the per-size iteration counts")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="validation_report.json")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare p50 against")
+    args = parser.parse_args()
+
+    # The registry reads VALIDATION_RULES_PATH at import time
+    os.environ["VALIDATION_RULES_PATH"] = args.rules
+    with open(args.rules, "r") as file:
+        rules = json.load(file)
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    variants_filter = [name for name in args.variants.split(",") if name]
+
+    results = asyncio.run(run_suite(rules, sizes, variants_filter, args.scale, args.seed))
+
+    from validation.registry import VALIDATION_CODEGEN, get_validator_registry
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "rules_path": os.path.abspath(args.rules),
+        "ruleset_version": get_validator_registry().snapshot().version,
+        "codegen_enabled": VALIDATION_CODEGEN,
+        "python": sys.version.split()[0],
+        "jsonschema": metadata.version("jsonschema"),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "sizes": sizes,
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Index definitions shipped with the queries that rely on them
+`ensure_indexes` runs at startup (main.py lifespan) and from init_db.py;
+create_index is a no-op for indexes that already exist.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT
+
+# (collection, keys, options)
+INDEXES: List[Tuple[str, List[Tuple[str, Any]], Dict[str, Any]]] = [
+    # /dashboard/stats: range on lastUpdatedAt, grouped by status, answered from the index alone
+    ("requestProgress", [("lastUpdatedAt", ASCENDING), ("status", ASCENDING)], {"name": "lastUpdatedAt_status"}),
+    # /dashboard/requests: keyset pages of the newest progress documents, optionally for one status
+    ("requestProgress", [("lastUpdatedAt", DESCENDING), ("requestId", DESCENDING)], {"name": "lastUpdatedAt_requestId"}),
+    ("requestProgress", [("status", ASCENDING), ("lastUpdatedAt", DESCENDING), ("requestId", DESCENDING)],
+     {"name": "status_lastUpdatedAt_requestId"}),
+    # /dashboard/payer-stats (raw source) and /dashboard/latency throughput: requests created in a window
+    ("priorAuthRequest", [("createdAt", ASCENDING), ("payerId", ASCENDING)], {"name": "createdAt_payerId"}),
+    # /dashboard/user-actions: keyset pages of the newest pending actions, polled by every operator
+    ("priorAuthUserAction", [("actionStatus", ASCENDING), ("requestedAt", DESCENDING), ("id", DESCENDING)],
+     {"name": "actionStatus_requestedAt_id"}),
+    # /dashboard/export: requests in creation order
+    ("priorAuthRequest", [("createdAt", ASCENDING), ("requestId", ASCENDING)], {"name": "createdAt_requestId"}),
+    # $lookup targets joined on requestId by the dashboard
+    ("requestProgress", [("requestId", ASCENDING)], {"name": "requestId_1"}),
+    ("priorAuthRequest", [("requestId", ASCENDING)], {"name": "requestId_1"}),
+    ("priorAuthUserAction", [("requestId", ASCENDING), ("actionStatus", ASCENDING)], {"name": "requestId_actionStatus"}),
+    # /dashboard/request-details: a request's actions in order and its conversation
+    ("priorAuthUserAction", [("requestId", ASCENDING), ("requestedAt", ASCENDING)], {"name": "requestId_requestedAt"}),
+    ("conversationHistory", [("requestId", ASCENDING)], {"name": "requestId_1"}),
+    # /dashboard/latency: completions in a window (only completed requests have completedAt)
+    ("requestProgress", [("completedAt", ASCENDING)], {"name": "completedAt_1", "sparse": True}),
+    # dashboardDaily: day-range reads of the rollups (_id is "<day>|<payerId>")
+    ("dashboardDaily", [("day", ASCENDING), ("payerId", ASCENDING)], {"name": "day_payerId"}),
+    # /dashboard/search: anchored prefix regexes on the normalized patient fields, text search on remarks
+    ("priorAuthRequest", [("patientNameLower", ASCENDING)], {"name": "patientNameLower_1"}),
+    ("priorAuthRequest", [("patientIdLower", ASCENDING)], {"name": "patientIdLower_1"}),
+    ("requestProgress", [("remarks", TEXT)], {"name": "remarks_text", "default_language": "english"}),
+    # Persisted validation sessions (db/validation_sessions.py) expire at their own expiresAt
+    ("validationSessions", [("expiresAt", ASCENDING)], {"name": "expiresAt_ttl", "expireAfterSeconds": 0}),
+    # Status counters: one document per (day, payer, status); unique so concurrent $inc upserts cannot split a counter
+    ("requestStatusCounters", [("day", ASCENDING), ("payerId", ASCENDING), ("status", ASCENDING)],
+     {"name": "day_payerId_status", "unique": True}),
+]
+
+async def ensure_indexes(db) -> int:
+    """Create every index in INDEXES; returns how many were requested"""
+    for collection, keys, options in INDEXES:
+        await db[collection].create_index(keys, **options)
+    return len(INDEXES)
+
+async def ensure_indexes_in_background(db):
+    """Startup wrapper: a missing or slow database must not stop the API from starting"""
+    try:
+        count = await ensure_indexes(db)
+        print(f"Ensured {count} database indexes")
+    except Exception as e:
+        print(f"Could not ensure database indexes: {e}")
@@ -0,0 +1,159 @@
+"""
+Shared response cache for the polled dashboard routes
+Entries are keyed by route and query parameters and hold the serialized
+body, its ETag and extra headers. Every requestProgress write bumps a
+generation number (via db/request_progress.py listeners), and so does
+every priorAuthRequest/priorAuthUserAction insert that follows such a
+write; an entry is served only while its generation is current and its
+TTL has not passed.
+The TTL also bounds staleness for writes made by other processes.
+Polls whose If-None-Match matches the entry get 304 without recomputation.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from db.request_progress import add_progress_listener
+
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "256"))
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "5"))
+
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+# (content, extra headers) produced by a route on a cache miss
+Computed = Tuple[Any, Dict[str, str]]
+
+class CachedResponse:
+    __slots__ = ("generation", "expires_at", "body", "etag", "headers")
+
+    def __init__(self, generation: int, expires_at: float, body: bytes, etag: str, headers: Dict[str, str]):
+        self.generation = generation
+        self.expires_at = expires_at
+        self.body = body
+        self.etag = etag
+        self.headers = headers
+
+class DashboardResponseCache:
+    """Bounded LRU of serialized responses, invalidated by generation or TTL"""
+
+    def __init__(self, max_entries: int = DASHBOARD_CACHE_SIZE, ttl_seconds: float = DASHBOARD_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self._entries: "OrderedDict[CacheKey, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def invalidate(self, change: Optional[Dict[str, Any]] = None):
+        """Make every cached response stale; registered as a requestProgress listener"""
+        with self._lock:
+            self.generation += 1
+
+    @staticmethod
+    def make_key(request: Request) -> CacheKey:
+        return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+    def _lookup(self, key: CacheKey) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.generation != self.generation or entry.expires_at < time.monotonic():
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key: CacheKey, entry: CachedResponse):
+        with self._lock:
+            # A write during the computation already made this entry stale
+            if entry.generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def respond(self, request: Request, compute: Callable[[], Awaitable[Computed]]) -> Response:
+        """Serve the route from the cache, or compute, serialize and cache it"""
+        if not self.enabled:
+            content, headers = await compute()
+            return Response(_serialize(content), media_type="application/json", headers=headers)
+
+        key = self.make_key(request)
+        entry = self._lookup(key)
+        if entry is None:
+            generation = self.generation
+            content, headers = await compute()
+            body = _serialize(content)
+            entry = CachedResponse(
+                generation,
+                time.monotonic() + self.ttl_seconds,
+                body,
+                f'"{hashlib.sha1(body).hexdigest()}"',
+                headers
+            )
+            self._store(key, entry)
+
+        headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"}
+        if entry.etag in _etags(request.headers.get("if-none-match")):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "stale": self.stale,
+            "evictions": self.evictions
+        }
+
+def _serialize(content: Any) -> bytes:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+def _etags(header: Optional[str]):
+    if not header:
+        return ()
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+dashboard_cache = DashboardResponseCache()
+add_progress_listener(dashboard_cache.invalidate)
+
+def get_dashboard_cache() -> DashboardResponseCache:
+    return dashboard_cache
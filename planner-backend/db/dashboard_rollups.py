@@ -0,0 +1,233 @@
+"""
+Daily dashboard rollups
+A background task (main.py lifespan, when DASHBOARD_STATS_SOURCE=rollups)
+folds every finished day into `dashboardDaily`: one document per
+(day, payerId) with the requests last updated that day by status and the
+requests created that day. Folding is done in Mongo with `$merge`, so only
+the per-day summary crosses the wire.
+Range queries read the rollups for closed days and query requestProgress
+live only after the last folded day (normally just today), so a 90-day
+window costs about the same as a 1-day one.
+A request updated today leaves the day it was last updated on. Every
+requestProgress write that touches an earlier day marks that day in
+`dashboardDailyDirty` (db/request_progress.py), so any instance's next
+compaction folds it again, including after a restart. Markers are only
+written while rollups are enabled; when switching a deployment over to
+them, drop `dashboardDaily` so every day is folded afresh.
+"""
+
+import asyncio
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from bson import ObjectId
+
+from db.status_counters import UNKNOWN_PAYER, UNKNOWN_STATUS
+
+DASHBOARD_ROLLUP_COLLECTION = "dashboardDaily"
+DASHBOARD_DIRTY_COLLECTION = "dashboardDailyDirty"
+# Seconds between compaction runs; 0 disables the background task
+DASHBOARD_ROLLUP_INTERVAL = float(os.getenv("DASHBOARD_ROLLUP_INTERVAL", "300"))
+# Rollups are maintained only while /dashboard/stats reads them (see api/dashboard_api.py)
+DASHBOARD_ROLLUPS_ENABLED = os.getenv("DASHBOARD_STATS_SOURCE", "counters").lower() == "rollups" \
+    and DASHBOARD_ROLLUP_INTERVAL > 0
+
+_STATE_ID = "_state"
+# Fields that decide which rollup bucket a request is in
+_ROLLUP_FIELDS = ("status", "lastUpdatedAt", "payerId")
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+def stale_days(before: Optional[Dict[str, Any]], after: Dict[str, Any]) -> Set[date]:
+    """Finished days whose rollup a requestProgress change from `before` to `after` makes stale"""
+    before = before or {}
+    if all(before.get(field) == after.get(field) for field in _ROLLUP_FIELDS):
+        return set()
+    today = date.today()
+    return {
+        state["lastUpdatedAt"].date()
+        for state in (before, after)
+        if isinstance(state.get("lastUpdatedAt"), datetime) and state["lastUpdatedAt"].date() < today
+    }
+
+async def mark_stale_days(db, before: Optional[Dict[str, Any]], after: Dict[str, Any]):
+    """Record the days a change makes stale; the version lets compaction tell a later mark from the one it folded"""
+    if not DASHBOARD_ROLLUPS_ENABLED:
+        # Nothing would ever fold these markers
+        return
+    for day in stale_days(before, after):
+        await db[DASHBOARD_DIRTY_COLLECTION].update_one(
+            {"_id": day.isoformat()},
+            {"$inc": {"version": 1}, "$set": {"markedAt": datetime.now()}},
+            upsert=True
+        )
+
+async def fold_day(db, day: date):
+    """
+    (Re)compute the rollup documents of one day.
+    Each (day, payer) document is replaced in place by one $merge, so readers never see the
+    day empty; documents of payers that no longer have data that day are deleted afterwards.
+    """
+    day_key = day.isoformat()
+    start, end = _day_start(day), _day_start(day + timedelta(days=1))
+    fold_id = ObjectId()
+
+    await db["requestProgress"].aggregate([
+        {"$match": {"lastUpdatedAt": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {
+                "payerId": {"$ifNull": ["$payerId", UNKNOWN_PAYER]},
+                "status": {"$ifNull": ["$status", UNKNOWN_STATUS]}
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$group": {"_id": "$_id.payerId", "statuses": {"$push": {"k": "$_id.status", "v": "$count"}}}},
+        {"$project": {"statuses": {"$arrayToObject": "$statuses"}}},
+        {"$unionWith": {"coll": "priorAuthRequest", "pipeline": [
+            {"$match": {"createdAt": {"$gte": start, "$lt": end}}},
+            {"$group": {"_id": {"$ifNull": ["$payerId", UNKNOWN_PAYER]}, "created": {"$sum": 1}}}
+        ]}},
+        {"$group": {"_id": "$_id", "statuses": {"$mergeObjects": "$statuses"}, "created": {"$sum": "$created"}}},
+        {"$project": {
+            "_id": {"$concat": [day_key, "|", "$_id"]},
+            "day": day_key,
+            "payerId": "$_id",
+            "statuses": 1,
+            "created": 1,
+            "foldId": {"$literal": fold_id},
+            "rolledUpAt": "$$NOW"
+        }},
+        {"$merge": {"into": DASHBOARD_ROLLUP_COLLECTION, "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]).to_list(None)
+
+    await db[DASHBOARD_ROLLUP_COLLECTION].delete_many({"day": day_key, "foldId": {"$ne": fold_id}})
+
+class DashboardRollups:
+    """Folds finished days and refolds the ones marked dirty since"""
+
+    def __init__(self):
+        self.closed_through: Optional[date] = None
+        self.dirty_days = 0
+        self.days_folded = 0
+        self.runs = 0
+
+    async def load_state(self, db) -> Optional[date]:
+        state = await db[DASHBOARD_ROLLUP_COLLECTION].find_one({"_id": _STATE_ID})
+        self.closed_through = date.fromisoformat(state["closedThrough"]) if state else None
+        return self.closed_through
+
+    async def _first_day(self, db) -> Optional[date]:
+        firsts = []
+        for collection, field in (("requestProgress", "lastUpdatedAt"), ("priorAuthRequest", "createdAt")):
+            document = await db[collection].find_one(
+                {field: {"$type": "date"}}, {"_id": 0, field: 1}, sort=[(field, 1)]
+            )
+            if document:
+                firsts.append(document[field].date())
+        return min(firsts) if firsts else None
+
+    async def compact(self, db) -> int:
+        """Fold the days finished since the last run plus the dirty ones; returns how many were folded"""
+        yesterday = date.today() - timedelta(days=1)
+        closed_through = await self.load_state(db)
+        if closed_through is None:
+            first_day = await self._first_day(db)
+            start = first_day if first_day else date.today()
+        else:
+            start = closed_through + timedelta(days=1)
+
+        dirty: List[Dict[str, Any]] = await db[DASHBOARD_DIRTY_COLLECTION].find({}).to_list(None)
+        days = {date.fromisoformat(marker["_id"]) for marker in dirty}
+        day = start
+        while day <= yesterday:
+            days.add(day)
+            day += timedelta(days=1)
+
+        for day in sorted(days):
+            await fold_day(db, day)
+        # A day marked again while it was being folded keeps its marker (version moved on)
+        for marker in dirty:
+            await db[DASHBOARD_DIRTY_COLLECTION].delete_one({"_id": marker["_id"], "version": marker["version"]})
+        self.dirty_days = len(dirty)
+        if closed_through is None or yesterday > closed_through:
+            await db[DASHBOARD_ROLLUP_COLLECTION].update_one(
+                {"_id": _STATE_ID},
+                {"$set": {"closedThrough": yesterday.isoformat(), "updatedAt": datetime.now()}},
+                upsert=True
+            )
+            self.closed_through = yesterday
+        self.days_folded += len(days)
+        self.runs += 1
+        return len(days)
+
+    async def run(self, db, interval: float = DASHBOARD_ROLLUP_INTERVAL):
+        """Background task: compact now and then every `interval` seconds"""
+        while True:
+            try:
+                folded = await self.compact(db)
+                if folded:
+                    print(f"Folded {folded} days into {DASHBOARD_ROLLUP_COLLECTION}")
+            except Exception as e:
+                print(f"Dashboard rollup failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def _live_start(self, db, start_date: datetime) -> datetime:
+        """First instant not covered by the rollups"""
+        closed_through = await self.load_state(db)
+        if closed_through is None:
+            return start_date
+        return max(start_date, _day_start(closed_through + timedelta(days=1)))
+
+    async def read_status_totals(self, db, start_date: datetime, end_date: datetime,
+                                 by_payer: bool = False) -> Dict:
+        """
+        Upper-case status counts over the day buckets covering [start_date, end_date]:
+        rollups for folded days plus a live requestProgress query for the rest.
+        With by_payer the result is payerId -> status -> count (UNKNOWN_PAYER included).
+        """
+        live_start = await self._live_start(db, start_date)
+        group_id = {"status": {"$toUpper": "$status.k"}}
+        if by_payer:
+            group_id["payerId"] = "$payerId"
+        rollup_pipeline = [
+            {"$match": {"day": {"$gte": start_date.date().isoformat(), "$lt": live_start.date().isoformat()}}},
+            {"$project": {"_id": 0, "payerId": 1, "status": {"$objectToArray": {"$ifNull": ["$statuses", {}]}}}},
+            {"$unwind": "$status"},
+            {"$group": {"_id": group_id, "count": {"$sum": "$status.v"}}}
+        ]
+        live_group_id = {"status": {"$toUpper": {"$ifNull": ["$status", UNKNOWN_STATUS]}}}
+        if by_payer:
+            live_group_id["payerId"] = {"$ifNull": ["$payerId", UNKNOWN_PAYER]}
+        live_pipeline = [
+            {"$match": {"lastUpdatedAt": {"$gte": live_start, "$lte": end_date}}},
+            {"$group": {"_id": live_group_id, "count": {"$sum": 1}}}
+        ]
+        rollup_groups, live_groups = await asyncio.gather(
+            db[DASHBOARD_ROLLUP_COLLECTION].aggregate(rollup_pipeline).to_list(None),
+            db["requestProgress"].aggregate(live_pipeline).to_list(None)
+        )
+
+        totals: Dict = {}
+        for group in rollup_groups + live_groups:
+            status = group["_id"]["status"]
+            if by_payer:
+                target = totals.setdefault(group["_id"]["payerId"], {})
+            else:
+                target = totals
+            target[status] = target.get(status, 0) + group["count"]
+        return totals
+
+    def stats(self) -> Dict:
+        return {
+            "closed_through": self.closed_through.isoformat() if self.closed_through else None,
+            "dirty_days": self.dirty_days,
+            "days_folded": self.days_folded,
+            "runs": self.runs
+        }
+
+dashboard_rollups = DashboardRollups()
+
+def get_dashboard_rollups() -> DashboardRollups:
+    return dashboard_rollups
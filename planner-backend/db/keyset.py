@@ -0,0 +1,35 @@
+"""
+Keyset pagination for newest-first lists
+A cursor is an opaque, URL-safe token holding the (timestamp, id) of the
+last row of a page. The next page is the range strictly after that pair
+in (timestamp desc, id desc) order, so with an index on the same keys
+every page costs the same as the first one.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+def encode_cursor(timestamp: datetime, key: str) -> str:
+    raw = json.dumps([timestamp.isoformat(), key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, key = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(key)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def keyset_filter(time_field: str, key_field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """Filter for the rows after `cursor` in (time_field desc, key_field desc) order; {} for the first page"""
+    if not cursor:
+        return {}
+    timestamp, key = decode_cursor(cursor)
+    return {"$or": [
+        {time_field: {"$lt": timestamp}},
+        {time_field: timestamp, key_field: {"$lt": key}}
+    ]}
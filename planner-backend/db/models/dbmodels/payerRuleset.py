@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class PayerRuleset(BaseModel):
+    payerId: str = Field(..., description="ID of the payer the ruleset applies to")
+    version: int = Field(..., description="Monotonic version, incremented on every change")
+    schemaJson: str = Field(..., description="JSON Schema for the payer, stored as a JSON string")
+    updatedAt: datetime = Field(..., description="Timestamp when the ruleset was last updated")
+    updatedBy: Optional[str] = Field(None, description="User who last updated the ruleset")
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from typing import Optional, List
 from datetime import datetime
 
+from db.request_search import normalize_search_text
+
 class priorAuthRequest(BaseModel):
     requestId: str = Field(..., description="Unique identifier for the prior authorization request")
     userId: str = Field(..., description="ID of the user making the request")
@@ -9,4 +11,15 @@ class priorAuthRequest(BaseModel):
     patientName: str = Field(..., description="Name of the patient")
     payerId: str = Field(..., description="ID of the payer associated with the request")
     createdAt: datetime = Field(..., description="Timestamp when the request was created")
-    lastUpdatedAt: datetime = Field(..., description="Timestamp when the request was last updated")
\ No newline at end of file
+    lastUpdatedAt: datetime = Field(..., description="Timestamp when the request was last updated")
+
+    # Normalized copies for the indexed prefix search (/api/dashboard/search)
+    @computed_field
+    @property
+    def patientNameLower(self) -> str:
+        return normalize_search_text(self.patientName)
+
+    @computed_field
+    @property
+    def patientIdLower(self) -> str:
+        return normalize_search_text(self.patientId)
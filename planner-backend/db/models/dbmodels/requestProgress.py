@@ -20,6 +20,7 @@ class RequestProgress(BaseModel):
     status: RequestStatus = Field(..., description="Current status of the request")
     lastUpdatedAt: datetime = Field(..., description="Timestamp when the request was last updated")
     remarks: Optional[str] = Field(None, description="Remarks or comments related to the request")  
+    payerId: Optional[str] = Field(None, description="Payer of the request, recorded once it is known")
     
     class Config:
         allow_population_by_field_name = True
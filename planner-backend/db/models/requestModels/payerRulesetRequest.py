@@ -0,0 +1,7 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+class PayerRulesetRequest(BaseModel):
+    rules: dict = Field(..., description="JSON Schema the payer's payloads must satisfy")
+    updated_by: Optional[str] = Field(None, description="User making the change")
@@ -0,0 +1,27 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
+
+class ItemValidationError(BaseModel):
+    index: int = Field(..., description="Position of the item in the original response array")
+    path: str = Field(..., description="JSON path of the failing value, e.g. response/12/cptcodes")
+    message: str = Field(..., description="Validation error message")
+
+class PayerValidationBreakdown(BaseModel):
+    payer_id: str = Field(..., description="Payer ID shared by the items in this group")
+    is_valid: bool = Field(..., description="Indicates if every item of this payer is valid")
+    ruleset_version: Optional[str] = Field(None, description="Version of the ruleset the group was validated against")
+    total_items: int = Field(..., description="Number of items for this payer")
+    valid_items: int = Field(..., description="Number of items that passed validation")
+    invalid_items: int = Field(..., description="Number of items that failed validation")
+    error_message: Optional[str] = Field(None, description="First error for this payer, if any")
+    errors: List[ItemValidationError] = Field(default=[], description="Failing items (capped per payer)")
+    elapsed_ms: float = Field(..., description="Time spent validating this group")
+
+class MultiPayerValidationResponse(BaseModel):
+    is_valid: bool = Field(..., description="Indicates if every item of every payer is valid")
+    http_status: HttpResponseEnum = Field(..., description="The HTTP status of the response")
+    error_message: Optional[str] = Field(None, description="Error message if any")
+    total_items: int = Field(..., description="Number of items in the response array")
+    payers: List[PayerValidationBreakdown] = Field(default=[], description="Per-payer results, in order of first appearance")
+    unattributed_items: List[int] = Field(default=[], description="Indexes of items without a payerid")
@@ -0,0 +1,11 @@
+from typing import List
+from pydantic import Field
+from db.models.responseModels.jsonValidatorResponse import JsonValidatorResponse
+from db.models.responseModels.multiPayerValidationResponse import ItemValidationError
+
+class StreamingValidationResponse(JsonValidatorResponse):
+    items_validated: int = Field(..., description="Number of response items parsed and validated")
+    invalid_items: int = Field(..., description="Number of items that failed validation")
+    errors: List[ItemValidationError] = Field(default=[], description="Failing items (capped)")
+    stopped_early: bool = Field(False, description="Whether validation stopped before reading the whole body (fail_fast or unknown payer)")
+    bytes_read: int = Field(..., description="Request bytes consumed before validation finished")
@@ -0,0 +1,137 @@
+"""
+In-process fan-out of requestProgress changes for the live dashboard feed
+One broadcaster receives every change from db/request_progress.py and puts
+it on the bounded queue of each matching subscriber (GET /api/dashboard/stream).
+A slow client never blocks writers: when its queue is full the oldest event
+is dropped and counted. Subscribers filtering by user need the request's
+userId, which is looked up once per request (not once per client) and memoized.
+"""
+
+import asyncio
+import itertools
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from db.config.connection import get_db
+from db.request_progress import add_progress_listener
+
+DASHBOARD_STREAM_QUEUE_SIZE = int(os.getenv("DASHBOARD_STREAM_QUEUE_SIZE", "100"))
+# request id -> user id entries kept for user-filtered subscribers
+DASHBOARD_STREAM_USER_CACHE_SIZE = int(os.getenv("DASHBOARD_STREAM_USER_CACHE_SIZE", "10000"))
+
+class Subscriber:
+    """One connected client: its filters and its bounded event queue"""
+
+    def __init__(self, request_id: Optional[str] = None, payer_id: Optional[str] = None,
+                 user_id: Optional[str] = None, queue_size: int = DASHBOARD_STREAM_QUEUE_SIZE):
+        self.request_id = request_id
+        self.payer_id = payer_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(queue_size, 1))
+        self.dropped = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.request_id and event.get("requestId") != self.request_id:
+            return False
+        if self.payer_id and event.get("payerId") != self.payer_id:
+            return False
+        if self.user_id and event.get("userId") != self.user_id:
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]):
+        """Enqueue without waiting; drop the oldest event when the queue is full"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+class ProgressBroadcaster:
+    def __init__(self, user_cache_size: int = DASHBOARD_STREAM_USER_CACHE_SIZE):
+        self.subscribers: Set[Subscriber] = set()
+        self.user_cache_size = user_cache_size
+        self._user_ids: "OrderedDict[str, str]" = OrderedDict()
+        # Changes waiting for a userId lookup, per request, in arrival order
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._sequence = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        self.user_lookups = 0
+
+    def subscribe(self, **filters) -> Subscriber:
+        subscriber = Subscriber(**filters)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, change: Dict[str, Any]):
+        """requestProgress listener: fan a change out to every matching subscriber"""
+        if not self.subscribers:
+            return
+        event = {"id": next(self._sequence), **change}
+        request_id = event.get("requestId")
+        needs_user = any(subscriber.user_id for subscriber in self.subscribers)
+        if needs_user and request_id is not None:
+            user_id = self._user_ids.get(request_id)
+            if user_id is None:
+                self._defer(request_id, event)
+                return
+            event["userId"] = user_id
+        self._deliver(event)
+
+    def _deliver(self, event: Dict[str, Any]):
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            if subscriber.matches(event):
+                subscriber.offer(event)
+                self.delivered += 1
+
+    def _defer(self, request_id: str, event: Dict[str, Any]):
+        waiting = self._pending.get(request_id)
+        if waiting is not None:
+            waiting.append(event)
+            return
+        self._pending[request_id] = [event]
+        try:
+            asyncio.get_running_loop().create_task(self._resolve_user(request_id))
+        except RuntimeError:
+            # No event loop (synchronous caller): deliver without the user
+            self._deliver(self._pending.pop(request_id)[0])
+
+    async def _resolve_user(self, request_id: str):
+        user_id = None
+        try:
+            self.user_lookups += 1
+            original_request = await get_db()["priorAuthRequest"].find_one(
+                {"requestId": request_id}, {"_id": 0, "userId": 1}
+            )
+            user_id = original_request.get("userId") if original_request else None
+        except Exception as e:
+            print(f"Live feed user lookup failed for {request_id}: {e}")
+        if user_id is not None:
+            self._user_ids[request_id] = user_id
+            while len(self._user_ids) > self.user_cache_size:
+                self._user_ids.popitem(last=False)
+        for event in self._pending.pop(request_id, []):
+            if user_id is not None:
+                event["userId"] = user_id
+            self._deliver(event)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": sum(subscriber.dropped for subscriber in self.subscribers),
+            "user_lookups": self.user_lookups,
+            "cached_user_ids": len(self._user_ids)
+        }
+
+progress_broadcaster = ProgressBroadcaster()
+add_progress_listener(progress_broadcaster.publish)
+
+def get_progress_broadcaster() -> ProgressBroadcaster:
+    return progress_broadcaster
@@ -0,0 +1,110 @@
+"""
+Streaming export of requests with their progress and user actions
+Requests are read from a batched priorAuthRequest cursor; each batch is
+enriched with one $in query on requestProgress and one on
+priorAuthUserAction and written out before the next batch is read, so
+memory depends on the batch size, not on the size of the export.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+EXPORT_BATCH_SIZE = int(os.getenv("DASHBOARD_EXPORT_BATCH_SIZE", "500"))
+
+EXPORT_COLUMNS = [
+    "request_id", "user_id", "patient_id", "patient_name", "payer_id", "created_at",
+    "status", "last_updated", "completed_at", "workflow_step", "remarks",
+    "actions_total", "actions_pending", "actions"
+]
+
+_REQUEST_PROJECTION = {"_id": 0, "requestId": 1, "userId": 1, "patientId": 1, "patientName": 1, "payerId": 1, "createdAt": 1}
+_PROGRESS_PROJECTION = {"_id": 0, "requestId": 1, "status": 1, "lastUpdatedAt": 1, "completedAt": 1, "workflowStep": 1, "remarks": 1}
+_ACTION_PROJECTION = {"_id": 0, "id": 1, "requestId": 1, "actionType": 1, "actionStatus": 1, "requestedAt": 1, "actionedAt": 1}
+
+async def _enrich(db, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    request_ids = [original_request["requestId"] for original_request in batch]
+    progress_by_request = {
+        progress["requestId"]: progress
+        async for progress in db["requestProgress"].find({"requestId": {"$in": request_ids}}, _PROGRESS_PROJECTION)
+    }
+    actions_by_request: Dict[str, List[Dict[str, Any]]] = {}
+    actions_cursor = db["priorAuthUserAction"].find(
+        {"requestId": {"$in": request_ids}}, _ACTION_PROJECTION
+    ).sort([("requestId", 1), ("requestedAt", 1)])
+    async for action in actions_cursor:
+        actions_by_request.setdefault(action.pop("requestId"), []).append(action)
+
+    rows = []
+    for original_request in batch:
+        request_id = original_request["requestId"]
+        progress = progress_by_request.get(request_id, {})
+        actions = actions_by_request.get(request_id, [])
+        rows.append({
+            "request_id": request_id,
+            "user_id": original_request.get("userId"),
+            "patient_id": original_request.get("patientId"),
+            "patient_name": original_request.get("patientName"),
+            "payer_id": original_request.get("payerId"),
+            "created_at": original_request.get("createdAt"),
+            "status": progress.get("status"),
+            "last_updated": progress.get("lastUpdatedAt"),
+            "completed_at": progress.get("completedAt"),
+            "workflow_step": progress.get("workflowStep"),
+            "remarks": progress.get("remarks"),
+            "actions_total": len(actions),
+            "actions_pending": sum(1 for action in actions if action.get("actionStatus") == "PENDING"),
+            "actions": actions
+        })
+    return rows
+
+async def export_batches(
+    db,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield enriched export rows batch by batch, oldest request first"""
+    created_filter: Dict[str, Any] = {}
+    if start:
+        created_filter["$gte"] = start
+    if end:
+        created_filter["$lte"] = end
+    query_filter = {"createdAt": created_filter} if created_filter else {}
+
+    cursor = db["priorAuthRequest"].find(query_filter, _REQUEST_PROJECTION).sort(
+        [("createdAt", 1), ("requestId", 1)]
+    ).batch_size(batch_size)
+    batch: List[Dict[str, Any]] = []
+    async for original_request in cursor:
+        batch.append(original_request)
+        if len(batch) >= batch_size:
+            yield await _enrich(db, batch)
+            batch = []
+    if batch:
+        yield await _enrich(db, batch)
+
+async def stream_ndjson(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    async for rows in batches:
+        yield "".join(json.dumps(jsonable_encoder(row), separators=(",", ":")) + "\n" for row in rows)
+
+async def stream_csv(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    async for rows in batches:
+        for row in jsonable_encoder(rows):
+            # Actions are kept as one JSON column so each request stays one CSV row
+            row["actions"] = json.dumps(row["actions"], separators=(",", ":"))
+            writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there was nothing to export
+    if buffer.tell():
+        yield buffer.getvalue()
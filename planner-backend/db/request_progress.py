@@ -0,0 +1,84 @@
+"""
+Writes to requestProgress
+Every status/lastUpdatedAt change goes through these helpers so that the
+materialized status counters (db/status_counters.py) move with it and the
+finished days it touches are marked for refolding (db/dashboard_rollups.py).
+The previous state is read atomically with the update (find_one_and_update,
+ReturnDocument.BEFORE), so concurrent writers never double count.
+In-process consumers (dashboard cache, live feed) subscribe with
+`add_progress_listener` and are told about every change after it is written.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from db.dashboard_rollups import mark_stale_days
+from db.status_counters import apply_transition
+
+PROGRESS_COLLECTION = "requestProgress"
+# Fields that decide which counter a request is in
+_COUNTER_PROJECTION = {"_id": 0, "status": 1, "lastUpdatedAt": 1, "payerId": 1}
+# Small fields passed on to listeners; workflow payloads and metadata are left out
+_CHANGE_FIELDS = ("status", "lastUpdatedAt", "payerId", "remarks", "workflowStep")
+
+ProgressListener = Callable[[Dict[str, Any]], None]
+_listeners: List[ProgressListener] = []
+
+def add_progress_listener(listener: ProgressListener):
+    """Call `listener(change)` after every requestProgress write; listeners must not block"""
+    _listeners.append(listener)
+
+def _notify(request_id: str, previous: Optional[Dict[str, Any]], state: Dict[str, Any]):
+    previous = previous or {}
+    change = {
+        "requestId": request_id,
+        "previousStatus": _plain(previous.get("status")),
+        "previousLastUpdatedAt": previous.get("lastUpdatedAt")
+    }
+    for field in _CHANGE_FIELDS:
+        if field in state:
+            change[field] = _plain(state[field])
+    for listener in _listeners:
+        try:
+            listener(change)
+        except Exception as e:
+            print(f"Progress listener failed: {e}")
+
+def _plain(value):
+    return getattr(value, "value", value)
+
+async def insert_request_progress(db, document: Dict[str, Any]):
+    """Insert a new progress document and count it"""
+    result = await db[PROGRESS_COLLECTION].insert_one(document)
+    await apply_transition(db, None, document)
+    await mark_stale_days(db, None, document)
+    _notify(document["requestId"], None, document)
+    return result
+
+async def update_request_progress(
+    db,
+    request_id: str,
+    fields: Dict[str, Any],
+    payer_id: Optional[str] = None
+) -> bool:
+    """
+    `$set` fields on the progress document of a request and move it between counters.
+    payer_id is recorded on the document when the caller knows it.
+    Returns False when no progress document exists for the request.
+    """
+    if payer_id:
+        fields = {**fields, "payerId": payer_id}
+    before = await db[PROGRESS_COLLECTION].find_one_and_update(
+        {"requestId": request_id},
+        {"$set": fields},
+        projection=_COUNTER_PROJECTION,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return False
+    after = {**before, **{key: fields[key] for key in _COUNTER_PROJECTION if key in fields}}
+    await apply_transition(db, before, after)
+    await mark_stale_days(db, before, after)
+    _notify(request_id, before, {**after, **fields})
+    return True
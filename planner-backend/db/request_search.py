@@ -0,0 +1,160 @@
+"""
+Request search for the dashboard
+Patient names and ids are matched by prefix on normalized (trimmed,
+lowercase) copies stored on priorAuthRequest, so an anchored regex
+uses the index. Remarks are matched with the requestProgress text index.
+Candidates from both sides are merged per request, scored and ordered
+by relevance; each side contributes at most SEARCH_MAX_CANDIDATES hits.
+"""
+
+import asyncio
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+SEARCH_MAX_CANDIDATES = int(os.getenv("DASHBOARD_SEARCH_MAX_CANDIDATES", "500"))
+
+# Relevance weights; the remarks text score (usually 0.5-1.5) is added as is
+_PATIENT_ID_EXACT = 3.0
+_PATIENT_ID_PREFIX = 2.0
+_PATIENT_NAME_EXACT = 2.5
+_PATIENT_NAME_PREFIX = 1.5
+_EPOCH = datetime(1970, 1, 1)
+
+def normalize_search_text(value: Optional[str]) -> Optional[str]:
+    """Form stored in patientNameLower/patientIdLower; keep in sync with backfill_search_fields"""
+    if value is None:
+        return None
+    return str(value).strip().lower()
+
+async def backfill_search_fields(db) -> int:
+    """Add the normalized fields to requests written before they existed"""
+    result = await db["priorAuthRequest"].update_many(
+        {"$or": [{"patientNameLower": {"$exists": False}}, {"patientIdLower": {"$exists": False}}]},
+        [{"$set": {
+            "patientNameLower": {"$toLower": {"$trim": {"input": {"$ifNull": ["$patientName", ""]}}}},
+            "patientIdLower": {"$toLower": {"$trim": {"input": {"$ifNull": ["$patientId", ""]}}}}
+        }}]
+    )
+    return result.modified_count
+
+async def backfill_search_fields_in_background(db):
+    try:
+        updated = await backfill_search_fields(db)
+        if updated:
+            print(f"Backfilled search fields on {updated} requests")
+    except Exception as e:
+        print(f"Search field backfill failed: {e}")
+
+async def search_requests(
+    db,
+    query: Optional[str],
+    payer_id: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 20,
+    max_candidates: int = SEARCH_MAX_CANDIDATES
+) -> Dict[str, Any]:
+    """Relevance-ordered page of requests matching `query` (and/or belonging to `payer_id`)"""
+    term = normalize_search_text(query) or ""
+    request_projection = {"_id": 0, "requestId": 1, "patientName": 1, "patientId": 1,
+                          "payerId": 1, "createdAt": 1, "patientNameLower": 1, "patientIdLower": 1}
+    progress_projection = {"_id": 0, "requestId": 1, "status": 1, "lastUpdatedAt": 1, "remarks": 1}
+
+    payer_filter = {"payerId": payer_id} if payer_id else {}
+    if term:
+        prefix = {"$regex": "^" + re.escape(term)}
+        request_filter = {**payer_filter, "$or": [{"patientNameLower": prefix}, {"patientIdLower": prefix}]}
+    else:
+        request_filter = payer_filter
+
+    async def request_hits():
+        cursor = db["priorAuthRequest"].find(request_filter, request_projection)
+        return await cursor.sort([("createdAt", -1)]).limit(max_candidates).to_list(None)
+
+    async def remark_hits():
+        if not term:
+            return []
+        cursor = db["requestProgress"].find(
+            {"$text": {"$search": term}},
+            {**progress_projection, "score": {"$meta": "textScore"}}
+        )
+        return await cursor.sort([("score", {"$meta": "textScore"})]).limit(max_candidates).to_list(None)
+
+    requests, remarks = await asyncio.gather(request_hits(), remark_hits())
+
+    # Load the other half of each hit with one $in query per collection
+    requests_by_id = {original_request["requestId"]: original_request for original_request in requests}
+    progress_by_id = {progress["requestId"]: progress for progress in remarks}
+    missing_requests = [request_id for request_id in progress_by_id if request_id not in requests_by_id]
+    missing_progress = [request_id for request_id in requests_by_id if request_id not in progress_by_id]
+    extra_requests, extra_progress = await asyncio.gather(
+        db["priorAuthRequest"].find({"requestId": {"$in": missing_requests}}, request_projection).to_list(None)
+        if missing_requests else _empty(),
+        db["requestProgress"].find({"requestId": {"$in": missing_progress}}, progress_projection).to_list(None)
+        if missing_progress else _empty()
+    )
+    for original_request in extra_requests:
+        requests_by_id[original_request["requestId"]] = original_request
+    for progress in extra_progress:
+        progress_by_id.setdefault(progress["requestId"], progress)
+
+    results: List[Dict[str, Any]] = []
+    for request_id in set(requests_by_id) | set(progress_by_id):
+        original_request = requests_by_id.get(request_id, {})
+        progress = progress_by_id.get(request_id, {})
+        if payer_id and original_request.get("payerId") != payer_id:
+            continue
+        score, matched_on = _score(term, original_request, progress)
+        if term and not matched_on:
+            continue
+        results.append({
+            "request_id": request_id,
+            "patient_name": original_request.get("patientName"),
+            "patient_id": original_request.get("patientId"),
+            "payer_id": original_request.get("payerId"),
+            "status": progress.get("status"),
+            "created_at": original_request.get("createdAt"),
+            "last_updated": progress.get("lastUpdatedAt"),
+            "remarks": progress.get("remarks"),
+            "matched_on": matched_on,
+            "score": round(score, 4)
+        })
+
+    results.sort(key=lambda result: (
+        -result["score"],
+        -(result["last_updated"] or result["created_at"] or _EPOCH).timestamp(),
+        result["request_id"]
+    ))
+    truncated = len(requests) >= max_candidates or len(remarks) >= max_candidates
+    return {
+        "results": results[offset:offset + limit],
+        # Past the candidate limit the number of matches is unknown; matched is only a lower bound then
+        "total": None if truncated else len(results),
+        "matched": len(results),
+        "offset": offset,
+        "limit": limit,
+        "truncated": truncated
+    }
+
+def _score(term: str, original_request: Dict[str, Any], progress: Dict[str, Any]):
+    score = 0.0
+    matched_on = []
+    if not term:
+        return score, matched_on
+    patient_id = original_request.get("patientIdLower") or normalize_search_text(original_request.get("patientId"))
+    if patient_id and patient_id.startswith(term):
+        score += _PATIENT_ID_EXACT if patient_id == term else _PATIENT_ID_PREFIX
+        matched_on.append("patient_id")
+    patient_name = original_request.get("patientNameLower") or normalize_search_text(original_request.get("patientName"))
+    if patient_name and patient_name.startswith(term):
+        # Shorter names covered more fully by the prefix rank higher
+        score += _PATIENT_NAME_EXACT if patient_name == term else _PATIENT_NAME_PREFIX + 0.5 * len(term) / len(patient_name)
+        matched_on.append("patient_name")
+    if "score" in progress:
+        score += progress["score"]
+        matched_on.append("remarks")
+    return score, matched_on
+
+async def _empty():
+    return []
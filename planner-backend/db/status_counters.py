@@ -0,0 +1,146 @@
+"""
+Materialized request status counters
+`requestStatusCounters` holds one small document per (day, payerId, status)
+with the number of requests whose last update falls on that day and whose
+current status is `status`. Every write to requestProgress goes through
+db/request_progress.py, which moves the request from its old counter to
+its new one with `$inc`. /dashboard/stats and /dashboard/payer-stats sum
+these documents instead of scanning requests; `rebuild_status_counters`
+recomputes them from requestProgress.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+STATUS_COUNTERS_COLLECTION = "requestStatusCounters"
+UNKNOWN_PAYER = "unknown"
+UNKNOWN_STATUS = "unknown"
+# Seconds between background rebuilds; 0 only rebuilds on demand (and once when the collection is empty)
+STATUS_COUNTERS_REPAIR_INTERVAL = float(os.getenv("DASHBOARD_COUNTERS_REPAIR_INTERVAL", "0"))
+
+CounterKey = Tuple[str, str, str]
+
+def counter_day(timestamp: datetime) -> str:
+    """Day bucket of a timestamp; matches $dateToString's default (the stored, UTC-interpreted) value"""
+    return timestamp.strftime("%Y-%m-%d")
+
+def _status_value(status) -> str:
+    if status is None:
+        return UNKNOWN_STATUS
+    return getattr(status, "value", status)
+
+def counter_key(progress: Dict[str, Any]) -> Optional[CounterKey]:
+    """(day, payerId, status) of a requestProgress document, or None without lastUpdatedAt"""
+    last_updated = progress.get("lastUpdatedAt")
+    if not isinstance(last_updated, datetime):
+        return None
+    return counter_day(last_updated), progress.get("payerId") or UNKNOWN_PAYER, _status_value(progress.get("status"))
+
+def _inc(key: CounterKey, amount: int) -> UpdateOne:
+    day, payer_id, status = key
+    return UpdateOne(
+        {"day": day, "payerId": payer_id, "status": status},
+        {"$inc": {"count": amount}, "$set": {"updatedAt": datetime.now()}},
+        upsert=True
+    )
+
+async def apply_transition(db, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    """Move one request from the counter of its old state to the counter of its new state"""
+    old_key = counter_key(before) if before else None
+    new_key = counter_key(after) if after else None
+    if old_key == new_key:
+        return
+    operations = []
+    if old_key is not None:
+        operations.append(_inc(old_key, -1))
+    if new_key is not None:
+        operations.append(_inc(new_key, 1))
+    await db[STATUS_COUNTERS_COLLECTION].bulk_write(operations, ordered=False)
+
+async def rebuild_status_counters(db) -> int:
+    """
+    Recompute every counter from requestProgress.
+    Progress documents written before payerId was recorded get it from priorAuthRequest first.
+    """
+    await db["requestProgress"].aggregate([
+        {"$match": {"payerId": None}},
+        {"$lookup": {
+            "from": "priorAuthRequest",
+            "localField": "requestId",
+            "foreignField": "requestId",
+            "as": "request"
+        }},
+        {"$project": {"payerId": {"$first": "$request.payerId"}}},
+        {"$match": {"payerId": {"$ne": None}}},
+        {"$merge": {"into": "requestProgress", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}}
+    ]).to_list(None)
+
+    # $out replaces the collection atomically and keeps its indexes (db/config/indexes.py)
+    await db["requestProgress"].aggregate([
+        {"$match": {"lastUpdatedAt": {"$type": "date"}}},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$lastUpdatedAt"}},
+                "payerId": {"$ifNull": ["$payerId", UNKNOWN_PAYER]},
+                "status": {"$ifNull": ["$status", UNKNOWN_STATUS]}
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "day": "$_id.day",
+            "payerId": "$_id.payerId",
+            "status": "$_id.status",
+            "count": 1,
+            "updatedAt": "$$NOW"
+        }},
+        {"$out": STATUS_COUNTERS_COLLECTION}
+    ]).to_list(None)
+    return await db[STATUS_COUNTERS_COLLECTION].count_documents({})
+
+async def read_status_totals(db, start_date: datetime, end_date: datetime) -> Dict[str, int]:
+    """Upper-case status -> count over the day buckets covering [start_date, end_date]"""
+    totals: Dict[str, int] = {}
+    pipeline = [
+        {"$match": {"day": {"$gte": counter_day(start_date), "$lte": counter_day(end_date)}}},
+        {"$group": {"_id": {"$toUpper": "$status"}, "count": {"$sum": "$count"}}}
+    ]
+    async for group in db[STATUS_COUNTERS_COLLECTION].aggregate(pipeline):
+        totals[group["_id"]] = group["count"]
+    return totals
+
+async def read_payer_status_totals(db, start_date: datetime, end_date: datetime) -> Dict[str, Dict[str, int]]:
+    """
+    payerId -> upper-case status -> count over the day buckets covering [start_date, end_date].
+    Requests whose progress has no payer yet are counted under UNKNOWN_PAYER.
+    """
+    totals: Dict[str, Dict[str, int]] = {}
+    pipeline = [
+        {"$match": {"day": {"$gte": counter_day(start_date), "$lte": counter_day(end_date)}}},
+        {"$group": {
+            "_id": {"payerId": "$payerId", "status": {"$toUpper": "$status"}},
+            "count": {"$sum": "$count"}
+        }}
+    ]
+    async for group in db[STATUS_COUNTERS_COLLECTION].aggregate(pipeline):
+        payer_totals = totals.setdefault(group["_id"]["payerId"], {})
+        payer_totals[group["_id"]["status"]] = group["count"]
+    return totals
+
+async def run_counter_repair(db, interval: float = STATUS_COUNTERS_REPAIR_INTERVAL):
+    """Background task: build the counters if they are missing, then rebuild every `interval` seconds"""
+    try:
+        if await db[STATUS_COUNTERS_COLLECTION].estimated_document_count() == 0:
+            print(f"Built {await rebuild_status_counters(db)} status counters")
+    except Exception as e:
+        print(f"Status counter build failed: {e}")
+    while interval > 0:
+        await asyncio.sleep(interval)
+        try:
+            print(f"Rebuilt {await rebuild_status_counters(db)} status counters")
+        except Exception as e:
+            print(f"Status counter repair failed: {e}")
@@ -0,0 +1,44 @@
+"""
+Persisted validation sessions
+The last validated payload of each request is stored in Mongo next to the
+in-memory incremental sessions (validation/incremental.py), so a JSON-Patch
+correction (TOOL 7/9) still applies when it reaches another instance or
+arrives after a restart. Such a patch is re-checked in full once, then
+incrementally again. Only payloads that failed validation are stored, as
+only those get corrected. Documents expire through a TTL index on expiresAt.
+"""
+
+import json
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from validation.incremental import VALIDATION_SESSION_TTL
+
+VALIDATION_SESSION_COLLECTION = "validationSessions"
+# Payloads are stored as JSON text so payer keys never clash with Mongo field name rules
+_MAX_PAYLOAD_BYTES = 15 * 1024 * 1024
+
+async def save_validated_payload(db, request_id: str, payload: Any) -> bool:
+    """Store the payload a request was last validated against; returns False when it is too large to store"""
+    text = json.dumps(payload, separators=(",", ":"))
+    if len(text) > _MAX_PAYLOAD_BYTES:
+        print(f"Validated payload of {request_id} is too large to persist ({len(text)} bytes)")
+        return False
+    now = datetime.now()
+    await db[VALIDATION_SESSION_COLLECTION].replace_one(
+        {"_id": request_id},
+        {"payload": text, "updatedAt": now, "expiresAt": now + timedelta(seconds=VALIDATION_SESSION_TTL)},
+        upsert=True
+    )
+    return True
+
+async def load_validated_payload(db, request_id: str) -> Optional[Any]:
+    """Last persisted payload of a request, or None if there is none (or it expired)"""
+    session = await db[VALIDATION_SESSION_COLLECTION].find_one(
+        {"_id": request_id, "expiresAt": {"$gt": datetime.now()}}, {"_id": 0, "payload": 1}
+    )
+    return json.loads(session["payload"]) if session else None
+
+async def discard_validated_payload(db, request_id: str):
+    """Forget the persisted payload of a request once it validates"""
+    await db[VALIDATION_SESSION_COLLECTION].delete_one({"_id": request_id})
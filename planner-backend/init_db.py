@@ -8,6 +8,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
 import os
 
+from db.config.indexes import ensure_indexes
+
 async def init_sample_data():
     """Initialize MongoDB with sample data"""
     print("🔄 Connecting to MongoDB...")
@@ -68,6 +70,8 @@ async def init_sample_data():
         await db.priorAuthRequest.create_index("requestId")
         await db.priorAuthUserAction.create_index("requestId")
         await db.priorAuthPayers.create_index("id")
+        # Indexes the dashboard and validation queries rely on
+        await ensure_indexes(db)
         
         print("✅ Database initialization completed!")
         
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,7 +6,14 @@ from api.validate_json import router as validate_json_router
 from api.n8n_callback_api import router as n8n_callback_router
 from api.dashboard_api import router as dashboard_router
 from api.agent_tools import router as agent_tools_router
-from db.config.connection import init_db
+from db.config.connection import init_db, get_db
+from db.config.indexes import ensure_indexes_in_background
+from db.dashboard_rollups import DASHBOARD_ROLLUPS_ENABLED, get_dashboard_rollups
+from db.request_search import backfill_search_fields_in_background
+from db.status_counters import run_counter_repair
+from validation.pool import shutdown_validation_pool
+from validation.registry import get_validator_registry
+from validation.ruleset_store import RULESET_POLL_INTERVAL, get_payer_ruleset_store
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -13,9 +21,25 @@ async def lifespan(app: FastAPI):
     print("Starting up...")
     init_db()
     print("Database initialized...")
+    index_task = asyncio.create_task(ensure_indexes_in_background(get_db()))
+    counters_task = asyncio.create_task(run_counter_repair(get_db()))
+    search_task = asyncio.create_task(backfill_search_fields_in_background(get_db()))
+    rollup_task = None
+    # Compaction is only worth its cost when /dashboard/stats reads the rollups
+    if DASHBOARD_ROLLUPS_ENABLED:
+        rollup_task = asyncio.create_task(get_dashboard_rollups().run(get_db()))
+    get_validator_registry().load()
+    print("Validation rules compiled...")
+    ruleset_task = None
+    if RULESET_POLL_INTERVAL > 0:
+        ruleset_task = asyncio.create_task(get_payer_ruleset_store().run(get_db()))
     yield
     # Code to run on shutdown
     print("Shutting down...")
+    for task in (index_task, counters_task, search_task, rollup_task, ruleset_task):
+        if task:
+            task.cancel()
+    shutdown_validation_pool()
 
 app = FastAPI(
     title="Preauth Agent APIs", 
@@ -0,0 +1,736 @@
+"""
+Tests for the dashboard building blocks that need no database:
+keyset cursors, the dashboard response cache, the live feed fan-out,
+status counter transitions, the export encoders and search ranking.
+The aggregation pipelines run against _FakeDb, a small in-memory evaluator
+of just the stages and operators the dashboard uses
+Run with `python -m pytest test_dashboard.py` or `python test_dashboard.py`
+"""
+
+import asyncio
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from bson import ObjectId
+from starlette.requests import Request
+
+import api.dashboard_api as dashboard_api
+
+from db.dashboard_cache import DashboardResponseCache
+from db.dashboard_rollups import (
+    DASHBOARD_DIRTY_COLLECTION, DASHBOARD_ROLLUP_COLLECTION, DashboardRollups, fold_day, mark_stale_days
+)
+from db.keyset import decode_cursor, encode_cursor, keyset_filter
+from db.models.dbmodels.requestProgress import RequestStatus
+from db.progress_events import ProgressBroadcaster, Subscriber
+from db.request_export import EXPORT_COLUMNS, stream_csv, stream_ndjson
+from db.request_search import _score
+from db.status_counters import UNKNOWN_PAYER, apply_transition, counter_key
+
+def _after_cursor(row, query_filter):
+    """Evaluate a keyset_filter result against one row"""
+    if not query_filter:
+        return True
+    older, same_time = query_filter["$or"]
+    (time_field, condition), = older.items()
+    key_field = next(field for field in same_time if field != time_field)
+    return row[time_field] < condition["$lt"] or (
+        row[time_field] == same_time[time_field] and row[key_field] < same_time[key_field]["$lt"]
+    )
+
+def test_cursor_round_trip():
+    timestamp = datetime(2026, 3, 1, 12, 30, 15, 123000)
+    cursor = encode_cursor(timestamp, "req-9/x")
+    assert "=" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == (timestamp, "req-9/x")
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(datetime(2026, 1, 1), "a")[:-3]])
+def test_bad_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_keyset_pages_break_timestamp_ties_by_id():
+    base = datetime(2026, 1, 1)
+    # Several rows share a timestamp, so the id decides their order
+    rows = [{"lastUpdatedAt": base + timedelta(minutes=minute), "requestId": f"r{index}"}
+            for index, minute in enumerate([0, 1, 1, 1, 2, 2, 3])]
+    ordered = sorted(rows, key=lambda row: (row["lastUpdatedAt"], row["requestId"]), reverse=True)
+
+    seen, cursor = [], None
+    while True:
+        query_filter = keyset_filter("lastUpdatedAt", "requestId", cursor)
+        page = [row for row in ordered if _after_cursor(row, query_filter)][:2]
+        if not page:
+            break
+        seen.extend(page)
+        cursor = encode_cursor(page[-1]["lastUpdatedAt"], page[-1]["requestId"])
+    assert seen == ordered
+
+def test_first_page_has_no_filter():
+    assert keyset_filter("lastUpdatedAt", "requestId", None) == {}
+
+def _request(path="/api/dashboard/stats", query=b"days=7", if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": headers})
+
+class _Counter:
+    """compute() for the cache: returns a new body on every call"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return {"calls": self.calls}, {"X-Next-Cursor": "abc"}
+
+def test_cache_serves_etag_and_304():
+    cache = DashboardResponseCache(max_entries=8, ttl_seconds=60)
+    compute = _Counter()
+
+    first = asyncio.run(cache.respond(_request(), compute))
+    etag = first.headers["etag"]
+    assert json.loads(first.body) == {"calls": 1}
+    assert first.headers["x-next-cursor"] == "abc"
+
+    second = asyncio.run(cache.respond(_request(), compute))
+    assert (second.body, second.headers["etag"], compute.calls) == (first.body, etag, 1)
+
+    not_modified = asyncio.run(cache.respond(_request(if_none_match=f'W/{etag}'), compute))
+    assert not_modified.status_code == 304 and not not_modified.body
+    assert cache.stats()["not_modified"] == 1
+
+    # Other query parameters are a different entry
+    asyncio.run(cache.respond(_request(query=b"days=30"), compute))
+    assert compute.calls == 2
+
+def test_cache_invalidation_bumps_generation():
+    cache = DashboardResponseCache(max_entries=8, ttl_seconds=60)
+    compute = _Counter()
+    etag = asyncio.run(cache.respond(_request(), compute)).headers["etag"]
+
+    cache.invalidate({"requestId": "r1"})
+    fresh = asyncio.run(cache.respond(_request(if_none_match=etag), compute))
+    assert fresh.status_code == 200
+    assert json.loads(fresh.body) == {"calls": 2}
+    assert fresh.headers["etag"] != etag
+    assert cache.stats()["stale"] == 1
+
+def test_cache_drops_results_computed_across_a_write():
+    cache = DashboardResponseCache(max_entries=8, ttl_seconds=60)
+
+    async def compute_during_write():
+        cache.invalidate()
+        return {"stale": True}, {}
+
+    asyncio.run(cache.respond(_request(), compute_during_write))
+    assert cache.stats()["entries"] == 0
+
+def test_cache_lru_eviction_and_ttl():
+    cache = DashboardResponseCache(max_entries=1, ttl_seconds=60)
+    compute = _Counter()
+    asyncio.run(cache.respond(_request(query=b"days=1"), compute))
+    asyncio.run(cache.respond(_request(query=b"days=2"), compute))
+    assert cache.stats()["evictions"] == 1
+
+    expired = DashboardResponseCache(max_entries=8, ttl_seconds=1e-9)
+    asyncio.run(expired.respond(_request(), compute))
+    asyncio.run(expired.respond(_request(), compute))
+    assert expired.stats()["hits"] == 0
+
+def _drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+def test_subscriber_queue_drops_oldest_when_full():
+    subscriber = Subscriber(queue_size=2)
+    for number in range(1, 5):
+        subscriber.offer({"requestId": f"r{number}"})
+    assert subscriber.dropped == 2
+    assert [event["requestId"] for event in _drain(subscriber)] == ["r3", "r4"]
+
+def test_broadcaster_filters_by_request_and_payer():
+    broadcaster = ProgressBroadcaster()
+    everything = broadcaster.subscribe()
+    one_request = broadcaster.subscribe(request_id="r1")
+    one_payer = broadcaster.subscribe(payer_id="P2")
+
+    broadcaster.publish({"requestId": "r1", "payerId": "P1", "status": "processing"})
+    broadcaster.publish({"requestId": "r2", "payerId": "P2", "status": "completed"})
+
+    assert [event["id"] for event in _drain(everything)] == [1, 2]
+    assert [event["requestId"] for event in _drain(one_request)] == ["r1"]
+    assert [event["requestId"] for event in _drain(one_payer)] == ["r2"]
+    assert broadcaster.stats()["delivered"] == 4
+
+    broadcaster.unsubscribe(everything)
+    broadcaster.unsubscribe(one_request)
+    broadcaster.unsubscribe(one_payer)
+    broadcaster.publish({"requestId": "r3"})
+    assert broadcaster.stats()["published"] == 2
+
+class _RecordingCollection:
+    def __init__(self):
+        self.batches = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.batches.append(operations)
+
+class _RecordingDb:
+    def __init__(self):
+        self.collection = _RecordingCollection()
+
+    def __getitem__(self, name):
+        return self.collection
+
+def _deltas(before, after):
+    db = _RecordingDb()
+    asyncio.run(apply_transition(db, before, after))
+    return [
+        ((operation._filter["day"], operation._filter["payerId"], operation._filter["status"]),
+         operation._doc["$inc"]["count"])
+        for batch in db.collection.batches for operation in batch
+    ]
+
+def test_counter_key():
+    when = datetime(2026, 5, 4, 23, 59)
+    assert counter_key({"lastUpdatedAt": when, "payerId": "P1", "status": RequestStatus.COMPLETED}) == \
+        ("2026-05-04", "P1", "completed")
+    assert counter_key({"lastUpdatedAt": when}) == ("2026-05-04", UNKNOWN_PAYER, "unknown")
+    assert counter_key({"status": "completed"}) is None
+
+def test_transition_moves_one_request_between_counters():
+    day_one, day_two = datetime(2026, 5, 4, 10), datetime(2026, 5, 5, 9)
+    before = {"lastUpdatedAt": day_one, "payerId": "P1", "status": "processing"}
+
+    # New request
+    assert _deltas(None, before) == [(("2026-05-04", "P1", "processing"), 1)]
+    # Status change on a later day
+    assert _deltas(before, {**before, "lastUpdatedAt": day_two, "status": RequestStatus.COMPLETED}) == [
+        (("2026-05-04", "P1", "processing"), -1), (("2026-05-05", "P1", "completed"), 1)
+    ]
+    # Payer recorded later: the request leaves the unknown payer's counter
+    assert _deltas({**before, "payerId": None}, before) == [
+        (("2026-05-04", UNKNOWN_PAYER, "processing"), -1), (("2026-05-04", "P1", "processing"), 1)
+    ]
+    # Same day, payer and status: nothing written
+    assert _deltas(before, {**before, "lastUpdatedAt": day_one + timedelta(hours=1)}) == []
+
+_EXPORT_ROWS = [
+    [{
+        "request_id": "r1", "patient_name": 'Doe, "Jane"', "created_at": datetime(2026, 1, 2, 3, 4, 5),
+        "remarks": "line one\nline two", "actions_total": 1,
+        "actions": [{"id": "a1", "actionStatus": "PENDING", "metadata": '{"k": "v, w"}'}]
+    }],
+    [{"request_id": "r2", "remarks": None, "actions_total": 0, "actions": []}]
+]
+
+async def _batches():
+    for rows in _EXPORT_ROWS:
+        yield [{column: row.get(column) for column in EXPORT_COLUMNS} for row in rows]
+
+async def _collect(stream):
+    return "".join([chunk async for chunk in stream])
+
+def test_csv_export_escapes_and_keeps_one_row_per_request():
+    text = asyncio.run(_collect(stream_csv(_batches())))
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [row["request_id"] for row in rows] == ["r1", "r2"]
+    assert rows[0]["patient_name"] == 'Doe, "Jane"'
+    assert rows[0]["remarks"] == "line one\nline two"
+    assert rows[0]["created_at"] == "2026-01-02T03:04:05"
+    assert json.loads(rows[0]["actions"]) == _EXPORT_ROWS[0][0]["actions"]
+    assert (rows[1]["remarks"], rows[1]["actions"]) == ("", "[]")
+
+def test_csv_export_without_rows_is_the_header():
+    async def nothing():
+        return
+        yield
+    assert asyncio.run(_collect(stream_csv(nothing()))).strip() == ",".join(EXPORT_COLUMNS)
+
+def test_ndjson_export_is_one_object_per_line():
+    lines = asyncio.run(_collect(stream_ndjson(_batches()))).splitlines()
+    assert [json.loads(line)["request_id"] for line in lines] == ["r1", "r2"]
+    assert json.loads(lines[0])["remarks"] == "line one\nline two"
+
+def test_search_score_ranks_exact_before_prefix():
+    candidates = {
+        "id_exact": {"patientId": "ANN"},
+        "name_exact": {"patientName": " Ann "},
+        "id_prefix": {"patientId": "ann-42"},
+        "short_name": {"patientName": "Anna"},
+        "long_name": {"patientName": "Annabelle Smith"},
+        "no_match": {"patientName": "Bob", "patientId": "x-ann"}
+    }
+    scores = {name: _score("ann", request, {}) for name, request in candidates.items()}
+    assert scores["id_exact"] == (3.0, ["patient_id"])
+    assert scores["name_exact"] == (2.5, ["patient_name"])
+    assert scores["id_prefix"] == (2.0, ["patient_id"])
+    assert scores["no_match"] == (0.0, [])
+    ranked = sorted(candidates, key=lambda name: -scores[name][0])
+    assert ranked[:5] == ["id_exact", "name_exact", "id_prefix", "short_name", "long_name"]
+    assert 1.5 < scores["long_name"][0] < scores["short_name"][0] < 2.0
+
+def test_search_score_adds_remarks_text_score():
+    score, matched_on = _score("ann", {"patientNameLower": "ann"}, {"score": 0.75})
+    assert (score, matched_on) == (3.25, ["patient_name", "remarks"])
+    assert _score("ann", {"patientName": "Bob"}, {"score": 0.75}) == (0.75, ["remarks"])
+    assert _score("", {"patientId": "ann"}, {"score": 0.75}) == (0.0, [])
+
+# ============================================================================
+# In-memory Mongo for the aggregation pipelines
+# ============================================================================
+
+def _get(document, path):
+    value = document
+    for part in path.split("."):
+        if isinstance(value, list):
+            value = [item.get(part) for item in value if isinstance(item, dict)]
+        elif isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+def _eval(expression, document):
+    if expression == "$$NOW":
+        return datetime.now()
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get(document, expression[1:])
+    if isinstance(expression, dict) and len(expression) == 1 and next(iter(expression)).startswith("$"):
+        (operator, argument), = expression.items()
+        if operator == "$literal":
+            return argument
+        if operator == "$ifNull":
+            return next((value for value in (_eval(arg, document) for arg in argument) if value is not None), None)
+        if operator == "$concat":
+            return "".join(_eval(arg, document) for arg in argument)
+        value = _eval(argument, document)
+        if operator == "$toUpper":
+            return "" if value is None else str(value).upper()
+        if operator == "$first":
+            return value[0] if value else None
+        if operator == "$objectToArray":
+            return [{"k": key, "v": item} for key, item in value.items()]
+        if operator == "$arrayToObject":
+            return {pair["k"]: pair["v"] for pair in value}
+        raise NotImplementedError(operator)
+    if isinstance(expression, dict):
+        return {key: _eval(value, document) for key, value in expression.items()}
+    return expression
+
+def _compare(operator, value, argument):
+    if operator == "$in":
+        return value in argument
+    if operator == "$ne":
+        return value != argument
+    if operator == "$type":
+        return argument == "date" and isinstance(value, datetime)
+    try:
+        return value is not None and {
+            "$gte": value >= argument, "$gt": value > argument, "$lte": value <= argument, "$lt": value < argument
+        }[operator]
+    except TypeError:
+        return False
+
+def _matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(document, branch) for branch in condition):
+                return False
+            continue
+        value = _get(document, key)
+        if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            if not all(_compare(op, value, argument) for op, argument in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+def _sort(rows, keys):
+    for key, direction in reversed(list(keys.items())):
+        rows = sorted(rows, key=lambda row: (_get(row, key) is not None, _get(row, key)), reverse=direction < 0)
+    return rows
+
+def _flag(value):
+    """True/False for an inclusion/exclusion in $project, None for an expression"""
+    return None if isinstance(value, (dict, str)) else bool(value)
+
+def _project(document, spec):
+    if not spec:
+        return dict(document)
+    if all(_flag(value) is False for value in spec.values()):
+        return {key: value for key, value in document.items() if key not in spec}
+    keep_id = "_id" in document and _flag(spec.get("_id", True)) is not False
+    projected = {"_id": document["_id"]} if keep_id else {}
+    for key, value in spec.items():
+        if _flag(value) is None:
+            projected[key] = _eval(value, document)
+        elif _flag(value) and _get(document, key) is not None:
+            projected[key] = _get(document, key)
+    return projected
+
+def _freeze(value):
+    return tuple(sorted((key, _freeze(item)) for key, item in value.items())) if isinstance(value, dict) else value
+
+def _group(rows, spec):
+    groups = {}
+    for row in rows:
+        group_id = _eval(spec["_id"], row)
+        group = groups.setdefault(_freeze(group_id), {"_id": group_id})
+        for name, accumulator in spec.items():
+            if name == "_id":
+                continue
+            (operator, argument), = accumulator.items()
+            value = _eval(argument, row)
+            if operator == "$sum":
+                group[name] = group.get(name, 0) + (value if isinstance(value, (int, float)) else 0)
+            elif operator == "$push":
+                group.setdefault(name, []).append(value)
+            elif operator == "$mergeObjects":
+                group.setdefault(name, {}).update(value or {})
+            else:
+                raise NotImplementedError(operator)
+    return list(groups.values())
+
+class _Cursor:
+    """Enough of motor's cursors for the dashboard code"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def sort(self, keys):
+        self.rows = _sort(self.rows, dict(keys))
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.rows)
+
+    async def _iterate(self):
+        for row in self.rows:
+            yield row
+
+    def __aiter__(self):
+        return self._iterate()
+
+class _FakeCollection:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.docs = []
+
+    def insert(self, *documents):
+        for document in documents:
+            self.docs.append({"_id": ObjectId(), **document})
+
+    def aggregate(self, pipeline):
+        self.db.pipelines.append((self.name, pipeline))
+        if self.db.canned:
+            return _Cursor(self.db.canned.pop(0))
+        return _Cursor(self.db.run(self.name, pipeline))
+
+    def find(self, query=None, projection=None, sort=None):
+        self.db.finds.append((self.name, query))
+        cursor = _Cursor([_project(doc, projection) for doc in self.docs if _matches(doc, query or {})])
+        return cursor.sort(sort) if sort else cursor
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        rows = self.find(query, projection, sort).rows
+        return rows[0] if rows else None
+
+    async def update_one(self, query, update, upsert=False):
+        document = next((doc for doc in self.docs if _matches(doc, query)), None)
+        if document is None:
+            if not upsert:
+                return
+            document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+            document.setdefault("_id", ObjectId())
+            self.docs.append(document)
+        for key, amount in update.get("$inc", {}).items():
+            document[key] = document.get(key, 0) + amount
+        document.update(update.get("$set", {}))
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            await self.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+
+    async def delete_one(self, query):
+        for document in self.docs:
+            if _matches(document, query):
+                self.docs.remove(document)
+                return
+
+    async def delete_many(self, query):
+        self.docs = [doc for doc in self.docs if not _matches(doc, query)]
+
+class _FakeDb:
+    def __init__(self, canned=None):
+        self.collections = {}
+        self.pipelines = []
+        self.finds = []
+        # Results handed out, in order, instead of evaluating the pipelines
+        self.canned = list(canned or [])
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = _FakeCollection(self, name)
+        return self.collections[name]
+
+    def run(self, name, pipeline):
+        rows = [dict(doc) for doc in self[name].docs]
+        for stage in pipeline:
+            (operator, spec), = stage.items()
+            if operator == "$match":
+                rows = [row for row in rows if _matches(row, spec)]
+            elif operator == "$sort":
+                rows = _sort(rows, spec)
+            elif operator == "$limit":
+                rows = rows[:spec]
+            elif operator == "$project":
+                rows = [_project(row, spec) for row in rows]
+            elif operator == "$group":
+                rows = _group(rows, spec)
+            elif operator == "$count":
+                rows = [{spec: len(rows)}] if rows else []
+            elif operator == "$unwind":
+                rows = [{**row, spec[1:]: item} for row in rows for item in _get(row, spec[1:]) or []]
+            elif operator == "$lookup":
+                for row in rows:
+                    joined = [dict(doc) for doc in self[spec["from"]].docs
+                              if _get(doc, spec["foreignField"]) == _get(row, spec["localField"])]
+                    row[spec["as"]] = self._run_rows(joined, spec.get("pipeline", []))
+            elif operator == "$unionWith":
+                rows = rows + self.run(spec["coll"], spec.get("pipeline", []))
+            elif operator == "$merge":
+                target = self[spec["into"]]
+                assert spec["whenMatched"] == "replace"
+                for row in rows:
+                    target.docs = [doc for doc in target.docs if doc["_id"] != row["_id"]] + [row]
+                rows = []
+            else:
+                raise NotImplementedError(operator)
+        return rows
+
+    def _run_rows(self, rows, pipeline):
+        scratch = _FakeDb()
+        scratch["rows"].docs = rows
+        return scratch.run("rows", pipeline)
+
+def _stage_names(pipeline):
+    return [next(iter(stage)) for stage in pipeline]
+
+def _at(days_ago, hour=12):
+    return datetime.combine(date.today() - timedelta(days=days_ago), time(hour))
+
+# (requestId, payerId, status, created days ago, last updated days ago)
+_REQUESTS = [
+    ("r1", "P1", RequestStatus.COMPLETED, 3, 2),
+    ("r2", "P1", RequestStatus.FAILED, 2, 2),
+    ("r3", "P2", RequestStatus.USER_ACTION_REQUIRED, 2, 1),
+    ("r4", "P2", RequestStatus.PROCESSING, 1, 0),
+    ("r5", "P3", RequestStatus.COMPLETED, 1, 0),
+    ("r6", "P3", RequestStatus.IN_PROGRESS, 0, 0),
+]
+
+def _progress(request_id, payer_id, status, updated):
+    return {"requestId": request_id, "payerId": payer_id, "status": status.value,
+            "lastUpdatedAt": updated, "workflowStep": "step", "remarks": "ok"}
+
+def _seeded_db():
+    """Requests, their progress documents and the counters the progress writes would have kept"""
+    db = _FakeDb()
+    for request_id, payer_id, status, created, updated in _REQUESTS:
+        created_at = datetime.now() if created == 0 else _at(created, 9)
+        db["priorAuthRequest"].insert({"requestId": request_id, "payerId": payer_id, "patientName": f"Patient {request_id}",
+                                       "userId": "u1" if request_id < "r4" else "u2", "createdAt": created_at})
+        updated_at = datetime.now() if updated == 0 else _at(updated)
+        progress = _progress(request_id, payer_id, status, updated_at)
+        db["requestProgress"].insert(progress)
+        asyncio.run(apply_transition(db, None, progress))
+    return db
+
+def _stats(monkeypatch, db, source, compute, *args):
+    monkeypatch.setattr(dashboard_api, "get_db", lambda: db)
+    monkeypatch.setattr(dashboard_api, "DASHBOARD_STATS_SOURCE", source)
+    db.pipelines.clear()
+    return asyncio.run(compute(*args))
+
+def test_raw_and_counter_stats_agree(monkeypatch):
+    db = _seeded_db()
+    raw = _stats(monkeypatch, db, "raw", dashboard_api.compute_dashboard_stats, 7)
+    [(collection, pipeline)] = db.pipelines
+    assert collection == "requestProgress" and _stage_names(pipeline) == ["$match", "$group"]
+    assert list(pipeline[0]["$match"]) == ["lastUpdatedAt"]
+
+    counters = _stats(monkeypatch, db, "counters", dashboard_api.compute_dashboard_stats, 7)
+    assert [collection for collection, _ in db.pipelines] == ["requestStatusCounters"]
+    assert raw == counters
+    assert (raw.total_requests, raw.completed_requests, raw.pending_requests) == (6, 2, 2)
+    assert (raw.failed_requests, raw.user_action_required, raw.success_rate) == (1, 1, 33.33)
+
+    # A narrower window drops the older days from both
+    assert _stats(monkeypatch, db, "raw", dashboard_api.compute_dashboard_stats, 1).total_requests == \
+        _stats(monkeypatch, db, "counters", dashboard_api.compute_dashboard_stats, 1).total_requests
+
+def test_recent_requests_join_in_one_pipeline(monkeypatch):
+    db = _seeded_db()
+    for number, status in enumerate(["PENDING", "PENDING", "COMPLETED"]):
+        db["priorAuthUserAction"].insert({"id": f"a{number}", "requestId": "r3", "actionStatus": status})
+    # Progress without an original request is skipped but still moves the cursor
+    db["requestProgress"].insert(_progress("orphan", "P1", RequestStatus.PROCESSING, _at(0, 0)))
+
+    results, cursor = _stats(monkeypatch, db, "counters", dashboard_api.load_recent_requests, 4, None, None, None)
+    [(collection, pipeline)] = db.pipelines
+    assert collection == "requestProgress"
+    assert _stage_names(pipeline) == ["$match", "$sort", "$limit", "$lookup", "$lookup", "$project"]
+    assert [stage["$lookup"]["from"] for stage in pipeline[3:5]] == ["priorAuthRequest", "priorAuthUserAction"]
+    assert all(stage["$lookup"]["localField"] == "requestId" for stage in pipeline[3:5])
+
+    newest_first = ["r6", "r5", "r4", "r3", "r2", "r1"]
+    assert [result.request_id for result in results] == newest_first[:3]
+    assert results[0].patient_name == "Patient r6" and results[0].payer_id == "P3"
+    assert cursor is not None
+
+    page, cursor = _stats(monkeypatch, db, "counters", dashboard_api.load_recent_requests, 4, None, None, cursor)
+    assert [result.request_id for result in page] == newest_first[3:]
+    assert page[0].user_actions_pending == 2 and page[1].user_actions_pending == 0
+    assert cursor is None
+
+    mine, _ = _stats(monkeypatch, db, "counters", dashboard_api.load_recent_requests, 10, "completed", "u1", None)
+    assert [result.request_id for result in mine] == ["r1"]
+
+def _by_payer(response):
+    return {stats["payer_id"]: stats for stats in response["payer_statistics"]}
+
+def test_raw_and_counter_payer_stats_agree(monkeypatch):
+    db = _seeded_db()
+    raw = _stats(monkeypatch, db, "raw", dashboard_api.compute_payer_statistics, 7)
+    [(collection, pipeline)] = db.pipelines
+    assert collection == "priorAuthRequest"
+    assert _stage_names(pipeline) == ["$match", "$project", "$lookup", "$group"]
+    assert list(pipeline[0]["$match"]) == ["createdAt"] and pipeline[2]["$lookup"]["from"] == "requestProgress"
+
+    counters = _stats(monkeypatch, db, "counters", dashboard_api.compute_payer_statistics, 7)
+    assert (raw["windowed_by"], counters["windowed_by"]) == ("createdAt", "lastUpdatedAt")
+    # Every fixture request was created and last updated inside the window
+    assert _by_payer(raw) == _by_payer(counters)
+    assert _by_payer(raw)["P1"] == {
+        "payer_id": "P1", "total_requests": 2, "completed_requests": 1, "failed_requests": 1,
+        "pending_requests": 0, "user_action_required": 0, "success_rate": 50.0
+    }
+
+    # Counters keep requests whose progress has no payer yet, under the unknown payer
+    orphan = _progress("r7", None, RequestStatus.PROCESSING, datetime.now())
+    asyncio.run(apply_transition(db, None, orphan))
+    counters = _stats(monkeypatch, db, "counters", dashboard_api.compute_payer_statistics, 7)
+    assert _by_payer(counters)[UNKNOWN_PAYER]["pending_requests"] == 1
+
+def test_patient_names_load_in_one_in_query():
+    db = _seeded_db()
+    names = asyncio.run(dashboard_api.load_patient_names(db, {"r1", "r3", "missing"}))
+    assert names == {"r1": "Patient r1", "r3": "Patient r3"}
+    [(collection, query)] = db.finds
+    assert collection == "priorAuthRequest" and sorted(query["requestId"]["$in"]) == ["missing", "r1", "r3"]
+
+    assert asyncio.run(dashboard_api.load_patient_names(db, set())) == {}
+    assert len(db.finds) == 1
+
+def test_latency_pipelines_and_bucket_merge(monkeypatch):
+    hour = datetime(2026, 5, 4, 10)
+    group = {"completed_requests": 2, "p": [60.0, 90.0, 99.5], "mean": 70.1234, "max": 100.0}
+    db = _FakeDb(canned=[
+        [{"by_payer": [{"_id": "P1", **group}], "overall": [{"_id": None, **group}]}],
+        [{"_id": hour, "count": 3}, {"_id": hour + timedelta(hours=1), "count": 1}],
+        [{"_id": hour + timedelta(hours=1), "count": 2}]
+    ])
+    result = _stats(monkeypatch, db, "counters", dashboard_api.compute_turnaround_latency, 7, "hour")
+
+    (latency_collection, latency), (created_collection, created), (completed_collection, completed) = db.pipelines
+    assert (latency_collection, created_collection, completed_collection) == \
+        ("requestProgress", "priorAuthRequest", "requestProgress")
+    assert list(latency[0]["$match"]) == ["completedAt"] and latency[2]["$lookup"]["from"] == "priorAuthRequest"
+    percentile = latency[-1]["$facet"]["overall"][0]["$group"]["p"]["$percentile"]
+    assert percentile["p"] == [0.5, 0.9, 0.99] and percentile["input"] == "$turnaround_seconds"
+    assert created[1]["$group"]["_id"]["$dateTrunc"] == {"date": "$createdAt", "unit": "hour"}
+    assert completed[1]["$group"]["_id"]["$dateTrunc"] == {"date": "$completedAt", "unit": "hour"}
+
+    assert result["turnaround_seconds"]["overall"] == \
+        {"completed_requests": 2, "p50": 60.0, "p90": 90.0, "p99": 99.5, "mean": 70.123, "max": 100.0}
+    assert result["turnaround_seconds"]["by_payer"][0]["payer_id"] == "P1"
+    assert result["throughput"] == [
+        {"bucket": hour, "created": 3, "completed": 0},
+        {"bucket": hour + timedelta(hours=1), "created": 1, "completed": 2}
+    ]
+
+def test_latency_without_completed_requests(monkeypatch):
+    db = _FakeDb(canned=[[], [], []])
+    result = _stats(monkeypatch, db, "counters", dashboard_api.compute_turnaround_latency, 1, "day")
+    assert result["turnaround_seconds"] == {"overall": None, "by_payer": []} and result["throughput"] == []
+
+def test_fold_day_replaces_the_days_rollups():
+    db = _seeded_db()
+    day = _at(2).date()
+    stale = {"_id": f"{day.isoformat()}|P9", "day": day.isoformat(), "payerId": "P9", "foldId": ObjectId()}
+    db[DASHBOARD_ROLLUP_COLLECTION].docs.append(stale)
+
+    asyncio.run(fold_day(db, day))
+    [(collection, pipeline)] = db.pipelines
+    assert collection == "requestProgress"
+    assert _stage_names(pipeline) == \
+        ["$match", "$group", "$group", "$project", "$unionWith", "$group", "$project", "$merge"]
+    assert pipeline[4]["$unionWith"]["coll"] == "priorAuthRequest"
+    assert pipeline[-1]["$merge"] == {"into": DASHBOARD_ROLLUP_COLLECTION, "whenMatched": "replace", "whenNotMatched": "insert"}
+
+    rollups = {doc["payerId"]: doc for doc in db[DASHBOARD_ROLLUP_COLLECTION].docs}
+    # Payers without data that day are removed; the rest carry this fold's id
+    assert set(rollups) == {"P1", "P2"}
+    assert rollups["P1"]["statuses"] == {"completed": 1, "failed": 1} and rollups["P1"]["created"] == 1
+    assert rollups["P2"]["statuses"] == {} and rollups["P2"]["created"] == 1
+    assert rollups["P1"]["foldId"] == rollups["P2"]["foldId"] == pipeline[6]["$project"]["foldId"]["$literal"]
+
+def _all_sources(monkeypatch, db, rollups):
+    monkeypatch.setattr(dashboard_api, "get_dashboard_rollups", lambda: rollups)
+    return {source: _stats(monkeypatch, db, source, dashboard_api.compute_dashboard_stats, 7)
+            for source in ("raw", "counters", "rollups")}
+
+def test_rollups_agree_and_refold_dirty_days(monkeypatch):
+    monkeypatch.setattr("db.dashboard_rollups.DASHBOARD_ROLLUPS_ENABLED", True)
+    db = _seeded_db()
+    rollups = DashboardRollups()
+    assert asyncio.run(rollups.compact(db)) == 3
+    assert rollups.closed_through == _at(1).date()
+    stats = _all_sources(monkeypatch, db, rollups)
+    assert stats["raw"] == stats["counters"] == stats["rollups"]
+
+    # r1 leaves a folded day: its old day is marked and refolded by the next compaction
+    [progress] = [doc for doc in db["requestProgress"].docs if doc["requestId"] == "r1"]
+    before = dict(progress)
+    progress.update(status=RequestStatus.FAILED.value, lastUpdatedAt=datetime.now())
+    asyncio.run(apply_transition(db, before, progress))
+    asyncio.run(mark_stale_days(db, before, progress))
+    assert [marker["_id"] for marker in db[DASHBOARD_DIRTY_COLLECTION].docs] == [_at(2).date().isoformat()]
+    assert _all_sources(monkeypatch, db, rollups)["rollups"].total_requests == 7
+
+    assert asyncio.run(rollups.compact(db)) == 1
+    assert db[DASHBOARD_DIRTY_COLLECTION].docs == []
+    stats = _all_sources(monkeypatch, db, rollups)
+    assert stats["raw"] == stats["counters"] == stats["rollups"]
+    assert stats["rollups"].failed_requests == 2
+
+def test_dirty_markers_need_rollups_enabled(monkeypatch):
+    monkeypatch.setattr("db.dashboard_rollups.DASHBOARD_ROLLUPS_ENABLED", False)
+    db = _FakeDb()
+    before = _progress("r1", "P1", RequestStatus.PROCESSING, _at(3))
+    asyncio.run(mark_stale_days(db, before, {**before, "status": RequestStatus.COMPLETED.value}))
+    assert db[DASHBOARD_DIRTY_COLLECTION].docs == []
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
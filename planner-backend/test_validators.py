@@ -0,0 +1,620 @@
+"""
+Equivalence tests: code-generated payer validators vs jsonschema,
+plus the validation result cache, incremental and multi-payer validation, metrics
+the batch and streaming endpoints and the in-process TOOL 4 path
+Run with `python -m pytest test_validators.py` or `python test_validators.py`
+"""
+
+import asyncio
+import copy
+import json
+import os
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+from validation.codegen import UnsupportedSchema, compile_validator
+from validation.incremental import IncrementalValidator
+from validation.metrics import ValidationMetrics, get_validation_metrics
+from validation.multi_payer import MultiPayerValidator
+from validation.pool import shutdown_validation_pool
+from validation.payload import evaluate_payload, evaluate_payload_detailed
+from validation.registry import ValidatorRegistry, compile_payer_schema, get_validator_registry
+from validation.result_cache import ValidationResultCache
+from validation.ruleset_store import PayerRulesetStore
+from validation.service import ValidationService, content_length
+from validation.streaming import validate_stream
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), 'rulesets', 'all_rules.json')
+
+with open(RULES_PATH, 'r') as file:
+    ALL_RULES = json.load(file)
+
+# Exercises every supported keyword, including the less common type/const forms
+KITCHEN_SINK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": ["string", "integer"]},
+        "count": {"type": "integer", "const": 3},
+        "ratio": {"type": "number"},
+        "active": {"type": "boolean", "const": True},
+        "note": {"type": ["string", "null"], "minLength": 2},
+        "tags": {"type": "array", "items": {"type": "string", "pattern": "^[a-z]+$"}},
+        "nested": {
+            "type": "object",
+            "properties": {"code": {"type": "string", "pattern": "\\d{3}"}},
+            "required": ["code"]
+        }
+    },
+    "required": ["id", "count"]
+}
+
+KITCHEN_SINK_CASES = [
+    {"id": "a", "count": 3},
+    {"id": 7, "count": 3.0, "ratio": 1.5, "active": True, "note": None, "tags": ["ab"], "nested": {"code": "x123"}},
+    {"id": 7.5, "count": 3},
+    {"id": True, "count": 3},
+    {"id": "a", "count": True},
+    {"id": "a", "count": 4},
+    {"id": "a", "count": 3, "ratio": "1"},
+    {"id": "a", "count": 3, "ratio": False},
+    {"id": "a", "count": 3, "active": 1},
+    {"id": "a", "count": 3, "note": "x"},
+    {"id": "a", "count": 3, "note": 5},
+    {"id": "a", "count": 3, "tags": ["ok", "Bad"]},
+    {"id": "a", "count": 3, "tags": "ok"},
+    {"id": "a", "count": 3, "nested": {}},
+    {"id": "a", "count": 3, "nested": {"code": "12"}},
+    {"count": 3},
+    [],
+    None,
+]
+
+def _sample_value(prop_schema):
+    """A value that satisfies a leaf schema from all_rules.json"""
+    if "const" in prop_schema:
+        return prop_schema["const"]
+    pattern = prop_schema.get("pattern")
+    if pattern == "^(71271|71250|71260)$":
+        return "71250"
+    if pattern == "^\\d{2}/\\d{2}/\\d{4}$":
+        return "01/02/2025"
+    return "value"
+
+def _valid_payload(schema, items=3):
+    item_schema = schema["properties"]["response"]["items"]
+    item = {name: _sample_value(prop) for name, prop in item_schema["properties"].items()}
+    return {"response": [copy.deepcopy(item) for _ in range(items)]}
+
+def _payer_cases(schema):
+    """Valid payload plus one mutation per way each field can fail"""
+    valid = _valid_payload(schema)
+    cases = [valid, {}, {"response": "x"}, {"response": []}, {"response": [1]}, {"response": [{}]}, "x"]
+    item_schema = schema["properties"]["response"]["items"]
+    for index in (0, 2):
+        for name in item_schema["properties"]:
+            for replacement in (None, 5, "", "zz", True, ["x"]):
+                case = copy.deepcopy(valid)
+                case["response"][index][name] = replacement
+                cases.append(case)
+            case = copy.deepcopy(valid)
+            del case["response"][index][name]
+            cases.append(case)
+    extra = copy.deepcopy(valid)
+    extra["response"][1]["unexpected"] = {"nested": True}
+    extra["metadata"] = 1
+    cases.append(extra)
+    return cases
+
+def assert_equivalent(schema, instance):
+    fast = compile_validator(schema)
+    reference = validator_for(schema)(schema)
+    errors = list(reference.iter_errors(instance))
+    violation = fast(instance)
+
+    assert (violation is None) == (not errors), f"validity differs for {instance!r}"
+    if violation is not None:
+        expected = {(tuple(e.absolute_path), e.validator) for e in errors}
+        assert (tuple(violation.absolute_path), violation.validator) in expected
+        assert violation.message in {e.message for e in errors}
+
+    # What callers see must be the error jsonschema.validate() reports
+    error = compile_payer_schema("test", schema, "v").first_error(instance)
+    if errors:
+        assert error.message == best_match(reference.iter_errors(instance)).message
+        assert list(error.absolute_path) == list(best_match(reference.iter_errors(instance)).absolute_path)
+    else:
+        assert error is None
+
+@pytest.mark.parametrize("payer_id", sorted(ALL_RULES))
+def test_payer_rules_match_jsonschema(payer_id):
+    schema = ALL_RULES[payer_id]
+    for instance in _payer_cases(schema):
+        assert_equivalent(schema, instance)
+
+@pytest.mark.parametrize("instance", KITCHEN_SINK_CASES)
+def test_supported_keywords_match_jsonschema(instance):
+    assert_equivalent(KITCHEN_SINK_SCHEMA, instance)
+
+def test_reported_error_is_jsonschema_best_match():
+    registry = ValidatorRegistry()
+    registry.load()
+    payload = {"response": [{"payerid": "350007", "requestid": "", "cptcodes": "zz"}, {"payerid": "350007"}]}
+    result = evaluate_payload(payload, registry.get)
+    assert not result.is_valid
+    assert result.error_message == "JSON validation failed: 'requestid' is a required property"
+
+def test_wrong_payer_payload_fails_const():
+    schema = ALL_RULES["350007"]
+    payload = _valid_payload(ALL_RULES["123456"], items=1)
+    violation = compile_validator(schema)(payload)
+    assert violation is not None
+    assert violation.validator in ("const", "required")
+
+def test_unsupported_keywords_are_rejected():
+    for schema in ({"type": "object", "additionalProperties": False},
+                   {"type": "array", "items": [{"type": "string"}]},
+                   {"type": "string", "format": "date"}):
+        with pytest.raises(UnsupportedSchema):
+            compile_validator(schema)
+
+def test_result_cache_key_ignores_key_order():
+    one = ValidationResultCache.make_key({"a": 1, "b": [1, 2]}, "350007", "v1")
+    two = ValidationResultCache.make_key({"b": [1, 2], "a": 1}, "350007", "v1")
+    assert one == two
+    assert one != ValidationResultCache.make_key({"a": 1, "b": [1, 2]}, "350007", "v2")
+
+def test_result_cache_lru_ttl_and_invalidation():
+    cache = ValidationResultCache(max_entries=2, ttl_seconds=60)
+    cache.put(("p", "v", "1"), "one")
+    cache.put(("p", "v", "2"), "two")
+    assert cache.get(("p", "v", "1")) == "one"
+    cache.put(("p", "v", "3"), "three")
+    assert cache.get(("p", "v", "2")) is None
+    assert cache.evictions == 1
+
+    cache.clear()
+    assert cache.get(("p", "v", "1")) is None
+
+    expired = ValidationResultCache(max_entries=2, ttl_seconds=-1)
+    expired.put(("p", "v", "1"), "one")
+    assert expired.get(("p", "v", "1")) is None
+    assert expired.expirations == 1
+
+@pytest.mark.parametrize("codegen", [True, False])
+def test_result_cache_only_fronts_jsonschema_payers(monkeypatch, codegen):
+    monkeypatch.setattr("validation.registry.VALIDATION_CODEGEN", codegen)
+    registry = ValidatorRegistry()
+    registry.load()
+    cache = ValidationResultCache(max_entries=8, ttl_seconds=60)
+    service = ValidationService(registry, cache, offload_min_bytes=0)
+    payload = _valid_payload(ALL_RULES["350007"], items=2)
+    for _ in range(2):
+        assert service.validate_sync(payload).is_valid
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"]) == ((0, 0) if codegen else (1, 1))
+
+class _RulesetCursor:
+    def __init__(self, collection, rows):
+        self.collection = collection
+        self.rows = rows
+
+    def hint(self, index):
+        self.collection.hints.append(index)
+        return self
+
+    async def _iterate(self):
+        for row in self.rows:
+            yield dict(row)
+
+    def __aiter__(self):
+        return self._iterate()
+
+class _RulesetCollection:
+    def __init__(self):
+        self.docs = []
+        self.indexes = []
+        self.hints = []
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append(keys)
+
+    def find(self, query, projection=None):
+        wanted = query.get("payerId", {}).get("$in")
+        return _RulesetCursor(self, [doc for doc in self.docs if wanted is None or doc["payerId"] in wanted])
+
+def _ruleset(payer_id, version, schema):
+    return {"payerId": payer_id, "version": version,
+            "schemaJson": schema if isinstance(schema, str) else json.dumps(schema)}
+
+def test_ruleset_store_publishes_only_compiled_versions():
+    registry = ValidatorRegistry()
+    registry.load()
+    file_snapshot = registry.snapshot()
+    published = []
+    registry.add_reload_listener(published.append)
+    collection = _RulesetCollection()
+    db = {"payerRulesets": collection}
+    store = PayerRulesetStore(registry, poll_interval=0)
+
+    strict = {"type": "object", "required": ["extra"]}
+    collection.docs = [
+        _ruleset("350007", 2, strict),
+        _ruleset("777", 1, {"type": 12}),
+        _ruleset("888", 1, "not json")
+    ]
+    assert asyncio.run(store.refresh(db)) == 1
+    assert collection.hints == [[("payerId", 1), ("version", 1)]]
+    assert [("payerId", 1), ("version", 1)] in collection.indexes
+
+    # One new snapshot; readers holding the old one keep the file rules
+    [snapshot] = published
+    assert registry.snapshot() is snapshot is not file_snapshot
+    assert snapshot.payers["350007"].version == "db:2" and snapshot.payers["350007"].schema == strict
+    assert file_snapshot.payers["350007"].version.startswith("file:")
+    assert "777" not in snapshot.payers and "888" not in snapshot.payers
+    stats = store.stats()
+    assert stats["known_versions"] == {"350007": 2}
+    assert sorted(stats["rejected"]) == ["777", "888"] and stats["rejected"]["777"]["version"] == 1
+
+    # Rejected versions are retried, but publish nothing while they still fail
+    assert asyncio.run(store.refresh(db)) == 0
+    assert len(published) == 1
+
+    collection.docs[1] = _ruleset("777", 2, {"type": "object"})
+    collection.docs.pop(0)
+    assert asyncio.run(store.refresh(db)) == 2
+    assert registry.get("777").version == "db:2"
+    assert registry.get("350007").version == file_snapshot.payers["350007"].version
+    assert store.stats()["known_versions"] == {"777": 2} and list(store.stats()["rejected"]) == ["888"]
+    assert len(published) == 2
+
+def _write_rules(path, rules, mtime_offset):
+    path.write_text(rules if isinstance(rules, str) else json.dumps(rules))
+    stamp = os.stat(path).st_mtime + mtime_offset
+    os.utime(path, (stamp, stamp))
+
+def test_registry_recompiles_a_changed_rules_file_on_lookup(tmp_path):
+    rules_path = tmp_path / "rules.json"
+    _write_rules(rules_path, {"350007": ALL_RULES["350007"]}, 0)
+    registry = ValidatorRegistry(str(rules_path), check_interval=0)
+    registry.load()
+    first = registry.get("350007")
+
+    # New content is picked up by the next lookup
+    _write_rules(rules_path, {"350007": ALL_RULES["350007"], "123": {"type": "object"}}, 10)
+    assert registry.get("123") is not None and registry.get("350007").version != first.version
+    reloads = registry.reloads
+
+    # A touched but identical file is not recompiled
+    _write_rules(rules_path, {"350007": ALL_RULES["350007"], "123": {"type": "object"}}, 20)
+    registry.get("350007")
+    assert registry.reloads == reloads
+
+    # A broken file keeps the last good snapshot
+    _write_rules(rules_path, "{not json", 30)
+    assert registry.get("123") is not None
+    assert registry.reload_errors == 1 and registry.last_reload_error
+
+    # Between checks the file is not even looked at
+    lazy_path = tmp_path / "lazy.json"
+    _write_rules(lazy_path, {"350007": ALL_RULES["350007"]}, 0)
+    lazy = ValidatorRegistry(str(lazy_path), check_interval=3600)
+    lazy.load()
+    os.remove(lazy_path)
+    assert lazy.get("350007") is not None and lazy.reload_errors == 0
+
+def test_incremental_patch_matches_full_validation():
+    registry = ValidatorRegistry()
+    registry.load()
+    incremental = IncrementalValidator(registry)
+    payload = _valid_payload(ALL_RULES["350007"], items=5)
+    incremental.remember("req-1", payload, evaluate_payload(payload, registry.get))
+
+    patches = [
+        [{"op": "replace", "path": "/response/3/cptcodes", "value": "zz"}],
+        [{"op": "remove", "path": "/response/0"}],
+        [{"op": "add", "path": "/response/0", "value": {"payerid": "350007"}}],
+        [{"op": "replace", "path": "/response/3/cptcodes", "value": "71250"},
+         {"op": "remove", "path": "/response/0"}],
+    ]
+    for patch in patches:
+        expected = copy.deepcopy(payload)
+        result = incremental.apply_patch("req-1", patch)
+        payload = result.payload
+        full = evaluate_payload(payload, registry.get)
+        assert result.response.is_valid == full.is_valid
+        assert result.response.error_message == full.error_message
+        assert payload != expected
+    assert result.response.is_valid
+
+def test_patch_after_failed_validation_is_incremental():
+    registry = ValidatorRegistry()
+    registry.load()
+    incremental = IncrementalValidator(registry)
+    payload = _valid_payload(ALL_RULES["350007"], items=200)
+    payload["response"][42]["cptcodes"] = "zz"
+    failed = evaluate_payload(payload, registry.get)
+    assert not failed.is_valid
+    incremental.remember("req-2", payload, failed)
+
+    result = incremental.apply_patch("req-2", [{"op": "replace", "path": "/response/42/cptcodes", "value": "71250"}])
+    assert result.response.is_valid
+    assert (result.revalidated_items, result.full_revalidation) == (1, False)
+
+    # A patch that misses the failing item keeps reporting it
+    incremental.remember("req-3", payload, failed)
+    result = incremental.apply_patch("req-3", [{"op": "replace", "path": "/response/0/cptcodes", "value": "71260"}])
+    assert result.response.error_message == failed.error_message
+    assert list(result.failed_paths) == ["response/42/cptcodes"]
+    assert result.revalidated_items == 1
+
+def test_multi_payer_groups_items_by_payer():
+    registry = ValidatorRegistry()
+    registry.load()
+    first = _valid_payload(ALL_RULES["350007"], items=3)["response"]
+    second = _valid_payload(ALL_RULES["123456"], items=2)["response"]
+    items = [first[0], second[0], first[1], second[1], first[2], {"payerid": "999"}, {"requestid": "x"}]
+    items[2] = {**items[2], "cptcodes": "zz"}
+
+    result = asyncio.run(MultiPayerValidator(registry, parallel_threshold=0).validate({"response": items}))
+    by_payer = {breakdown.payer_id: breakdown for breakdown in result.payers}
+
+    assert not result.is_valid
+    assert [breakdown.payer_id for breakdown in result.payers] == ["350007", "123456", "999"]
+    assert (by_payer["350007"].valid_items, by_payer["350007"].invalid_items) == (2, 1)
+    assert by_payer["350007"].errors[0].path == "response/2/cptcodes"
+    assert by_payer["123456"].is_valid
+    assert by_payer["999"].error_message == "No validation rules found for payer ID: 999"
+    assert result.unattributed_items == [6]
+
+def test_metrics_count_failures_by_path_and_keyword():
+    registry = ValidatorRegistry()
+    registry.load()
+    metrics = ValidationMetrics(max_failure_keys=1)
+    valid = _valid_payload(ALL_RULES["350007"], items=2)
+    invalid = copy.deepcopy(valid)
+    invalid["response"][1]["cptcodes"] = "zz"
+    missing = copy.deepcopy(valid)
+    del missing["response"][0]["requestid"]
+
+    for payload, elapsed_ms in ((valid, 0.2), (invalid, 3.0), (invalid, 4.0), (missing, 1.0)):
+        result, failure = evaluate_payload_detailed(payload, registry.get)
+        metrics.record("350007", elapsed_ms, result.is_valid, failure)
+
+    summary = metrics.summary()["payers"]["350007"]
+    assert (summary["valid"], summary["invalid"]) == (1, 3)
+    assert summary["top_failures"] == [{"key": "response/1/cptcodes:pattern", "count": 2},
+                                       {"key": "other", "count": 1}]
+    assert 0.2 <= summary["latency_ms"]["p50"] <= summary["latency_ms"]["p99"] <= 4.0
+    assert 'validation_failures_total{payer_id="350007",path="response/1/cptcodes",keyword="pattern"} 2' \
+        in metrics.prometheus()
+
+def test_benchmark_suite_runs_at_tiny_scale(monkeypatch):
+    import api.agent_tools as agent_tools
+    from benchmarks.validation_suite import run_suite
+    from validation.service import get_validation_service
+
+    # build_variants swaps in a null database and disables offloading; undo both afterwards
+    monkeypatch.setattr(agent_tools, "get_db", agent_tools.get_db)
+    monkeypatch.setattr(get_validation_service(), "offload_min_bytes", get_validation_service().offload_min_bytes)
+    results = asyncio.run(run_suite(ALL_RULES, [1], [], scale=0.02, seed=7))
+
+    variants = {result["variant"] for result in results}
+    assert "tool4_validate_patient_json" in variants
+    assert len(results) == len(ALL_RULES) * 2 * len(variants)
+
+def test_large_bodies_are_validated_on_the_pool():
+    registry = ValidatorRegistry()
+    registry.load()
+    service = ValidationService(registry, offload_min_bytes=2048)
+    valid = _valid_payload(ALL_RULES["350007"], items=40)
+    invalid = copy.deepcopy(valid)
+    invalid["response"][7]["cptcodes"] = "zz"
+    try:
+        for payload in (valid, invalid):
+            offloaded = asyncio.run(service.validate(payload))
+            assert offloaded.model_dump() == service.validate_sync(payload).model_dump()
+        assert service.offload_stats()["offloaded"] == 2
+
+        # The declared body size decides, not the payload's shape
+        asyncio.run(service.validate(valid, body_bytes=100))
+        assert service.offload_stats()["inline"] == 1
+        asyncio.run(service.validate({"response": [{"payerid": "350007"}]}, body_bytes=4096))
+        assert service.offload_stats()["offloaded"] == 3
+    finally:
+        shutdown_validation_pool()
+
+def test_content_length_reads_the_header():
+    class FakeRequest:
+        def __init__(self, headers):
+            self.headers = headers
+
+    assert content_length(FakeRequest({"content-length": "1234"})) == 1234
+    assert content_length(FakeRequest({})) is None
+    assert content_length(FakeRequest({"content-length": "abc"})) is None
+    assert content_length(None) is None
+
+@pytest.fixture(scope="module")
+def client():
+    from api.validate_json import router
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    yield TestClient(app)
+    shutdown_validation_pool()
+
+def test_batch_endpoint_streams_one_line_per_record(client):
+    valid = _valid_payload(ALL_RULES["350007"], items=2)
+    invalid = copy.deepcopy(valid)
+    invalid["response"][1]["cptcodes"] = "zz"
+    body = "\n".join([
+        json.dumps({"request_id": "ok", "json_data": valid}),
+        "not json",
+        "",
+        json.dumps({"request_id": "bad", "json_data": invalid}),
+        json.dumps({"request_id": "unknown", "json_data": {"response": [{"payerid": "999"}]}})
+    ])
+    response = client.post("/api/validate-json/batch", params={"chunk_size": 1}, content=body)
+    assert response.status_code == 200
+    *records, summary = [json.loads(line) for line in response.text.splitlines()]
+
+    by_id = {record["request_id"]: record for record in records}
+    assert len(records) == 4 and by_id["ok"]["is_valid"]
+    assert by_id[None]["error_message"].startswith("Invalid NDJSON record")
+    assert by_id["bad"]["error_message"] == evaluate_payload(invalid, get_validator_registry().get).error_message
+    assert by_id["unknown"]["error_message"] == "No validation rules found for payer ID: 999"
+    assert {key: summary["summary"][key] for key in ("records", "valid", "invalid")} == \
+        {"records": 4, "valid": 1, "invalid": 3}
+    assert summary["summary"]["payers"]["350007"]["records"] == 2
+
+def test_batch_endpoint_reports_a_failed_worker_chunk(client, monkeypatch):
+    from concurrent.futures.process import BrokenProcessPool
+    calls = []
+
+    def broken_second_chunk(fn, *args):
+        calls.append(args)
+        future = asyncio.get_running_loop().create_future()
+        if len(calls) == 2:
+            future.set_exception(BrokenProcessPool("worker died"))
+        else:
+            future.set_result(fn(*args))
+        return future
+
+    monkeypatch.setattr("validation.batch.submit_to_pool", broken_second_chunk)
+    valid = _valid_payload(ALL_RULES["350007"], items=1)
+    body = "\n".join(json.dumps({"request_id": f"r{index}", "json_data": valid}) for index in range(3))
+    response = client.post("/api/validate-json/batch", params={"chunk_size": 1}, content=body)
+    *records, summary = [json.loads(line) for line in response.text.splitlines()]
+
+    by_id = {record["request_id"]: record for record in records}
+    assert by_id["r0"]["is_valid"] and by_id["r2"]["is_valid"]
+    assert by_id["r1"]["error_message"] == "Internal server error during validation: worker died"
+    assert by_id["r1"]["http_status"] == "500 Internal Server Error"
+    assert {key: summary["summary"][key] for key in ("records", "valid", "invalid")} == \
+        {"records": 3, "valid": 2, "invalid": 1}
+
+class _ToolCollection:
+    def __init__(self, calls, name):
+        self.calls = calls
+        self.name = name
+
+    def _record(self, method, *args):
+        self.calls.append((self.name, method, args))
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        self._record("find_one_and_update", query, update)
+        return {"status": "created", "lastUpdatedAt": datetime(2026, 1, 1), "payerId": None}
+
+    async def bulk_write(self, operations, ordered=True):
+        self._record("bulk_write", len(operations))
+
+    async def replace_one(self, query, document, upsert=False):
+        self._record("replace_one", query, document)
+
+    async def delete_one(self, query):
+        self._record("delete_one", query)
+
+class _ToolDb:
+    """Records the writes TOOL 4 makes"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getitem__(self, name):
+        return _ToolCollection(self.calls, name)
+
+def _run_tool4(monkeypatch, request_id, payload):
+    import api.agent_tools as agent_tools
+
+    class NoHttp:
+        def __init__(self, *args, **kwargs):
+            raise AssertionError("TOOL 4 must not call the validation API over HTTP")
+
+    db = _ToolDb()
+    monkeypatch.setattr(agent_tools, "get_db", lambda: db)
+    monkeypatch.setattr(agent_tools.httpx, "AsyncClient", NoHttp)
+    request = agent_tools.JsonValidationRequest(patient_data=payload, payer_id="350007", request_id=request_id)
+    return asyncio.run(agent_tools.validate_patient_json(request)), db.calls
+
+def _progress_updates(calls):
+    return [args[1]["$set"] for name, method, args in calls
+            if name == "requestProgress" and method == "find_one_and_update"]
+
+def test_tool4_validates_in_process(monkeypatch):
+    sources = lambda: get_validation_metrics().summary()["payers"].get("350007", {}).get("sources", {}).get("tool4", 0)
+    before = sources()
+    valid = _valid_payload(ALL_RULES["350007"], items=2)
+    response, calls = _run_tool4(monkeypatch, "tool4-ok", valid)
+    assert response.is_valid and response.message == "JSON validation passed"
+    assert [update["status"] for update in _progress_updates(calls)] == ["processing", "processing"]
+    assert _progress_updates(calls)[-1]["payerId"] == "350007"
+    # A valid payload is never patched, so nothing is persisted for it
+    assert [(name, method) for name, method, _ in calls if name == "validationSessions"] == \
+        [("validationSessions", "delete_one")]
+
+    invalid = copy.deepcopy(valid)
+    invalid["response"][1]["cptcodes"] = "zz"
+    response, calls = _run_tool4(monkeypatch, "tool4-bad", invalid)
+    expected = evaluate_payload(invalid, get_validator_registry().get).error_message
+    assert not response.is_valid and response.validation_errors == [expected]
+    assert _progress_updates(calls)[-1]["status"] == "user_action_required"
+    [(_, _, (query, document))] = [call for call in calls if call[:2] == ("validationSessions", "replace_one")]
+    assert query == {"_id": "tool4-bad"} and json.loads(document["payload"]) == invalid
+    assert sources() == before + 2
+
+def _stream_body(payload, chunk_bytes=64):
+    body = json.dumps({"json_data": payload}).encode()
+    return len(body), (body[start:start + chunk_bytes] for start in range(0, len(body), chunk_bytes))
+
+def test_stream_endpoint_reports_every_failing_item(client):
+    payload = _valid_payload(ALL_RULES["350007"], items=20)
+    for index in (3, 7, 15):
+        payload["response"][index]["cptcodes"] = "zz"
+    size, chunks = _stream_body(payload)
+    result = client.post("/api/validate-json/stream", content=chunks).json()
+    assert (result["items_validated"], result["invalid_items"], result["stopped_early"]) == (20, 3, False)
+    assert [error["index"] for error in result["errors"]] == [3, 7, 15]
+    assert result["error_message"] == evaluate_payload(payload, get_validator_registry().get).error_message
+    assert result["bytes_read"] == size
+
+def test_stream_endpoint_fail_fast_stops_reading(client):
+    payload = _valid_payload(ALL_RULES["350007"], items=50)
+    payload["response"][2]["cptcodes"] = "zz"
+    size, chunks = _stream_body(payload)
+    result = client.post("/api/validate-json/stream", params={"fail_fast": True}, content=chunks).json()
+    assert result["stopped_early"] and not result["is_valid"]
+    assert (result["invalid_items"], result["items_validated"]) == (1, 3)
+    assert result["errors"][0]["path"] == "response/2/cptcodes"
+
+    # TestClient hands the app the body in one piece, so check the early stop on a real chunk stream
+    consumed = []
+
+    async def body():
+        for chunk in _stream_body(payload)[1]:
+            consumed.append(chunk)
+            yield chunk
+
+    streamed = asyncio.run(validate_stream(body(), get_validator_registry(), fail_fast=True))
+    assert streamed.stopped_early and streamed.bytes_read == sum(map(len, consumed)) < size
+
+def test_stream_endpoint_accepts_a_valid_payload(client):
+    _, chunks = _stream_body(_valid_payload(ALL_RULES["350007"], items=5))
+    result = client.post("/api/validate-json/stream", content=chunks).json()
+    assert result["is_valid"] and result["items_validated"] == 5 and not result["errors"]
+
+@pytest.mark.parametrize("payload", [{"response": []}, {"response": {"payerid": "350007"}}, {}])
+def test_stream_endpoint_needs_response_items(client, payload):
+    result = client.post("/api/validate-json/stream", json={"json_data": payload}).json()
+    assert not result["is_valid"] and result["items_validated"] == 0
+    assert result["error_message"] == "Unable to extract payer ID from JSON data"
+
+def test_stream_endpoint_rejects_malformed_json(client):
+    result = client.post("/api/validate-json/stream", content=b'{"json_data": {"response": [{"payerid": ').json()
+    assert not result["is_valid"] and result["error_message"].startswith("Invalid JSON")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
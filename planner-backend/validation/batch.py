@@ -0,0 +1,179 @@
+"""
+Streaming NDJSON batch validation
+Reads {request_id, json_data} records line by line, validates them in
+chunks on the process pool and yields one NDJSON result line per record
+as each chunk finishes. At most `max_in_flight` chunks are held at once.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from fastapi.responses import StreamingResponse
+
+from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
+from validation.payload import get_payer_id_from_json
+from validation.pool import VALIDATION_POOL_SIZE, submit_to_pool, validate_records
+from validation.registry import ValidatorRegistry
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator is itself reading the request body.
+    Starlette's default disconnect listener would compete for receive() and
+    swallow request chunks; the iterator sees disconnects through request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+def _error_line(request_id, message: str) -> bytes:
+    return (json.dumps({
+        "request_id": request_id,
+        "is_valid": False,
+        "http_status": HttpResponseEnum.BAD_REQUEST.value,
+        "error_message": message
+    }) + "\n").encode()
+
+async def _iter_lines(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without reading it all"""
+    buffer = b""
+    async for chunk in body:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+class _PayerThroughput:
+    def __init__(self):
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, result: Dict[str, Any]):
+        payer = self.stats.setdefault(result.get("payer_id") or "UNKNOWN", {
+            "records": 0, "valid": 0, "invalid": 0, "validation_ms": 0.0
+        })
+        payer["records"] += 1
+        payer["valid" if result["is_valid"] else "invalid"] += 1
+        payer["validation_ms"] += result.get("elapsed_ms", 0.0)
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {}
+        for payer_id, payer in self.stats.items():
+            seconds = payer["validation_ms"] / 1000
+            summary[payer_id] = {
+                **payer,
+                "validation_ms": round(payer["validation_ms"], 3),
+                "records_per_second": round(payer["records"] / seconds, 1) if seconds > 0 else None
+            }
+        return summary
+
+async def stream_batch_results(
+    body: AsyncIterator[bytes],
+    registry: ValidatorRegistry,
+    chunk_size: int,
+    max_in_flight: int = VALIDATION_POOL_SIZE * 2
+) -> AsyncIterator[bytes]:
+    """Validate an NDJSON request body and yield NDJSON result lines"""
+    started = time.perf_counter()
+    throughput = _PayerThroughput()
+    # pool future -> the records it validates, to report them if the worker fails
+    in_flight: Dict[asyncio.Future, List[Tuple[Any, Any]]] = {}
+    chunk: List[Tuple[Any, Any]] = []
+    totals = {"records": 0, "valid": 0, "invalid": 0}
+
+    def submit(records):
+        # Ship only the schemas this chunk needs, tagged with their version
+        payer_schemas = {}
+        for _, json_data in records:
+            payer_id = get_payer_id_from_json(json_data)
+            if payer_id and payer_id not in payer_schemas:
+                compiled = registry.get(payer_id)
+                if compiled is not None:
+                    payer_schemas[payer_id] = (compiled.version, compiled.schema)
+        try:
+            future = submit_to_pool(validate_records, payer_schemas, records)
+        except Exception as e:
+            # e.g. BrokenProcessPool: fail this chunk's records like a worker failure would
+            future = asyncio.get_running_loop().create_future()
+            future.set_exception(e)
+        in_flight[future] = records
+
+    def result_lines(results) -> bytes:
+        lines = []
+        for result in results:
+            throughput.add(result)
+            totals["records"] += 1
+            totals["valid" if result["is_valid"] else "invalid"] += 1
+            lines.append(json.dumps({
+                "request_id": result["request_id"],
+                "is_valid": result["is_valid"],
+                "http_status": result["http_status"],
+                "error_message": result["error_message"]
+            }))
+        return ("\n".join(lines) + "\n").encode() if lines else b""
+
+    def collect(done) -> bytes:
+        output = b""
+        for future in done:
+            records = in_flight.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:
+                # A failed chunk still gets one line per record, and the stream its summary
+                results = [{
+                    "request_id": request_id,
+                    "payer_id": get_payer_id_from_json(json_data),
+                    "is_valid": False,
+                    "http_status": HttpResponseEnum.INTERNAL_SERVER_ERROR.value,
+                    "error_message": f"Internal server error during validation: {str(e)}"
+                } for request_id, json_data in records]
+            output += result_lines(results)
+        return output
+
+    async def drain() -> bytes:
+        done, _ = await asyncio.wait(list(in_flight), return_when=asyncio.FIRST_COMPLETED)
+        return collect(done)
+
+    async for line in _iter_lines(body):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            request_id = record.get("request_id")
+            json_data = record["json_data"]
+        except Exception as e:
+            totals["records"] += 1
+            totals["invalid"] += 1
+            yield _error_line(None, f"Invalid NDJSON record: {str(e)}")
+            continue
+
+        chunk.append((request_id, json_data))
+        if len(chunk) >= chunk_size:
+            submit(chunk)
+            chunk = []
+            if len(in_flight) >= max_in_flight:
+                yield await drain()
+            else:
+                # Flush whatever already finished without waiting
+                done = [future for future in in_flight if future.done()]
+                if done:
+                    yield collect(done)
+
+    if chunk:
+        submit(chunk)
+    while in_flight:
+        yield await drain()
+
+    elapsed = time.perf_counter() - started
+    yield (json.dumps({
+        "summary": {
+            **totals,
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "records_per_second": round(totals["records"] / elapsed, 1) if elapsed > 0 else None,
+            "payers": throughput.summary()
+        }
+    }) + "\n").encode()
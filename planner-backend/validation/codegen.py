@@ -0,0 +1,190 @@
+"""
+Code-generated validators for payer rulesets
+Turns a payer schema into a plain Python function with the keyword checks
+inlined and regexes precompiled. Only the JSON Schema subset used by
+rulesets/all_rules.json is supported; anything else raises UnsupportedSchema
+so the caller can fall back to the generic jsonschema validator.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Keywords with no effect on validation
+ANNOTATION_KEYWORDS = {"$schema", "$id", "$comment", "title", "description", "default", "examples"}
+SUPPORTED_KEYWORDS = {"type", "const", "pattern", "minLength", "required", "properties", "items"} | ANNOTATION_KEYWORDS
+
+TYPE_CHECKS = {
+    "string": "isinstance({v}, str)",
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "integer": "((isinstance({v}, int) and not isinstance({v}, bool)) or (isinstance({v}, float) and {v}.is_integer()))",
+}
+
+class UnsupportedSchema(Exception):
+    """Raised when a schema uses keywords the code generator does not handle"""
+
+@dataclass
+class SchemaViolation:
+    """First failure found by a generated validator (mirrors jsonschema.ValidationError fields)"""
+    message: str
+    absolute_path: Tuple[Any, ...]
+    validator: str
+
+def _unbool(element, true=object(), false=object()):
+    if element is True:
+        return true
+    if element is False:
+        return false
+    return element
+
+def _equal(one, two):
+    """Same equality rules as jsonschema's `const` (bools never equal ints)"""
+    if one is two:
+        return True
+    if isinstance(one, str) or isinstance(two, str):
+        return one == two
+    if isinstance(one, list) and isinstance(two, list):
+        return len(one) == len(two) and all(_equal(a, b) for a, b in zip(one, two))
+    if isinstance(one, dict) and isinstance(two, dict):
+        return one.keys() == two.keys() and all(_equal(one[key], two[key]) for key in one)
+    return _unbool(one) == _unbool(two)
+
+class _Generator:
+    def __init__(self):
+        self.lines: List[str] = []
+        self.constants: Dict[str, Any] = {}
+        self._counter = 0
+
+    def _name(self, prefix: str) -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+
+    def constant(self, prefix: str, value) -> str:
+        name = self._name(prefix)
+        self.constants[name] = value
+        return name
+
+    def emit(self, indent: int, line: str):
+        self.lines.append("    " * indent + line)
+
+    def fail(self, indent: int, path: List[str], keyword: str, message_expr: str):
+        path_expr = "(" + "".join(f"{part}, " for part in path) + ")"
+        self.emit(indent, f"return SchemaViolation({message_expr}, {path_expr}, {keyword!r})")
+
+    def node(self, schema, var: str, path: List[str], indent: int):
+        if schema is True or schema == {}:
+            return
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema(f"Unsupported schema node: {schema!r}")
+        unknown = set(schema) - SUPPORTED_KEYWORDS
+        if unknown:
+            raise UnsupportedSchema(f"Unsupported keywords: {sorted(unknown)}")
+
+        # Same keyword order as the schema, like jsonschema's iter_errors
+        for keyword, value in schema.items():
+            if keyword == "type":
+                self._type(value, var, path, indent)
+            elif keyword == "const":
+                self._const(value, var, path, indent)
+            elif keyword == "pattern":
+                self._pattern(value, var, path, indent)
+            elif keyword == "minLength":
+                self._min_length(value, var, path, indent)
+            elif keyword == "required":
+                self._required(value, var, path, indent)
+            elif keyword == "properties":
+                self._properties(value, var, path, indent)
+            elif keyword == "items":
+                self._items(value, var, path, indent)
+
+    def _type(self, types, var, path, indent):
+        types = [types] if isinstance(types, str) else list(types)
+        if any(t not in TYPE_CHECKS for t in types):
+            raise UnsupportedSchema(f"Unsupported type: {types!r}")
+        check = " or ".join(TYPE_CHECKS[t].format(v=var) for t in types)
+        reprs = ", ".join(repr(t) for t in types)
+        self.emit(indent, f"if not ({check}):")
+        self.fail(indent + 1, path, "type", f"f'{{{var}!r}} is not of type ' + {self.constant('M', reprs)}")
+
+    def _const(self, value, var, path, indent):
+        name = self.constant("C", value)
+        message = self.constant("M", f"{value!r} was expected")
+        if isinstance(value, str):
+            self.emit(indent, f"if {var} != {name}:")
+        else:
+            self.emit(indent, f"if not _equal({var}, {name}):")
+        self.fail(indent + 1, path, "const", message)
+
+    def _pattern(self, pattern, var, path, indent):
+        compiled = self.constant("P", re.compile(pattern))
+        suffix = self.constant("M", f" does not match {pattern!r}")
+        self.emit(indent, f"if isinstance({var}, str) and not {compiled}.search({var}):")
+        self.fail(indent + 1, path, "pattern", f"repr({var}) + {suffix}")
+
+    def _min_length(self, limit, var, path, indent):
+        if not isinstance(limit, int) or isinstance(limit, bool):
+            raise UnsupportedSchema(f"Unsupported minLength: {limit!r}")
+        suffix = " should be non-empty" if limit == 1 else " is too short"
+        self.emit(indent, f"if isinstance({var}, str) and len({var}) < {limit}:")
+        self.fail(indent + 1, path, "minLength", f"repr({var}) + {suffix!r}")
+
+    def _required(self, required, var, path, indent):
+        if not required:
+            return
+        self.emit(indent, f"if isinstance({var}, dict):")
+        for prop in required:
+            self.emit(indent + 1, f"if {prop!r} not in {var}:")
+            self.fail(indent + 2, path, "required", repr(f"{prop!r} is a required property"))
+
+    def _properties(self, properties, var, path, indent):
+        if not isinstance(properties, dict) or not properties:
+            return
+        self.emit(indent, f"if isinstance({var}, dict):")
+        for prop, subschema in properties.items():
+            child = self._name("v")
+            self.emit(indent + 1, f"if {prop!r} in {var}:")
+            self.emit(indent + 2, f"{child} = {var}[{prop!r}]")
+            before = len(self.lines)
+            self.node(subschema, child, path + [repr(prop)], indent + 2)
+            if len(self.lines) == before:
+                self.emit(indent + 2, "pass")
+
+    def _items(self, items, var, path, indent):
+        if isinstance(items, bool):
+            if items:
+                return
+            raise UnsupportedSchema("items: false is not supported")
+        if not isinstance(items, dict):
+            raise UnsupportedSchema("Only single-schema `items` is supported")
+        index = self._name("i")
+        child = self._name("v")
+        self.emit(indent, f"if isinstance({var}, list):")
+        self.emit(indent + 1, f"for {index}, {child} in enumerate({var}):")
+        before = len(self.lines)
+        self.node(items, child, path + [index], indent + 2)
+        if len(self.lines) == before:
+            self.emit(indent + 2, "pass")
+
+def generate_source(schema: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Return the generated function source and the constants it references"""
+    generator = _Generator()
+    generator.emit(0, "def validate(data):")
+    generator.node(schema, "data", [], 1)
+    generator.emit(1, "return None")
+    return "\n".join(generator.lines), generator.constants
+
+def compile_validator(schema: Dict[str, Any], name: str = "payer") -> Callable[[Any], Optional[SchemaViolation]]:
+    """
+    Build a specialized validator for `schema`.
+    The returned function gives the first SchemaViolation in schema order, or None when valid.
+    """
+    source, constants = generate_source(schema)
+    namespace = {"SchemaViolation": SchemaViolation, "_equal": _equal, **constants}
+    exec(compile(source, f"<validator {name}>", "exec"), namespace)
+    validate = namespace["validate"]
+    validate.__source__ = source
+    return validate
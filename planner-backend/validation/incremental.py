@@ -0,0 +1,377 @@
+"""
+Incremental re-validation after JSON-Patch corrections
+The last validated payload of each request is kept together with its
+per-path results: one result for the document root (array items stripped)
+and one per item of every top-level array with an `items` schema
+(e.g. `response`). A patch re-checks only the root and the items it
+touches; untouched items keep their cached verdict.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.models.responseModels.jsonValidatorResponse import JsonValidatorResponse
+from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
+from validation.payload import evaluate_payload, get_payer_id_from_json
+from validation.registry import CompiledPayerSchema, ValidatorRegistry, compile_payer_schema
+
+VALIDATION_SESSION_SIZE = int(os.getenv("VALIDATION_SESSION_SIZE", "256"))
+VALIDATION_SESSION_TTL = float(os.getenv("VALIDATION_SESSION_TTL", "3600"))
+
+# Placeholder for an item result that must be recomputed
+_DIRTY = object()
+
+Issue = Tuple[Tuple[Any, ...], str]
+
+class JsonPatchError(ValueError):
+    """Raised for malformed or inapplicable JSON-Patch operations"""
+
+# ============================================================================
+# JSON Pointer / JSON Patch (RFC 6901 / RFC 6902 add, remove, replace)
+# ============================================================================
+
+def parse_pointer(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+def _list_index(container: list, token: str, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit():
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+def _shallow_copy(value):
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+def _apply_operation(document, operation: Dict[str, Any]):
+    """
+    Apply one operation without mutating `document`: only the containers on the
+    patched path are copied, everything else is shared with the original.
+    Returns (new document, op name, path tokens with resolved indexes).
+    """
+    op = operation.get("op")
+    if op not in ("add", "remove", "replace"):
+        raise JsonPatchError(f"Unsupported patch operation: {op!r}")
+    if "path" not in operation:
+        raise JsonPatchError("Patch operation is missing 'path'")
+    if op != "remove" and "value" not in operation:
+        raise JsonPatchError(f"'{op}' operation is missing 'value'")
+
+    tokens = parse_pointer(operation["path"])
+    if not tokens:
+        if op == "remove":
+            raise JsonPatchError("Cannot remove the document root")
+        return operation["value"], op, tokens
+
+    document = _shallow_copy(document)
+    parent = document
+    resolved = []
+    for token in tokens[:-1]:
+        if isinstance(parent, list):
+            index = _list_index(parent, token, allow_end=False)
+            resolved.append(index)
+            parent[index] = _shallow_copy(parent[index])
+            parent = parent[index]
+        elif isinstance(parent, dict) and token in parent:
+            resolved.append(token)
+            parent[token] = _shallow_copy(parent[token])
+            parent = parent[token]
+        else:
+            raise JsonPatchError(f"Path not found: {operation['path']}")
+
+    last = tokens[-1]
+    if isinstance(parent, list):
+        index = _list_index(parent, last, allow_end=(op == "add"))
+        resolved.append(index)
+        if op == "add":
+            parent.insert(index, operation["value"])
+        elif op == "remove":
+            del parent[index]
+        else:
+            parent[index] = operation["value"]
+    elif isinstance(parent, dict):
+        resolved.append(last)
+        if op != "add" and last not in parent:
+            raise JsonPatchError(f"Path not found: {operation['path']}")
+        if op == "remove":
+            del parent[last]
+        else:
+            parent[last] = operation["value"]
+    else:
+        raise JsonPatchError(f"Path not found: {operation['path']}")
+    return document, op, resolved
+
+# ============================================================================
+# Partitioned schemas
+# ============================================================================
+
+def split_schema(schema: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Split a payer schema into the root (top-level array `items` removed) and the per-array item schemas"""
+    properties = schema.get("properties") if isinstance(schema, dict) else None
+    if not isinstance(properties, dict):
+        return schema, {}
+    root_properties = {}
+    item_schemas = {}
+    for name, prop_schema in properties.items():
+        if isinstance(prop_schema, dict) and isinstance(prop_schema.get("items"), dict):
+            item_schemas[name] = prop_schema["items"]
+            prop_schema = {key: value for key, value in prop_schema.items() if key != "items"}
+        root_properties[name] = prop_schema
+    return {**schema, "properties": root_properties}, item_schemas
+
+class PartitionedSchema:
+    """Root and item validators compiled from one payer schema"""
+
+    def __init__(self, compiled: CompiledPayerSchema):
+        self.payer_id = compiled.payer_id
+        self.version = compiled.version
+        root_schema, item_schemas = split_schema(compiled.schema)
+        self.root = compile_payer_schema(compiled.payer_id, root_schema, compiled.version)
+        self.items = {
+            name: compile_payer_schema(compiled.payer_id, item_schema, compiled.version)
+            for name, item_schema in item_schemas.items()
+        }
+
+    def check_root(self, payload) -> Optional[Issue]:
+        error = self.root.first_error(payload)
+        return (tuple(error.absolute_path), error.message) if error is not None else None
+
+    def check_item(self, name: str, index: int, item) -> Optional[Issue]:
+        error = self.items[name].first_error(item)
+        return ((name, index, *error.absolute_path), error.message) if error is not None else None
+
+    def check_array(self, name: str, payload) -> List[Optional[Issue]]:
+        items = payload.get(name) if isinstance(payload, dict) else None
+        if not isinstance(items, list):
+            return []
+        return [self.check_item(name, index, item) for index, item in enumerate(items)]
+
+# payer id -> partition of that payer's current ruleset version
+_partitions: Dict[str, PartitionedSchema] = {}
+
+def partition_for(compiled: CompiledPayerSchema) -> PartitionedSchema:
+    """Shared cache of partitioned schemas; rebuilt when the payer's ruleset version changes"""
+    partition = _partitions.get(compiled.payer_id)
+    if partition is None or partition.version != compiled.version:
+        partition = PartitionedSchema(compiled)
+        _partitions[compiled.payer_id] = partition
+    return partition
+
+# ============================================================================
+# Sessions
+# ============================================================================
+
+@dataclass
+class ValidationSession:
+    payer_id: Optional[str]
+    version: Optional[str]
+    payload: Any
+    root_issue: Optional[Issue] = None
+    # array name -> one result per item; None until first needed
+    item_issues: Optional[Dict[str, List[Any]]] = None
+    touched_at: float = field(default_factory=time.monotonic)
+
+@dataclass
+class IncrementalResult:
+    response: JsonValidatorResponse
+    payload: Any
+    failed_paths: Dict[str, str]
+    revalidated_items: int
+    full_revalidation: bool
+
+def _path_key(path: Tuple[Any, ...]) -> str:
+    return "/".join(str(part) for part in path)
+
+class IncrementalValidator:
+    """Remembers validated payloads per request and re-checks only what a patch touches"""
+
+    def __init__(self, registry: ValidatorRegistry, max_sessions: int = VALIDATION_SESSION_SIZE,
+                 ttl_seconds: float = VALIDATION_SESSION_TTL):
+        self.registry = registry
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ValidationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, request_id: str, json_data, result: JsonValidatorResponse):
+        """
+        Keep the payload just validated for `request_id` with its per-item results,
+        so the first correction re-checks only the items it touches
+        """
+        payer_id = get_payer_id_from_json(json_data)
+        compiled = self.registry.get(payer_id) if payer_id else None
+        session = ValidationSession(
+            payer_id=payer_id,
+            version=compiled.version if compiled else None,
+            payload=json_data
+        )
+        if compiled is not None and result.is_valid:
+            # A valid document means every partition is valid too
+            _, item_schemas = split_schema(compiled.schema)
+            session.item_issues = {
+                name: [None] * len(json_data.get(name) or [])
+                for name in item_schemas if isinstance(json_data.get(name), list)
+            }
+        elif compiled is not None and isinstance(json_data, dict):
+            # A failed payload is the one about to be corrected: find out which items fail now
+            partition = partition_for(compiled)
+            session.root_issue = partition.check_root(json_data)
+            session.item_issues = {
+                name: partition.check_array(name, json_data)
+                for name in partition.items if isinstance(json_data.get(name), list)
+            }
+        with self._lock:
+            self._sessions[request_id] = session
+            self._sessions.move_to_end(request_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def restore(self, request_id: str, json_data):
+        """Re-create a session from a persisted payload; its first patch is re-checked in full"""
+        payer_id = get_payer_id_from_json(json_data)
+        compiled = self.registry.get(payer_id) if payer_id else None
+        self._store(request_id, ValidationSession(
+            payer_id=payer_id,
+            version=compiled.version if compiled else None,
+            payload=json_data
+        ))
+        with self._lock:
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _session(self, request_id: str) -> Optional[ValidationSession]:
+        with self._lock:
+            session = self._sessions.get(request_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.touched_at > self.ttl_seconds:
+                del self._sessions[request_id]
+                return None
+            session.touched_at = time.monotonic()
+            self._sessions.move_to_end(request_id)
+            return session
+
+    def has_session(self, request_id: str) -> bool:
+        return self._session(request_id) is not None
+
+    def apply_patch(self, request_id: str, operations: List[Dict[str, Any]]) -> IncrementalResult:
+        """
+        Apply JSON-Patch `operations` to the request's last payload and re-validate.
+        Raises KeyError if nothing was validated for the request, JsonPatchError for a bad patch.
+        """
+        session = self._session(request_id)
+        if session is None:
+            raise KeyError(request_id)
+
+        # Patches copy only the containers they touch, so a failing patch leaves the session untouched
+        payload = session.payload
+        item_issues = {name: list(issues) for name, issues in session.item_issues.items()} \
+            if session.item_issues is not None else None
+        for operation in operations:
+            payload, op, tokens = _apply_operation(payload, operation)
+            if item_issues is None:
+                continue
+            if not tokens:
+                item_issues = None
+            elif tokens[0] in item_issues or (len(tokens) == 1 and isinstance(payload, dict)
+                                              and isinstance(payload.get(tokens[0]), list)):
+                name = tokens[0]
+                issues = item_issues.get(name)
+                if len(tokens) == 1 or issues is None or not isinstance(tokens[1], int):
+                    # Whole array replaced, added or removed
+                    item_issues[name] = _DIRTY
+                elif issues is _DIRTY:
+                    pass
+                elif len(tokens) == 2 and op == "add":
+                    issues.insert(tokens[1], _DIRTY)
+                elif len(tokens) == 2 and op == "remove":
+                    del issues[tokens[1]]
+                else:
+                    issues[tokens[1]] = _DIRTY
+
+        payer_id = get_payer_id_from_json(payload)
+        compiled = self.registry.get(payer_id) if payer_id else None
+        if compiled is None:
+            # No usable rules: report exactly what /validate-json would
+            response = evaluate_payload(payload, lambda _: None)
+            self._store(request_id, ValidationSession(payer_id=payer_id, version=None, payload=payload))
+            return IncrementalResult(response, payload, {}, 0, True)
+
+        partition = partition_for(compiled)
+        full = (
+            item_issues is None
+            or payer_id != session.payer_id
+            or compiled.version != session.version
+        )
+        revalidated = 0
+        if full:
+            item_issues = {}
+            for name in partition.items:
+                item_issues[name] = partition.check_array(name, payload)
+                revalidated += len(item_issues[name])
+        else:
+            for name in partition.items:
+                issues = item_issues.get(name, _DIRTY)
+                if issues is _DIRTY:
+                    item_issues[name] = partition.check_array(name, payload)
+                    revalidated += len(item_issues[name])
+                    continue
+                items = payload[name]
+                for index, issue in enumerate(issues):
+                    if issue is _DIRTY:
+                        issues[index] = partition.check_item(name, index, items[index])
+                        revalidated += 1
+                    elif issue is not None and issue[0][1] != index:
+                        # Item moved after an insert/remove; re-anchor its cached path
+                        issues[index] = ((name, index, *issue[0][2:]), issue[1])
+
+        root_issue = partition.check_root(payload)
+        self._store(request_id, ValidationSession(
+            payer_id=payer_id,
+            version=compiled.version,
+            payload=payload,
+            root_issue=root_issue,
+            item_issues=item_issues
+        ))
+
+        failed = [root_issue] if root_issue else []
+        for issues in item_issues.values():
+            failed.extend(issue for issue in issues if issue is not None)
+        failed_paths = {_path_key(path): message for path, message in failed}
+
+        if failed:
+            response = JsonValidatorResponse(
+                is_valid=False,
+                http_status=HttpResponseEnum.BAD_REQUEST,
+                error_message=f"JSON validation failed: {failed[0][1]}"
+            )
+        else:
+            response = JsonValidatorResponse(is_valid=True, http_status=HttpResponseEnum.OK, error_message=None)
+        return IncrementalResult(response, payload, failed_paths, revalidated, full)
+
+    def _store(self, request_id: str, session: ValidationSession):
+        with self._lock:
+            self._sessions[request_id] = session
+            self._sessions.move_to_end(request_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds
+        }
@@ -0,0 +1,166 @@
+"""
+Per-payer validation metrics
+Latency histograms per payer id and failure counts by "path:keyword"
+(e.g. `response/0/cptcodes:pattern`) for everything validated through the
+ValidationService (/api/validate-json and TOOL 4). Exposed as Prometheus
+text by /api/validate-json/metrics and as a dict via `summary()`.
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Histogram upper bounds in milliseconds; the last bucket is +Inf
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# Distinct failure keys kept per payer; further keys are counted under "other"
+METRICS_MAX_FAILURE_KEYS = int(os.getenv("VALIDATION_METRICS_MAX_FAILURE_KEYS", "500"))
+
+OTHER_FAILURES = "other"
+UNKNOWN_PAYER = "unknown"
+
+class LatencyHistogram:
+    """Cumulative-friendly bucketed latency histogram"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float):
+        self.counts[bisect_left(self.buckets, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside the bucket that contains it"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = min(self.buckets[index], self.max_ms) if index < len(self.buckets) else self.max_ms
+                return round(lower + (upper - lower) * (rank - seen) / bucket_count, 4)
+            seen += bucket_count
+        return round(self.max_ms, 4)
+
+class PayerMetrics:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.valid = 0
+        self.invalid = 0
+        self.failures: Counter = Counter()
+        self.sources: Counter = Counter()
+
+class ValidationMetrics:
+    """Thread-safe registry of per-payer validation metrics"""
+
+    def __init__(self, max_failure_keys: int = METRICS_MAX_FAILURE_KEYS):
+        self.max_failure_keys = max_failure_keys
+        self._payers: Dict[str, PayerMetrics] = {}
+        self._lock = threading.Lock()
+
+    def record(self, payer_id: Optional[str], elapsed_ms: float, is_valid: bool,
+               failure_key: Optional[str] = None, source: str = "api"):
+        payer_id = str(payer_id) if payer_id else UNKNOWN_PAYER
+        with self._lock:
+            metrics = self._payers.get(payer_id)
+            if metrics is None:
+                metrics = self._payers[payer_id] = PayerMetrics()
+            metrics.latency.observe(elapsed_ms)
+            metrics.sources[source] += 1
+            if is_valid:
+                metrics.valid += 1
+                return
+            metrics.invalid += 1
+            if failure_key:
+                if failure_key not in metrics.failures and len(metrics.failures) >= self.max_failure_keys:
+                    failure_key = OTHER_FAILURES
+                metrics.failures[failure_key] += 1
+
+    def reset(self):
+        with self._lock:
+            self._payers.clear()
+
+    def summary(self, top_failures: int = 10) -> Dict[str, Any]:
+        """In-process view: per payer counts, latency quantiles and the most frequent failures"""
+        with self._lock:
+            payers = {}
+            for payer_id, metrics in sorted(self._payers.items()):
+                latency = metrics.latency
+                total = metrics.valid + metrics.invalid
+                payers[payer_id] = {
+                    "validations": total,
+                    "valid": metrics.valid,
+                    "invalid": metrics.invalid,
+                    "failure_rate": round(metrics.invalid / total, 4) if total else 0.0,
+                    "sources": dict(metrics.sources),
+                    "latency_ms": {
+                        "p50": latency.quantile(0.50),
+                        "p90": latency.quantile(0.90),
+                        "p99": latency.quantile(0.99),
+                        "mean": round(latency.total_ms / latency.count, 4) if latency.count else None,
+                        "max": round(latency.max_ms, 4)
+                    },
+                    "top_failures": [
+                        {"key": key, "count": count}
+                        for key, count in metrics.failures.most_common(top_failures)
+                    ]
+                }
+            return {"payers": payers}
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition (version 0.0.4)"""
+        lines: List[str] = [
+            "# HELP validation_latency_ms Payer validation latency in milliseconds",
+            "# TYPE validation_latency_ms histogram",
+        ]
+        with self._lock:
+            snapshot = sorted(self._payers.items())
+            for payer_id, metrics in snapshot:
+                label = _label(payer_id)
+                cumulative = 0
+                latency = metrics.latency
+                for bound, bucket_count in zip(latency.buckets, latency.counts):
+                    cumulative += bucket_count
+                    lines.append(f'validation_latency_ms_bucket{{payer_id="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'validation_latency_ms_bucket{{payer_id="{label}",le="+Inf"}} {latency.count}')
+                lines.append(f'validation_latency_ms_sum{{payer_id="{label}"}} {round(latency.total_ms, 6)}')
+                lines.append(f'validation_latency_ms_count{{payer_id="{label}"}} {latency.count}')
+
+            lines += [
+                "# HELP validation_results_total Validations by payer and outcome",
+                "# TYPE validation_results_total counter",
+            ]
+            for payer_id, metrics in snapshot:
+                label = _label(payer_id)
+                lines.append(f'validation_results_total{{payer_id="{label}",result="valid"}} {metrics.valid}')
+                lines.append(f'validation_results_total{{payer_id="{label}",result="invalid"}} {metrics.invalid}')
+
+            lines += [
+                "# HELP validation_failures_total Validation failures by payer and path:keyword",
+                "# TYPE validation_failures_total counter",
+            ]
+            for payer_id, metrics in snapshot:
+                label = _label(payer_id)
+                for key, count in sorted(metrics.failures.items()):
+                    path, _, keyword = key.rpartition(":")
+                    lines.append(
+                        f'validation_failures_total{{payer_id="{label}",path="{_label(path)}",'
+                        f'keyword="{_label(keyword)}"}} {count}'
+                    )
+        return "\n".join(lines) + "\n"
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+validation_metrics = ValidationMetrics()
+
+def get_validation_metrics() -> ValidationMetrics:
+    return validation_metrics
@@ -0,0 +1,195 @@
+"""
+Single-pass validation of mixed-payer `response` arrays
+Clearinghouse bundles carry items for several payers in one `response`
+array. Items are grouped by their own `payerid` in one pass and every
+group is checked against that payer's compiled item schema; large groups
+on the (slower) jsonschema path are split into chunks for the validation pool.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.models.responseModels.multiPayerValidationResponse import (
+    ItemValidationError, MultiPayerValidationResponse, PayerValidationBreakdown
+)
+from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
+from validation.incremental import Issue, PartitionedSchema, partition_for, split_schema
+from validation.pool import submit_to_pool, validate_items
+from validation.registry import CompiledPayerSchema, ValidatorRegistry
+
+# Groups with at least this many items are validated on the process pool (0 disables)
+MULTI_PAYER_PARALLEL_THRESHOLD = int(os.getenv("VALIDATION_MULTI_PAYER_PARALLEL_THRESHOLD", "2000"))
+# Items per pool task when a group is validated in parallel
+MULTI_PAYER_CHUNK_SIZE = int(os.getenv("VALIDATION_MULTI_PAYER_CHUNK_SIZE", "1000"))
+# Failing items reported per payer; counts always cover every item
+MULTI_PAYER_MAX_ERRORS = int(os.getenv("VALIDATION_MULTI_PAYER_MAX_ERRORS", "100"))
+
+ARRAY_NAME = "response"
+
+def group_by_payer(items: List[Any]) -> Tuple[Dict[str, List[int]], List[int]]:
+    """One pass over `items`: payer id -> item indexes (first-appearance order), plus items without a payerid"""
+    groups: Dict[str, List[int]] = {}
+    unattributed: List[int] = []
+    for index, item in enumerate(items):
+        payer_id = item.get("payerid") if isinstance(item, dict) else None
+        if payer_id is None or payer_id == "":
+            unattributed.append(index)
+            continue
+        groups.setdefault(str(payer_id), []).append(index)
+    return groups, unattributed
+
+def _path_key(path: Tuple[Any, ...]) -> str:
+    return "/".join(str(part) for part in path)
+
+class MultiPayerValidator:
+    """Validates every item of a mixed-payer payload against its own payer's rules"""
+
+    def __init__(self, registry: ValidatorRegistry, parallel_threshold: int = MULTI_PAYER_PARALLEL_THRESHOLD,
+                 chunk_size: int = MULTI_PAYER_CHUNK_SIZE, max_errors: int = MULTI_PAYER_MAX_ERRORS):
+        self.registry = registry
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = max(chunk_size, 1)
+        self.max_errors = max_errors
+        self.parallel_groups = 0
+        self.inline_groups = 0
+
+    def _use_pool(self, partition: PartitionedSchema, count: int) -> bool:
+        """
+        Code-generated item validators run in about a microsecond, less than it costs to
+        pickle the item for a worker, so only groups on the jsonschema path are offloaded
+        """
+        item_validator = partition.items.get(ARRAY_NAME)
+        return item_validator is not None and item_validator.fast_validator is None \
+            and self.parallel_threshold > 0 and count >= self.parallel_threshold
+
+    def _check_inline(self, partition: PartitionedSchema, items: List[Any], indexes: List[int]) -> List[Issue]:
+        issues = []
+        for index in indexes:
+            issue = partition.check_item(ARRAY_NAME, index, items[index])
+            if issue is not None:
+                issues.append(issue)
+        return issues
+
+    async def _check_parallel(self, compiled: CompiledPayerSchema, items: List[Any], indexes: List[int]) -> List[Issue]:
+        _, item_schemas = split_schema(compiled.schema)
+        futures = [
+            submit_to_pool(
+                validate_items, compiled.payer_id, compiled.version, item_schemas[ARRAY_NAME], ARRAY_NAME,
+                [(index, items[index]) for index in indexes[start:start + self.chunk_size]]
+            )
+            for start in range(0, len(indexes), self.chunk_size)
+        ]
+        issues = []
+        for chunk_issues in await asyncio.gather(*futures):
+            issues.extend(chunk_issues)
+        return issues
+
+    def _check_whole(self, compiled: CompiledPayerSchema, json_data, items: List[Any], indexes: List[int]) -> List[Issue]:
+        """Fallback for schemas without a per-item `response` schema: validate the payer's sub-payload"""
+        error = compiled.first_error({**json_data, ARRAY_NAME: [items[index] for index in indexes]})
+        if error is None:
+            return []
+        path = list(error.absolute_path)
+        # Map the position inside the sub-payload back to the original array
+        if len(path) > 1 and path[0] == ARRAY_NAME and isinstance(path[1], int):
+            path[1] = indexes[path[1]]
+        return [(tuple(path), error.message)]
+
+    def _breakdown(self, payer_id: str, version: Optional[str], total: int, issues: List[Issue],
+                   started: float, error_message: Optional[str] = None) -> PayerValidationBreakdown:
+        issues.sort(key=lambda issue: issue[0][1] if len(issue[0]) > 1 and isinstance(issue[0][1], int) else -1)
+        failing = {issue[0][1] for issue in issues if len(issue[0]) > 1 and issue[0][0] == ARRAY_NAME}
+        if error_message is None and issues:
+            error_message = f"JSON validation failed: {issues[0][1]}"
+        invalid = total if error_message and not failing else len(failing)
+        return PayerValidationBreakdown(
+            payer_id=payer_id,
+            is_valid=error_message is None,
+            ruleset_version=version,
+            total_items=total,
+            valid_items=total - invalid,
+            invalid_items=invalid,
+            error_message=error_message,
+            errors=[
+                ItemValidationError(
+                    index=path[1] if len(path) > 1 and isinstance(path[1], int) else -1,
+                    path=_path_key(path),
+                    message=message
+                )
+                for path, message in issues[:self.max_errors]
+            ],
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 3)
+        )
+
+    async def validate(self, json_data) -> MultiPayerValidationResponse:
+        items = json_data.get(ARRAY_NAME) if isinstance(json_data, dict) else None
+        if not isinstance(items, list) or not items:
+            return MultiPayerValidationResponse(
+                is_valid=False,
+                http_status=HttpResponseEnum.BAD_REQUEST,
+                error_message="Unable to extract payer ID from JSON data",
+                total_items=len(items) if isinstance(items, list) else 0
+            )
+
+        groups, unattributed = group_by_payer(items)
+
+        # Start the pool work for large groups first so it overlaps with the inline groups
+        pending: Dict[str, asyncio.Future] = {}
+        plans = []
+        for payer_id, indexes in groups.items():
+            compiled = self.registry.get(payer_id)
+            if compiled is None:
+                plans.append((payer_id, None, indexes, None))
+                continue
+            partition = partition_for(compiled)
+            if self._use_pool(partition, len(indexes)):
+                pending[payer_id] = asyncio.ensure_future(self._check_parallel(compiled, items, indexes))
+                self.parallel_groups += 1
+            else:
+                self.inline_groups += 1
+            plans.append((payer_id, compiled, indexes, partition))
+
+        breakdowns = []
+        for payer_id, compiled, indexes, partition in plans:
+            started = time.perf_counter()
+            if compiled is None:
+                breakdowns.append(self._breakdown(
+                    payer_id, None, len(indexes), [], started,
+                    error_message=f"No validation rules found for payer ID: {payer_id}"
+                ))
+                continue
+
+            if ARRAY_NAME not in partition.items:
+                issues = self._check_whole(compiled, json_data, items, indexes)
+            else:
+                root_issue = partition.check_root(json_data)
+                if payer_id in pending:
+                    issues = await pending[payer_id]
+                else:
+                    issues = self._check_inline(partition, items, indexes)
+                if root_issue is not None:
+                    issues.insert(0, root_issue)
+            breakdowns.append(self._breakdown(payer_id, compiled.version, len(indexes), issues, started))
+
+        error_message = next((b.error_message for b in breakdowns if not b.is_valid), None)
+        if unattributed and error_message is None:
+            error_message = f"Unable to extract payer ID for {len(unattributed)} item(s)"
+        is_valid = error_message is None
+        return MultiPayerValidationResponse(
+            is_valid=is_valid,
+            http_status=HttpResponseEnum.OK if is_valid else HttpResponseEnum.BAD_REQUEST,
+            error_message=error_message,
+            total_items=len(items),
+            payers=breakdowns,
+            unattributed_items=unattributed
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "parallel_threshold": self.parallel_threshold,
+            "chunk_size": self.chunk_size,
+            "parallel_groups": self.parallel_groups,
+            "inline_groups": self.inline_groups
+        }
@@ -0,0 +1,72 @@
+"""
+Payer-aware evaluation of a single JSON payload
+Shared by the validation routes and the batch worker processes
+"""
+
+from typing import Callable, Optional, Tuple
+
+from db.models.responseModels.jsonValidatorResponse import JsonValidatorResponse
+from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
+
+def get_payer_id_from_json(json_data):
+    """Extract payer ID from JSON data"""
+    try:
+        if isinstance(json_data, dict) and 'response' in json_data:
+            if isinstance(json_data['response'], list) and len(json_data['response']) > 0:
+                return json_data['response'][0].get('payerid')
+    except Exception:
+        pass
+    return None
+
+def failure_key(error) -> str:
+    """Metrics key for a validation error: "<instance path>:<keyword>", e.g. response/0/cptcodes:pattern"""
+    return f"{'/'.join(str(part) for part in error.absolute_path)}:{error.validator}"
+
+# Keys for failures that happen before schema validation
+NO_PAYER_ID_KEY = "response/0/payerid:payer_id"
+NO_RULES_KEY = "response/0/payerid:no_rules"
+
+def evaluate_payload(json_data, lookup: Callable[[str], Optional[object]]) -> JsonValidatorResponse:
+    """
+    Validate `json_data` against the rules of the payer it names.
+    `lookup` maps a payer id to a CompiledPayerSchema (or None when the payer has no rules).
+    """
+    return evaluate_payload_detailed(json_data, lookup)[0]
+
+def evaluate_payload_detailed(json_data, lookup: Callable[[str], Optional[object]]) -> Tuple[JsonValidatorResponse, Optional[str]]:
+    """evaluate_payload plus the failure key of the first error (None when valid)"""
+    # Extract payer ID from the JSON data
+    payer_id = get_payer_id_from_json(json_data)
+    
+    if not payer_id:
+        return JsonValidatorResponse(
+            is_valid=False,
+            http_status=HttpResponseEnum.BAD_REQUEST,
+            error_message="Unable to extract payer ID from JSON data"
+        ), NO_PAYER_ID_KEY
+    
+    # Check if we have validation rules for this payer
+    compiled = lookup(payer_id)
+    if compiled is None:
+        return JsonValidatorResponse(
+            is_valid=False,
+            http_status=HttpResponseEnum.BAD_REQUEST,
+            error_message=f"No validation rules found for payer ID: {payer_id}"
+        ), NO_RULES_KEY
+    
+    # Validate the JSON data against the precompiled schema
+    error = compiled.first_error(json_data)
+    if error is None:
+        # If validation passes
+        return JsonValidatorResponse(
+            is_valid=True,
+            http_status=HttpResponseEnum.OK,
+            error_message=None
+        ), None
+    
+    # If validation fails
+    return JsonValidatorResponse(
+        is_valid=False,
+        http_status=HttpResponseEnum.BAD_REQUEST,
+        error_message=f"JSON validation failed: {error.message}"
+    ), failure_key(error)
@@ -0,0 +1,169 @@
+"""
+Process pool for CPU-bound validation work
+Workers receive payer schemas alongside the records and keep their own
+compiled copies keyed by (payer id, ruleset version). Workers are started
+with forkserver (spawn where that is unavailable): forking the
+multi-threaded server process can leave a worker holding a lock that no
+thread will ever release.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from validation.payload import evaluate_payload_detailed, get_payer_id_from_json
+from validation.registry import CompiledPayerSchema, compile_payer_schema
+
+VALIDATION_POOL_SIZE = int(os.getenv("VALIDATION_POOL_SIZE", str(os.cpu_count() or 2)))
+VALIDATION_POOL_START_METHOD = os.getenv(
+    "VALIDATION_POOL_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_validation_pool() -> ProcessPoolExecutor:
+    """Create the shared validation pool on first use"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=VALIDATION_POOL_SIZE,
+            mp_context=multiprocessing.get_context(VALIDATION_POOL_START_METHOD)
+        )
+    return _pool
+
+def shutdown_validation_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+class PoolMetrics:
+    """Queue depth and turnaround of work submitted to the validation pool"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        # Submissions that found every worker busy and had to wait in the queue
+        self.queued_submissions = 0
+        self.total_turnaround_ms = 0.0
+        self.max_turnaround_ms = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self.submitted - self.completed - self.failed
+
+    def submitting(self):
+        if self.queue_depth >= VALIDATION_POOL_SIZE:
+            self.queued_submissions += 1
+        self.submitted += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def finished(self, started: float, failed: bool):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+        self.total_turnaround_ms += elapsed_ms
+        self.max_turnaround_ms = max(self.max_turnaround_ms, elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "pool_size": VALIDATION_POOL_SIZE,
+            "start_method": VALIDATION_POOL_START_METHOD,
+            "started": _pool is not None,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "queued_submissions": self.queued_submissions,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_turnaround_ms": round(self.total_turnaround_ms / finished, 3) if finished else 0.0,
+            "max_turnaround_ms": round(self.max_turnaround_ms, 3)
+        }
+
+pool_metrics = PoolMetrics()
+
+def submit_to_pool(fn: Callable, *args) -> asyncio.Future:
+    """Run `fn(*args)` on the validation pool from the event loop, tracking queue depth"""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    pool_metrics.submitting()
+    future = loop.run_in_executor(get_validation_pool(), fn, *args)
+    future.add_done_callback(
+        lambda done: pool_metrics.finished(started, done.cancelled() or done.exception() is not None)
+    )
+    return future
+
+# ============================================================================
+# Worker side
+# ============================================================================
+
+# Per-process cache of compiled schemas
+_worker_compiled: Dict[Tuple[str, str], CompiledPayerSchema] = {}
+
+def _worker_compile(cache_id: str, version: str, schema: Dict[str, Any]) -> CompiledPayerSchema:
+    compiled = _worker_compiled.get((cache_id, version))
+    if compiled is None:
+        compiled = compile_payer_schema(cache_id, schema, version)
+        for key in [key for key in _worker_compiled if key[0] == cache_id]:
+            del _worker_compiled[key]
+        _worker_compiled[(cache_id, version)] = compiled
+    return compiled
+
+def _worker_lookup(payer_schemas: Dict[str, Tuple[str, Dict[str, Any]]]):
+    def lookup(payer_id: str) -> Optional[CompiledPayerSchema]:
+        entry = payer_schemas.get(payer_id)
+        if entry is None:
+            return None
+        version, schema = entry
+        return _worker_compile(payer_id, version, schema)
+    return lookup
+
+def validate_records(
+    payer_schemas: Dict[str, Tuple[str, Dict[str, Any]]],
+    records: List[Tuple[Any, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Validate (request_id, json_data) records inside a worker process.
+    `payer_schemas` maps payer id -> (version, schema) for the payers in this chunk.
+    """
+    lookup = _worker_lookup(payer_schemas)
+    results = []
+    for request_id, json_data in records:
+        started = time.perf_counter()
+        response, failure = evaluate_payload_detailed(json_data, lookup)
+        results.append({
+            "request_id": request_id,
+            "payer_id": get_payer_id_from_json(json_data),
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+            "failure_key": failure,
+            **response.model_dump(mode="json")
+        })
+    return results
+
+def validate_items(
+    payer_id: str,
+    version: str,
+    item_schema: Dict[str, Any],
+    array_name: str,
+    items: List[Tuple[int, Any]]
+) -> List[Tuple[Tuple[Any, ...], str]]:
+    """
+    Validate (index, item) pairs of one payer's array items inside a worker process.
+    Returns (path, message) for every failing item, path starting at `array_name`.
+    """
+    compiled = _worker_compile(f"{payer_id}/{array_name}", version, item_schema)
+    issues = []
+    for index, item in items:
+        error = compiled.first_error(item)
+        if error is not None:
+            issues.append(((array_name, index, *error.absolute_path), error.message))
+    return issues
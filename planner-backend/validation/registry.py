@@ -0,0 +1,264 @@
+"""
+Compiled validator registry for payer rulesets
+Builds one jsonschema validator per payer id from rulesets/all_rules.json
+and keeps it in memory until the rules file changes on disk. Payer
+rulesets stored in Mongo (see validation/ruleset_store.py) are layered on
+top of the file, which stays as the seed and fallback.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from jsonschema import FormatChecker
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+from validation.codegen import UnsupportedSchema, compile_validator
+
+RULES_PATH = os.getenv(
+    "VALIDATION_RULES_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'rulesets', 'all_rules.json')
+)
+# How often (seconds) the rules file is stat'ed for changes
+RULES_RELOAD_CHECK_INTERVAL = float(os.getenv("VALIDATION_RULES_RELOAD_INTERVAL", "2"))
+# Compile payer schemas into specialized Python functions when they only use the supported subset
+VALIDATION_CODEGEN = os.getenv("VALIDATION_CODEGEN", "true").lower() in ("1", "true", "yes")
+
+@dataclass
+class CompiledPayerSchema:
+    """A payer schema together with its ready-to-use validator"""
+    payer_id: str
+    schema: Dict[str, Any]
+    validator: Any
+    version: str
+    fast_validator: Optional[Callable[[Any], Any]] = None
+
+    def first_error(self, instance):
+        """
+        Return the failure for `instance`, or None when valid: always the error
+        jsonschema.validate() would raise. The generated validator only decides
+        pass/fail; a failing instance is re-checked with jsonschema for best_match.
+        """
+        if self.fast_validator is not None:
+            violation = self.fast_validator(instance)
+            if violation is None:
+                return None
+            return best_match(self.validator.iter_errors(instance)) or violation
+        return best_match(self.validator.iter_errors(instance))
+
+@dataclass
+class RulesetSnapshot:
+    """One published view of the rules, replaced wholesale on every change"""
+    version: str
+    payers: Dict[str, CompiledPayerSchema]
+    compile_time_ms: float
+    loaded_at: datetime = field(default_factory=datetime.now)
+
+def _precompile_patterns(schema):
+    """Compile every `pattern` up front so bad regexes fail at load time and later searches hit the re cache"""
+    if isinstance(schema, dict):
+        for key, value in schema.items():
+            if key == "pattern" and isinstance(value, str):
+                re.compile(value)
+            else:
+                _precompile_patterns(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            _precompile_patterns(value)
+
+def compile_payer_schema(payer_id: str, schema: Dict[str, Any], version: str) -> CompiledPayerSchema:
+    """Check a payer schema once and build its validator"""
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    _precompile_patterns(schema)
+    validator = cls(schema, format_checker=FormatChecker())
+    fast_validator = None
+    if VALIDATION_CODEGEN:
+        try:
+            fast_validator = compile_validator(schema, name=payer_id)
+        except UnsupportedSchema as e:
+            print(f"Payer {payer_id}: using jsonschema validator ({e})")
+    return CompiledPayerSchema(
+        payer_id=payer_id,
+        schema=schema,
+        validator=validator,
+        version=version,
+        fast_validator=fast_validator
+    )
+
+class ValidatorRegistry:
+    """
+    Holds compiled validators for every payer.
+    Two layers feed it: the rules file (re-checked at most every
+    `check_interval` seconds; a changed mtime triggers a hash comparison and,
+    if the content differs, a rebuild) and per-payer overrides pushed from the
+    database. Every change publishes a new snapshot as a single reference
+    assignment, so readers never see a half-built registry.
+    """
+
+    def __init__(self, rules_path: str = RULES_PATH, check_interval: float = RULES_RELOAD_CHECK_INTERVAL):
+        self.rules_path = rules_path
+        self.check_interval = check_interval
+        self._snapshot: Optional[RulesetSnapshot] = None
+        self._file_payers: Dict[str, CompiledPayerSchema] = {}
+        self._file_version: Optional[str] = None
+        self._file_mtime: Optional[float] = None
+        self._db_payers: Dict[str, CompiledPayerSchema] = {}
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_reload_error: Optional[str] = None
+        self._reload_listeners: List[Callable[[RulesetSnapshot], None]] = []
+
+    def add_reload_listener(self, listener: Callable[[RulesetSnapshot], None]):
+        """Call `listener(snapshot)` every time a new ruleset is installed"""
+        self._reload_listeners.append(listener)
+
+    def load(self) -> RulesetSnapshot:
+        """Read, compile and install the rules file"""
+        with self._lock:
+            with open(self.rules_path, 'rb') as file:
+                raw = file.read()
+            mtime = os.stat(self.rules_path).st_mtime
+            version = hashlib.sha256(raw).hexdigest()[:16]
+            self._install_file(raw, version, mtime)
+            self._last_check = time.monotonic()
+            return self._snapshot
+
+    def _install_file(self, raw: bytes, version: str, mtime: float):
+        started = time.perf_counter()
+        all_rules = json.loads(raw)
+        self._file_payers = {
+            payer_id: compile_payer_schema(payer_id, schema, f"file:{version}")
+            for payer_id, schema in all_rules.items()
+        }
+        self._file_version = version
+        self._file_mtime = mtime
+        compile_time_ms = (time.perf_counter() - started) * 1000
+        self._publish(compile_time_ms)
+        print(f"Validation rules loaded: {len(self._file_payers)} payers, version {version}, {compile_time_ms:.1f} ms")
+
+    def _publish(self, compile_time_ms: float):
+        payers = {**self._file_payers, **self._db_payers}
+        db_versions = ",".join(f"{p}:{c.version}" for p, c in sorted(self._db_payers.items()))
+        version = self._file_version or "none"
+        if db_versions:
+            version = f"{version}+{hashlib.sha256(db_versions.encode()).hexdigest()[:8]}"
+        self._snapshot = RulesetSnapshot(
+            version=version,
+            payers=payers,
+            compile_time_ms=round(compile_time_ms, 3)
+        )
+        self.reloads += 1
+        for listener in self._reload_listeners:
+            listener(self._snapshot)
+
+    def apply_payer_updates(self, updates: Dict[str, Tuple[str, Dict[str, Any]]], removed=()) -> Dict[str, str]:
+        """
+        Install per-payer rulesets from the database.
+        `updates` maps payer id -> (version, schema); `removed` payers fall back to the file.
+        Payers whose schema fails to compile keep their current rules; their errors are returned.
+        """
+        started = time.perf_counter()
+        compiled = {}
+        errors = {}
+        # Compile outside the lock so lookups keep being served from the current snapshot
+        for payer_id, (version, schema) in updates.items():
+            try:
+                compiled[payer_id] = compile_payer_schema(payer_id, schema, version)
+            except Exception as e:
+                # Reported by the caller (PayerRulesetStore), which also retries it
+                errors[payer_id] = getattr(e, "message", str(e))
+        if not compiled and not removed:
+            return errors
+        with self._lock:
+            db_payers = {**self._db_payers, **compiled}
+            for payer_id in removed:
+                db_payers.pop(payer_id, None)
+            self._db_payers = db_payers
+            self._publish((time.perf_counter() - started) * 1000)
+        print(f"Validation rules updated from database: {sorted(compiled)} (removed {sorted(removed)})")
+        return errors
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            # Another thread is already checking / rebuilding
+            return
+        try:
+            self._last_check = now
+            mtime = os.stat(self.rules_path).st_mtime
+            if mtime == self._file_mtime:
+                return
+            with open(self.rules_path, 'rb') as file:
+                raw = file.read()
+            version = hashlib.sha256(raw).hexdigest()[:16]
+            if version == self._file_version:
+                self._file_mtime = mtime
+                return
+            self._install_file(raw, version, mtime)
+        except Exception as e:
+            # Keep serving the last good snapshot
+            self.reload_errors += 1
+            self.last_reload_error = str(e)
+            print(f"Validation rules reload failed, keeping version {self._file_version}: {e}")
+        finally:
+            self._lock.release()
+
+    def snapshot(self) -> RulesetSnapshot:
+        if self._snapshot is None:
+            self.load()
+        else:
+            self._maybe_reload()
+        return self._snapshot
+
+    def get(self, payer_id: str) -> Optional[CompiledPayerSchema]:
+        """Compiled schema for a payer, or None if the payer has no rules"""
+        compiled = self.snapshot().payers.get(payer_id)
+        if compiled is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return compiled
+
+    def file_schemas(self) -> Dict[str, Dict[str, Any]]:
+        """Raw schemas from the rules file (used to seed the database)"""
+        self.snapshot()
+        return {payer_id: compiled.schema for payer_id, compiled in self._file_payers.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        lookups = self.hits + self.misses
+        return {
+            "version": snapshot.version if snapshot else None,
+            "file_version": self._file_version,
+            "payer_count": len(snapshot.payers) if snapshot else 0,
+            "database_payers": {p: c.version for p, c in self._db_payers.items()},
+            "codegen_payers": sum(1 for c in snapshot.payers.values() if c.fast_validator) if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "compile_time_ms": snapshot.compile_time_ms if snapshot else None,
+            "lookups": lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_reload_error": self.last_reload_error
+        }
+
+validator_registry = ValidatorRegistry()
+
+def get_validator_registry() -> ValidatorRegistry:
+    return validator_registry
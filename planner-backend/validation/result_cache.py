@@ -0,0 +1,94 @@
+"""
+Content-addressed cache of validation results
+Keys are (payer id, ruleset version, sha256 of the canonical JSON payload);
+entries expire after a TTL and the least recently used entry is evicted
+once the cache is full. Only payers on the jsonschema path are cached;
+code-generated validators are cheaper than the canonical-JSON hash.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+VALIDATION_CACHE_SIZE = int(os.getenv("VALIDATION_CACHE_SIZE", "1024"))
+VALIDATION_CACHE_TTL = float(os.getenv("VALIDATION_CACHE_TTL", "300"))
+
+CacheKey = Tuple[str, str, str]
+
+def canonical_json(json_data) -> bytes:
+    """Serialization that is identical for equal payloads regardless of key order"""
+    return json.dumps(
+        json_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode()
+
+class ValidationResultCache:
+    """Bounded LRU + TTL cache; safe to share between threads"""
+
+    def __init__(self, max_entries: int = VALIDATION_CACHE_SIZE, ttl_seconds: float = VALIDATION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    @staticmethod
+    def make_key(json_data, payer_id: str, ruleset_version: str) -> CacheKey:
+        return payer_id, ruleset_version, hashlib.sha256(canonical_json(json_data)).hexdigest()
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: CacheKey, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (called when the rules reload)"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,179 @@
+"""
+Payer rulesets stored in Mongo
+Each payer has one document in `payerRulesets` with a version counter.
+Workers poll the (payerId, version) pairs with a covered query (hinted to
+the payerId_1_version_1 index) and only fetch and recompile payers whose
+version changed. A version that fails to compile is retried on every poll
+and reported in stats() until it compiles or is replaced. rulesets/all_rules.json
+seeds an empty collection and remains the fallback when Mongo is unavailable.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from db.models.dbmodels.payerRuleset import PayerRuleset
+from validation.registry import ValidatorRegistry, compile_payer_schema, get_validator_registry
+
+RULESETS_COLLECTION = "payerRulesets"
+# Index the version poll is answered from
+_VERSION_INDEX = [("payerId", 1), ("version", 1)]
+# Seconds between version polls; 0 disables the background refresh
+RULESET_POLL_INTERVAL = float(os.getenv("VALIDATION_RULESET_POLL_INTERVAL", "5"))
+
+def _db_version(version: int) -> str:
+    return f"db:{version}"
+
+class PayerRulesetStore:
+    """Keeps the registry's database layer in sync with `payerRulesets`"""
+
+    def __init__(self, registry: ValidatorRegistry, poll_interval: float = RULESET_POLL_INTERVAL):
+        self.registry = registry
+        self.poll_interval = poll_interval
+        # payer id -> version currently installed in the registry
+        self._known_versions: Dict[str, int] = {}
+        # payer id -> (version, error) of the latest version that failed to compile
+        self._rejected: Dict[str, Tuple[int, str]] = {}
+        self._indexes_ready = False
+        self.polls = 0
+        self.last_error: Optional[str] = None
+
+    async def ensure_indexes(self, db):
+        collection = db[RULESETS_COLLECTION]
+        await collection.create_index("payerId", unique=True)
+        # Lets the version poll be answered from the index alone
+        await collection.create_index(_VERSION_INDEX)
+        self._indexes_ready = True
+
+    async def seed_from_file(self, db) -> int:
+        """Copy the bundled rules into an empty collection"""
+        collection = db[RULESETS_COLLECTION]
+        if await collection.estimated_document_count() > 0:
+            return 0
+        now = datetime.now()
+        documents = [
+            PayerRuleset(
+                payerId=payer_id,
+                version=1,
+                schemaJson=json.dumps(schema),
+                updatedAt=now,
+                updatedBy="seed:all_rules.json"
+            ).model_dump()
+            for payer_id, schema in self.registry.file_schemas().items()
+        ]
+        if documents:
+            await collection.insert_many(documents, ordered=False)
+        print(f"Seeded {len(documents)} payer rulesets from all_rules.json")
+        return len(documents)
+
+    async def refresh(self, db) -> int:
+        """Install payers whose version changed since the last poll; returns how many changed"""
+        collection = db[RULESETS_COLLECTION]
+        if not self._indexes_ready:
+            # The hint below fails if the index does not exist yet
+            await self.ensure_indexes(db)
+        versions = {
+            doc["payerId"]: doc["version"]
+            async for doc in collection.find({}, {"_id": 0, "payerId": 1, "version": 1}).hint(_VERSION_INDEX)
+        }
+        self.polls += 1
+
+        changed = [payer_id for payer_id, version in versions.items()
+                   if self._known_versions.get(payer_id) != version]
+        removed = [payer_id for payer_id in self._known_versions if payer_id not in versions]
+        for payer_id in [payer_id for payer_id in self._rejected if payer_id not in versions]:
+            del self._rejected[payer_id]
+        if not changed and not removed:
+            return 0
+
+        updates = {}
+        errors: Dict[str, str] = {}
+        fetched_versions: Dict[str, int] = {}
+        if changed:
+            async for doc in collection.find({"payerId": {"$in": changed}}, {"_id": 0}):
+                fetched_versions[doc["payerId"]] = doc["version"]
+                try:
+                    updates[doc["payerId"]] = (_db_version(doc["version"]), json.loads(doc["schemaJson"]))
+                except ValueError as e:
+                    errors[doc["payerId"]] = f"schemaJson is not valid JSON: {e}"
+
+        errors.update(self.registry.apply_payer_updates(updates, removed=removed))
+        # Only installed versions are recorded; rejected ones are retried on the next poll
+        for payer_id, version in fetched_versions.items():
+            if payer_id in errors:
+                if self._rejected.get(payer_id) != (version, errors[payer_id]):
+                    print(f"Payer {payer_id} ruleset version {version} not installed: {errors[payer_id]}")
+                self._rejected[payer_id] = (version, errors[payer_id])
+            else:
+                self._known_versions[payer_id] = version
+                self._rejected.pop(payer_id, None)
+        for payer_id in removed:
+            self._known_versions.pop(payer_id, None)
+            self._rejected.pop(payer_id, None)
+        return len(fetched_versions) - len(errors) + len(removed)
+
+    async def save(self, db, payer_id: str, rules: Dict[str, Any], updated_by: Optional[str] = None) -> Dict[str, Any]:
+        """Validate and store a payer's ruleset, bump its version and install it locally"""
+        # Raises jsonschema.SchemaError for an invalid schema before anything is written
+        compile_payer_schema(payer_id, rules, "pending")
+        document = await db[RULESETS_COLLECTION].find_one_and_update(
+            {"payerId": payer_id},
+            {
+                "$set": {
+                    "schemaJson": json.dumps(rules),
+                    "updatedAt": datetime.now(),
+                    "updatedBy": updated_by
+                },
+                "$inc": {"version": 1}
+            },
+            upsert=True,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        await self.refresh(db)
+        return document
+
+    async def get(self, db, payer_id: str) -> Optional[Dict[str, Any]]:
+        return await db[RULESETS_COLLECTION].find_one({"payerId": payer_id}, {"_id": 0})
+
+    async def run(self, db):
+        """Background task: seed once, then poll for version changes"""
+        while True:
+            try:
+                await self.ensure_indexes(db)
+                await self.seed_from_file(db)
+                break
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Payer ruleset store unavailable, serving all_rules.json: {e}")
+                await asyncio.sleep(max(self.poll_interval, 1))
+
+        while True:
+            try:
+                await self.refresh(db)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Payer ruleset refresh failed, keeping current rules: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "poll_interval_seconds": self.poll_interval,
+            "polls": self.polls,
+            "known_versions": dict(self._known_versions),
+            "rejected": {
+                payer_id: {"version": version, "error": error}
+                for payer_id, (version, error) in self._rejected.items()
+            },
+            "last_error": self.last_error
+        }
+
+payer_ruleset_store = PayerRulesetStore(get_validator_registry())
+
+def get_payer_ruleset_store() -> PayerRulesetStore:
+    return payer_ruleset_store
@@ -0,0 +1,201 @@
+"""
+In-process validation service
+Single entry point for payer validation used by /api/validate-json and
+the agent tools, so TOOL 4 no longer loops back over HTTP. Large request
+bodies are validated on the process pool so they cannot stall the event
+loop; small ones stay inline.
+"""
+
+import json
+import os
+import time
+from typing import AsyncIterator, Optional, Tuple
+
+from db.models.responseModels.jsonValidatorResponse import JsonValidatorResponse
+from db.models.responseModels.multiPayerValidationResponse import MultiPayerValidationResponse
+from db.models.responseModels.streamingValidationResponse import StreamingValidationResponse
+from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
+from validation.incremental import IncrementalResult, IncrementalValidator
+from validation.multi_payer import MultiPayerValidator
+from validation.pool import submit_to_pool, validate_records
+from validation.metrics import ValidationMetrics, get_validation_metrics
+from validation.payload import evaluate_payload_detailed, get_payer_id_from_json
+from validation.registry import ValidatorRegistry, get_validator_registry
+from validation.result_cache import ValidationResultCache
+from validation.streaming import validate_stream
+
+# Request bodies of at least this many bytes are validated on the pool (0 disables)
+VALIDATION_OFFLOAD_MIN_BYTES = int(os.getenv("VALIDATION_OFFLOAD_MIN_BYTES", str(1024 * 1024)))
+
+# Failure key recorded when validation itself raised
+INTERNAL_ERROR_KEY = ":internal_error"
+
+def payload_bytes(json_data) -> int:
+    """Serialized size of a payload, for callers that do not know the size of the body it came in"""
+    return len(json.dumps(json_data, separators=(",", ":")))
+
+def content_length(request) -> Optional[int]:
+    """Size of a request's body from its Content-Length header; None when absent (chunked) or no request"""
+    header = request.headers.get("content-length") if request is not None else None
+    return int(header) if header and header.isdigit() else None
+
+class ValidationService:
+    """Validates payloads against the compiled payer registry, memoizing results"""
+
+    def __init__(self, registry: ValidatorRegistry, cache: Optional[ValidationResultCache] = None,
+                 incremental: Optional[IncrementalValidator] = None,
+                 offload_min_bytes: int = VALIDATION_OFFLOAD_MIN_BYTES,
+                 metrics: Optional[ValidationMetrics] = None):
+        self.registry = registry
+        self.metrics = metrics
+        self.cache = cache
+        self.incremental = incremental
+        self.multi_payer = MultiPayerValidator(registry)
+        self.offload_min_bytes = offload_min_bytes
+        self.inline_validations = 0
+        self.offloaded_validations = 0
+        if cache is not None:
+            # Results computed against old rules must not outlive them
+            registry.add_reload_listener(lambda snapshot: cache.clear())
+
+    def validate_sync(self, json_data) -> JsonValidatorResponse:
+        """Validate on the calling thread"""
+        return self._validate_inline(json_data)[0]
+
+    def _validate_inline(self, json_data) -> Tuple[JsonValidatorResponse, Optional[str]]:
+        """Validate on the calling thread; also returns the failure key for metrics"""
+        try:
+            payer_id = get_payer_id_from_json(json_data)
+            compiled = self.registry.get(payer_id) if payer_id else None
+
+            key = None
+            # Code-generated validators re-check a payload faster than it can be hashed for the cache
+            if compiled is not None and compiled.fast_validator is None \
+                    and self.cache is not None and self.cache.enabled:
+                key = self.cache.make_key(json_data, payer_id, compiled.version)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+
+            result = evaluate_payload_detailed(json_data, lambda _: compiled)
+            if key is not None:
+                self.cache.put(key, result)
+            return result
+        except Exception as e:
+            # Handle any other exceptions
+            return JsonValidatorResponse(
+                is_valid=False,
+                http_status=HttpResponseEnum.INTERNAL_SERVER_ERROR,
+                error_message=f"Internal server error during validation: {str(e)}"
+            ), INTERNAL_ERROR_KEY
+
+    async def validate(self, json_data, request_id: Optional[str] = None, source: str = "api",
+                       body_bytes: Optional[int] = None) -> JsonValidatorResponse:
+        """
+        Validate a payload; same result model as /api/validate-json.
+        With a `request_id` the payload is remembered so later corrections can be re-checked incrementally.
+        `source` labels the caller in the metrics (api, tool4, ...).
+        `body_bytes` is the size of the request body (Content-Length); it is measured when unknown.
+        """
+        started = time.perf_counter()
+        if self.offload_min_bytes > 0 and body_bytes is None:
+            body_bytes = payload_bytes(json_data)
+        if self.offload_min_bytes > 0 and body_bytes >= self.offload_min_bytes:
+            result, failure = await self._validate_offloaded(json_data)
+        else:
+            self.inline_validations += 1
+            result, failure = self._validate_inline(json_data)
+        if self.metrics is not None:
+            self.metrics.record(
+                get_payer_id_from_json(json_data), (time.perf_counter() - started) * 1000,
+                result.is_valid, failure, source
+            )
+        if request_id and self.incremental is not None \
+                and result.http_status != HttpResponseEnum.INTERNAL_SERVER_ERROR:
+            self.incremental.remember(request_id, json_data, result)
+        return result
+
+    async def _validate_offloaded(self, json_data) -> Tuple[JsonValidatorResponse, Optional[str]]:
+        """
+        Validate a large payload in a worker process.
+        Skips the result cache: hashing a payload this size would block the loop as well.
+        """
+        payer_id = get_payer_id_from_json(json_data)
+        compiled = self.registry.get(payer_id) if payer_id else None
+        if compiled is None:
+            # Nothing to validate; the error response is cheap to build inline
+            return self._validate_inline(json_data)
+        self.offloaded_validations += 1
+        try:
+            [record] = await submit_to_pool(
+                validate_records, {payer_id: (compiled.version, compiled.schema)}, [(None, json_data)]
+            )
+            return JsonValidatorResponse(
+                is_valid=record["is_valid"],
+                http_status=HttpResponseEnum(record["http_status"]),
+                error_message=record["error_message"]
+            ), record["failure_key"]
+        except Exception as e:
+            return JsonValidatorResponse(
+                is_valid=False,
+                http_status=HttpResponseEnum.INTERNAL_SERVER_ERROR,
+                error_message=f"Internal server error during validation: {str(e)}"
+            ), INTERNAL_ERROR_KEY
+
+    def offload_stats(self):
+        return {
+            "offload_min_bytes": self.offload_min_bytes,
+            "inline": self.inline_validations,
+            "offloaded": self.offloaded_validations
+        }
+
+    async def validate_multi_payer(self, json_data) -> MultiPayerValidationResponse:
+        """Validate each `response` item against its own payer's rules, with a per-payer breakdown"""
+        try:
+            return await self.multi_payer.validate(json_data)
+        except Exception as e:
+            return MultiPayerValidationResponse(
+                is_valid=False,
+                http_status=HttpResponseEnum.INTERNAL_SERVER_ERROR,
+                error_message=f"Internal server error during validation: {str(e)}",
+                total_items=0
+            )
+
+    async def validate_stream(self, chunks: AsyncIterator[bytes], fail_fast: bool = False) -> StreamingValidationResponse:
+        """Validate a JsonValidatorRequest body while it is still being received"""
+        try:
+            return await validate_stream(chunks, self.registry, fail_fast=fail_fast)
+        except Exception as e:
+            return StreamingValidationResponse(
+                is_valid=False,
+                http_status=HttpResponseEnum.INTERNAL_SERVER_ERROR,
+                error_message=f"Internal server error during validation: {str(e)}",
+                items_validated=0,
+                invalid_items=0,
+                bytes_read=0
+            )
+
+    def has_session(self, request_id: str) -> bool:
+        return self.incremental is not None and self.incremental.has_session(request_id)
+
+    def restore_session(self, request_id: str, json_data):
+        """Resume incremental re-validation from a payload persisted by another instance"""
+        if self.incremental is not None:
+            self.incremental.restore(request_id, json_data)
+
+    async def revalidate_patch(self, request_id: str, operations) -> IncrementalResult:
+        """
+        Apply a JSON-Patch correction to the request's last validated payload and
+        re-check only the parts it touches (see validation/incremental.py)
+        """
+        if self.incremental is None:
+            raise KeyError(request_id)
+        return self.incremental.apply_patch(request_id, operations)
+
+_registry = get_validator_registry()
+validation_service = ValidationService(
+    _registry, ValidationResultCache(), IncrementalValidator(_registry), metrics=get_validation_metrics()
+)
+
+def get_validation_service() -> ValidationService:
+    return validation_service
@@ -0,0 +1,190 @@
+"""
+Streaming parse-and-validate for very large validation requests
+The request body ({"json_data": {"response": [...], ...}}) is parsed
+incrementally with ijson. Each `json_data.response[*]` item is validated
+as soon as it is complete and then dropped, so peak memory depends on the
+largest item rather than on the number of items. The rest of `json_data`
+is assembled and checked against the payer's root schema at the end.
+Array keywords that depend on the item contents (e.g. uniqueItems) are
+not evaluated in this mode.
+"""
+
+import os
+from typing import AsyncIterator, List, Optional
+
+import ijson
+
+from db.models.responseModels.multiPayerValidationResponse import ItemValidationError
+from db.models.responseModels.streamingValidationResponse import StreamingValidationResponse
+from db.models.dbmodels.utility.httpResponseEnum import HttpResponseEnum
+from validation.incremental import Issue, partition_for
+from validation.registry import ValidatorRegistry
+
+# Failing items reported when fail_fast is off; counts always cover every item
+STREAM_MAX_ERRORS = int(os.getenv("VALIDATION_STREAM_MAX_ERRORS", "100"))
+
+ROOT_PREFIX = "json_data"
+ARRAY_NAME = "response"
+ARRAY_PREFIX = f"{ROOT_PREFIX}.{ARRAY_NAME}"
+ITEM_PREFIX = f"{ARRAY_PREFIX}.item"
+
+def _path_key(path) -> str:
+    return "/".join(str(part) for part in path)
+
+class StreamingValidation:
+    """State of one streaming validation; fed item by item by `validate_stream`"""
+
+    def __init__(self, registry: ValidatorRegistry, fail_fast: bool, max_errors: int):
+        self.registry = registry
+        self.fail_fast = fail_fast
+        self.max_errors = max_errors
+        self.partition = None
+        self.items = 0
+        self.issues: List[Issue] = []
+        self.invalid_items = 0
+        self.error_message: Optional[str] = None
+
+    def add_item(self, item) -> bool:
+        """Validate one item; returns False once validation should stop"""
+        index = self.items
+        self.items += 1
+        if self.partition is None:
+            # Same rule as get_payer_id_from_json: the first item names the payer
+            payer_id = item.get("payerid") if isinstance(item, dict) else None
+            if not payer_id:
+                self.error_message = "Unable to extract payer ID from JSON data"
+                return False
+            compiled = self.registry.get(payer_id)
+            if compiled is None:
+                self.error_message = f"No validation rules found for payer ID: {payer_id}"
+                return False
+            self.partition = partition_for(compiled)
+            if ARRAY_NAME not in self.partition.items:
+                self.error_message = f"Streaming validation needs an item schema for '{ARRAY_NAME}' (payer ID: {payer_id})"
+                return False
+
+        issue = self.partition.check_item(ARRAY_NAME, index, item)
+        if issue is None:
+            return True
+        self.invalid_items += 1
+        if len(self.issues) < self.max_errors:
+            self.issues.append(issue)
+        return not self.fail_fast
+
+    def finish_root(self, root) -> None:
+        """Check everything outside the items once the document has been read"""
+        if self.error_message is not None or self.partition is None:
+            return
+        issue = self.partition.check_root(root)
+        if issue is not None:
+            self.issues.insert(0, issue)
+
+    def response(self, bytes_read: int, stopped_early: bool) -> StreamingValidationResponse:
+        error_message = self.error_message
+        if error_message is None and self.issues:
+            error_message = f"JSON validation failed: {self.issues[0][1]}"
+        return StreamingValidationResponse(
+            is_valid=error_message is None,
+            http_status=HttpResponseEnum.OK if error_message is None else HttpResponseEnum.BAD_REQUEST,
+            error_message=error_message,
+            items_validated=self.items,
+            invalid_items=self.invalid_items,
+            errors=[
+                ItemValidationError(
+                    index=path[1] if len(path) > 1 and isinstance(path[1], int) else -1,
+                    path=_path_key(path),
+                    message=message
+                )
+                for path, message in self.issues
+            ],
+            stopped_early=stopped_early,
+            bytes_read=bytes_read
+        )
+
+class _EventHandler:
+    """Routes ijson events: items go to the validation, the rest of json_data to the root builder"""
+
+    def __init__(self, state: StreamingValidation):
+        self.state = state
+        self.root_builder = None
+        self.item_builder = None
+        self.response_is_array = False
+
+    def handle(self, events) -> bool:
+        """Consume one chunk's events; returns False once validation should stop"""
+        state = self.state
+        for prefix, event, value in events:
+            if self.item_builder is not None:
+                self.item_builder.event(event, value)
+                if prefix == ITEM_PREFIX and event in ("end_map", "end_array"):
+                    item, self.item_builder = self.item_builder.value, None
+                    if not state.add_item(item):
+                        return False
+                continue
+
+            if prefix == ITEM_PREFIX:
+                if event in ("start_map", "start_array"):
+                    self.item_builder = ijson.ObjectBuilder()
+                    self.item_builder.event(event, value)
+                elif not state.add_item(value):
+                    return False
+                continue
+
+            if prefix == ROOT_PREFIX or prefix.startswith(ROOT_PREFIX + "."):
+                # Everything in json_data except the items themselves
+                if self.root_builder is None:
+                    self.root_builder = ijson.ObjectBuilder()
+                if prefix == ARRAY_PREFIX and event == "start_array":
+                    self.response_is_array = True
+                self.root_builder.event(event, value)
+        return True
+
+async def validate_stream(
+    chunks: AsyncIterator[bytes],
+    registry: ValidatorRegistry,
+    fail_fast: bool = False,
+    max_errors: int = STREAM_MAX_ERRORS
+) -> StreamingValidationResponse:
+    """Parse a JsonValidatorRequest body incrementally and validate each response item as it completes"""
+    state = StreamingValidation(registry, fail_fast, max_errors)
+    handler = _EventHandler(state)
+    # Push parser: each received chunk is parsed synchronously, which is far cheaper
+    # than awaiting ijson's async generator once per event
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events, use_float=True)
+    bytes_read = 0
+    stopped_early = False
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            bytes_read += len(chunk)
+            parser.send(chunk)
+            keep_going = handler.handle(events)
+            del events[:]
+            if not keep_going:
+                stopped_early = True
+                break
+        if not stopped_early:
+            parser.close()
+            handler.handle(events)
+    except ijson.JSONError as e:
+        return StreamingValidationResponse(
+            is_valid=False,
+            http_status=HttpResponseEnum.BAD_REQUEST,
+            error_message=f"Invalid JSON: {str(e).strip()}",
+            items_validated=state.items,
+            invalid_items=state.invalid_items,
+            bytes_read=bytes_read
+        )
+
+    root = handler.root_builder.value if handler.root_builder is not None else None
+    if not stopped_early:
+        if state.items == 0 and state.error_message is None:
+            state.error_message = "Unable to extract payer ID from JSON data"
+        elif isinstance(root, dict) and handler.response_is_array:
+            # Items are checked already; the root schema has no item schema so placeholders suffice
+            root[ARRAY_NAME] = [None] * state.items
+            state.finish_root(root)
+    return state.response(bytes_read, stopped_early)